@@ -1,13 +1,117 @@
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from typing import Dict, Optional
+import asyncio
 import json
+import os
+
+from eventlog.reader import EventFilter, EventLogReader
+from eventlog.stats import EventStats
+
+LOG_DIR = "data/log"
+TAIL_POLL_INTERVAL = 0.5
 
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+_readers: Dict[str, EventLogReader] = {}
+_stats: Dict[str, EventStats] = {}
+
+def get_reader() -> EventLogReader:
+    """Reader for LOG_DIR, kept so its segment index cache is reused"""
+    reader = _readers.get(LOG_DIR)
+    if reader is None:
+        reader = _readers[LOG_DIR] = EventLogReader(LOG_DIR)
+    return reader
+
+def _filter(agent: Optional[str], skill: Optional[str],
+            since: Optional[float], until: Optional[float]) -> EventFilter:
+    return EventFilter(agents=agent.split(",") if agent else None,
+                       skills=skill.split(",") if skill else None,
+                       since=since, until=until)
 
 @app.get("/log")
-def get_logs():
-    with open("data/log.jsonl") as f:
-        lines = f.readlines()
-    return [json.loads(line) for line in lines]
+def get_logs(cursor: Optional[int] = Query(None, ge=0),
+             limit: int = Query(100, ge=1, le=1000),
+             direction: str = Query("backward", pattern="^(backward|forward)$"),
+             agent: Optional[str] = None,
+             skill: Optional[str] = None,
+             since: Optional[float] = None,
+             until: Optional[float] = None):
+    """
+    One page of events. "backward" (default) returns newest first, starting
+    before `cursor` (default: end of log, or the `until` bound); "forward"
+    returns oldest first from `cursor` (default: start, or the `since`
+    bound). Pass `next_cursor` back to continue, and use `tail` as the
+    starting cursor for /log/stream.
+    """
+    match = _filter(agent, skill, since, until)
+    reader = get_reader()
+    if direction == "forward":
+        page = reader.read_forward(cursor, limit=limit, match=match)
+    else:
+        page = reader.read_backward(cursor, limit=limit, match=match)
+    return {"events": page.events, "next_cursor": page.next_cursor, "tail": page.tail}
+
+@app.get("/log/stream")
+async def stream_logs(request: Request,
+                      cursor: Optional[int] = Query(None, ge=0),
+                      agent: Optional[str] = None,
+                      skill: Optional[str] = None):
+    """
+    Server-sent events for lines appended after `cursor` (default: the
+    current end of the log). Each message carries a JSON array of new
+    events and its id is the offset to resume from, so reconnecting
+    clients continue via Last-Event-ID.
+    """
+    match = _filter(agent, skill, None, None)
+    reader = get_reader()
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        position = int(last_id)
+    elif cursor is not None:
+        position = cursor
+    else:
+        position = reader.tail()
+
+    async def events():
+        nonlocal position
+        while not await request.is_disconnected():
+            page = await asyncio.to_thread(reader.read_forward, position, 500, match)
+            if page.next_cursor == position:
+                await asyncio.sleep(TAIL_POLL_INTERVAL)
+                continue
+            position = page.next_cursor
+            if page.events:
+                yield f"id: {position}\ndata: {json.dumps(page.events)}\n\n"
+            else:
+                yield f"id: {position}\n: filtered\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+def get_stats() -> EventStats:
+    """Aggregates for LOG_DIR, resumed from the checkpoint kept beside the log"""
+    stats = _stats.get(LOG_DIR)
+    if stats is None:
+        stats = _stats[LOG_DIR] = EventStats(LOG_DIR, os.path.join(LOG_DIR, "stats.checkpoint.json"))
+    return stats
+
+@app.get("/stats")
+def get_event_stats(resolution: str = Query("hour", pattern="^(minute|hour|day)$"),
+                    since: Optional[float] = None,
+                    until: Optional[float] = None,
+                    limit: int = Query(60, ge=1, le=5000)):
+    """
+    Event and proof counts per agent and per skill, and the newest `limit`
+    time buckets at `resolution` overlapping [since, until]. Only
+    events appended since the previous call are read, so the cost doesn't
+    grow with the history.
+    """
+    stats = get_stats()
+    stats.refresh()
+    return stats.snapshot(resolution, since, until, limit)
@@ -0,0 +1,337 @@
+
+"""
+Benchmarks for the memory, dispatch, proof and API hot paths.
+
+    python -m bench.suite --scale small --out bench/results.json
+    python -m bench.suite --scale small --compare bench/baseline.json
+
+Workloads are generated from --seed, so runs at the same scale are
+comparable. With --compare, metrics that regressed by more than
+--threshold against the baseline are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from itertools import accumulate
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from memory.graph import MemoryEntry, MemoryGraph
+from memory.snapshot import write_snapshot
+
+SCALES = {
+    "tiny": 1_000,
+    "small": 10_000,
+    "medium": 100_000,
+    "large": 1_000_000,
+    "xlarge": 10_000_000,
+}
+
+# Metrics where a larger value is better; everything else is a latency
+HIGHER_IS_BETTER = ("ops_per_sec",)
+
+AGENTS = ["tavernkeeper", "miner", "thief", "guard"]
+TAGS = ["trade", "combat", "quest", "rumor", "loot", "travel", "craft", "social"]
+
+
+def memory_workload(n: int, seed: int, topics: int = 200) -> List[Tuple[str, str, Dict[str, Any], List[str]]]:
+    """`n` add_memory calls with skewed topic popularity and 0-3 tags each"""
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(topics)]
+    topic_names = [f"topic-{i}" for i in range(topics)]
+    rows = []
+    for i, topic in enumerate(rng.choices(topic_names, weights=weights, k=n)):
+        agent = f"{rng.choice(AGENTS)}-{rng.randrange(50)}"
+        tags = rng.sample(TAGS, rng.randrange(4))
+        rows.append((topic, agent, {"n": i, "value": rng.random()}, tags))
+    return rows
+
+
+def query_workload(rows, count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        topic, agent, _, tags = rng.choice(rows)
+        kind = rng.randrange(4)
+        if kind == 0:
+            queries.append({"topics": [topic]})
+        elif kind == 1:
+            queries.append({"topics": [topic], "agents": [agent]})
+        elif kind == 2:
+            queries.append({"tags": tags or [rng.choice(TAGS)]})
+        else:
+            queries.append({"agents": [agent], "limit": 10})
+    return queries
+
+
+def text_workload(n: int, seed: int, vocabulary: int = 20000, length: int = 8) -> List[str]:
+    """`n` memory texts over a Zipf-distributed vocabulary"""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    cum_weights = list(accumulate(1.0 / (i + 1) for i in range(vocabulary)))
+    return [" ".join(rng.choices(words, cum_weights=cum_weights, k=length)) for _ in range(n)]
+
+
+def _latencies(fn: Callable[[Any], Any], args: List[Any]) -> Dict[str, float]:
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return _summary(samples)
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "n": len(samples),
+        "ops_per_sec": len(samples) / total if total else 0.0,
+        "mean_ms": 1000 * total / len(samples),
+        "p50_ms": 1000 * samples[len(samples) // 2],
+        "p95_ms": 1000 * samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def _throughput(count: int, elapsed: float) -> Dict[str, float]:
+    return {"n": count, "ops_per_sec": count / elapsed if elapsed else 0.0,
+            "mean_ms": 1000 * elapsed / count}
+
+
+def bench_memory(n: int, seed: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    rows = memory_workload(n, seed)
+    results = {}
+
+    graph = MemoryGraph()
+    start = time.perf_counter()
+    for topic, agent, content, tags in rows:
+        graph.add_memory(topic, agent, content, tags)
+    results["memory.add_memory"] = _throughput(n, time.perf_counter() - start)
+
+    queries = query_workload(rows, 1000, seed)
+    results["memory.query"] = _latencies(lambda q: graph.query(**q), queries)
+    results["memory.get_recent"] = _latencies(lambda q: graph.get_recent(q["topics"][0], 10),
+                                              [q for q in queries if "topics" in q])
+
+    path = os.path.join(workdir, "memory.json")
+    durable = MemoryGraph(path, persist_mode="wal", fsync="never",
+                          compact_threshold=n + 1, compact_interval=3600)
+    start = time.perf_counter()
+    for topic, agent, content, tags in rows:
+        durable.add_memory(topic, agent, content, tags)
+    results["memory.add_memory_wal"] = _throughput(n, time.perf_counter() - start)
+    start = time.perf_counter()
+    durable.compact()
+    results["memory.save"] = _throughput(1, time.perf_counter() - start)
+    durable.close()
+    start = time.perf_counter()
+    MemoryGraph(path)
+    results["memory.load"] = _throughput(1, time.perf_counter() - start)
+
+    binary_path = os.path.join(workdir, "memory.snap")
+    write_snapshot(binary_path, (MemoryEntry.from_dict(e) for e in durable.export_state()["entries"].values()))
+    start = time.perf_counter()
+    mapped = MemoryGraph(binary_path, snapshot_format="binary")
+    results["memory.load_binary"] = _throughput(1, time.perf_counter() - start)
+    results["memory.query_binary"] = _latencies(lambda q: mapped.query(**q), queries)
+    return results
+
+
+def bench_retrieval(n: int, seed: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    from memory.retrieval import Retriever
+
+    rng = random.Random(seed)
+    texts = text_workload(n, seed)
+    entries = [MemoryEntry(agent_id=rng.choice(AGENTS), content=text, topic=f"topic-{i % 200}",
+                           timestamp=float(i)) for i, text in enumerate(texts)]
+    retriever = Retriever()
+    start = time.perf_counter()
+    for entry in entries:
+        retriever.add(entry)
+    results = {"retrieval.add": _throughput(n, time.perf_counter() - start)}
+
+    queries = text_workload(500, seed + 1, length=3)
+    results["retrieval.search"] = _latencies(lambda q: retriever.search(q, 5), queries)
+    results["retrieval.search_filtered"] = _latencies(
+        lambda q: retriever.search(q, 5, {"topics": [f"topic-{rng.randrange(200)}"]}), queries)
+    return results
+
+
+def bench_dispatch(n: int, seed: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    from planner.registry import SkillRegistry
+    from tools.executor import ToolChainExecutor
+
+    rng = random.Random(seed)
+    registry = SkillRegistry()
+    agents = [a for a in registry.compiled.chains if a in AGENTS] or list(registry.compiled.chains)
+    calls = [(rng.choice(agents), f"player-{rng.randrange(1000)}") for _ in range(n)]
+    start = time.perf_counter()
+    for agent, player in calls:
+        registry.dispatch(agent, player)
+    results = {"dispatch": _throughput(n, time.perf_counter() - start)}
+
+    with open("config/skills.yaml") as f:
+        executor = ToolChainExecutor({s["name"]: s for s in yaml.safe_load(f)["skills"]})
+    skills = sorted(executor.handles)
+    calls = [(rng.choice(skills), f"player-{rng.randrange(1000)}") for _ in range(n)]
+    start = time.perf_counter()
+    for skill, player in calls:
+        executor.execute(skill, player)
+    results["executor.execute"] = _throughput(n, time.perf_counter() - start)
+    return results
+
+
+def bench_proofs(n: int, seed: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    from sdk.anchor_client import AnchorZKClient
+
+    rng = random.Random(seed)
+    actions = [(rng.choice(AGENTS), json.dumps({"n": i, "value": rng.random()})) for i in range(n)]
+    results = {}
+    for name, client in (("proofs.store_proof", AnchorZKClient()),
+                         ("proofs.store_proof_batched", AnchorZKClient(batch_size=256))):
+        start = time.perf_counter()
+        for agent, memory_str in actions:
+            client.store_proof(agent, memory_str)
+        client.commit_batch()
+        results[name] = _throughput(n, time.perf_counter() - start)
+    return results
+
+
+def bench_api(n: int, seed: int, workdir: str) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    import api.server as server
+    from eventlog.writer import EventLogWriter
+    from planner.registry import get_registry
+    import runtime as mcp_runtime
+
+    rng = random.Random(seed)
+    log_dir = os.path.join(workdir, "log")
+    writer = EventLogWriter(log_dir, flush_interval=3600)
+    base = time.time() - n
+    for i in range(n):
+        writer.append({"agent": rng.choice(AGENTS), "skill": rng.choice(TAGS), "params": {},
+                       "zk_hash": "%064x" % rng.getrandbits(256), "ts": base + i})
+    writer.close()
+
+    saved_dir = server.LOG_DIR
+    server.LOG_DIR = log_dir
+    try:
+        client = TestClient(server.app)
+        results = {
+            "api.log_newest": _latencies(lambda _: client.get("/log"), range(200)),
+            "api.log_filtered": _latencies(
+                lambda agent: client.get("/log", params={"agent": agent, "since": base + n / 2}),
+                [rng.choice(AGENTS) for _ in range(200)]),
+        }
+        start = time.perf_counter()
+        client.get("/stats")
+        results["api.stats_rebuild"] = _throughput(n, time.perf_counter() - start)
+        results["api.stats"] = _latencies(
+            lambda resolution: client.get("/stats", params={"resolution": resolution}),
+            [rng.choice(["minute", "hour", "day"]) for _ in range(200)])
+    finally:
+        server.LOG_DIR = saved_dir
+
+    # Without entering the client context the lifespan (and its event log) doesn't run
+    client = TestClient(mcp_runtime.app)
+    # Only agents with a chain, so every sample is a real dispatch
+    chains = get_registry().compiled.chains
+    agents = [a for a in chains if a in AGENTS] or list(chains)
+    bodies = [{"agent": rng.choice(agents), "player": f"player-{i}"} for i in range(200)]
+    results["api.mcp_context"] = _latencies(lambda body: client.post("/mcp/context", json=body), bodies)
+    start = time.perf_counter()
+    for _ in range(5):
+        client.post("/mcp/context/batch", json={"requests": bodies})
+    results["api.mcp_context_batch"] = _throughput(5 * len(bodies), time.perf_counter() - start)
+    return results
+
+
+BENCHMARKS = {
+    "memory": bench_memory,
+    "retrieval": bench_retrieval,
+    "dispatch": bench_dispatch,
+    "proofs": bench_proofs,
+    "api": bench_api,
+}
+
+
+def run(scale: str = "small", seed: int = 42, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    n = SCALES[scale]
+    report = {
+        "meta": {"scale": scale, "entries": n, "seed": seed, "timestamp": time.time(),
+                 "python": platform.python_version(), "platform": platform.platform()},
+        "results": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    try:
+        for name, bench in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            report["results"].update(bench(n, seed, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """Metrics that are worse than the baseline by more than `threshold` (a fraction)"""
+    regressions = []
+    for name, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for metric, value in metrics.items():
+            if metric == "n" or metric not in base or not base[metric]:
+                continue
+            change = (value - base[metric]) / base[metric]
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append({"benchmark": name, "metric": metric, "baseline": base[metric],
+                                    "current": value, "change": change})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", type=str, help="Comma-separated: " + ",".join(BENCHMARKS))
+    parser.add_argument("--out", type=str, help="Write results as JSON to this path")
+    parser.add_argument("--compare", type=str, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    report = run(args.scale, args.seed, args.only.split(",") if args.only else None)
+    for name, metrics in report["results"].items():
+        line = "  ".join(f"{k}={v:.4g}" for k, v in metrics.items() if k != "n")
+        print(f"{name:32s} {line}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("scale") != args.scale:
+            print(f"⚠️ Baseline scale {baseline.get('meta', {}).get('scale')} != {args.scale}")
+        regressions = compare(report, baseline, args.threshold)
+        for r in regressions:
+            print(f"❌ {r['benchmark']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} "
+                  f"({r['change']:+.0%} worse)")
+        if regressions:
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+
+from bisect import bisect_left, bisect_right
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+BLOCK_SIZE = 64 * 1024
+
+# Cursors into a segmented log pack (segment number, byte offset)
+OFFSET_BITS = 40
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+SEGMENT_RE = re.compile(r"^(\d{8})\.jsonl$")
+
+
+def segment_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"{segment:08d}.jsonl")
+
+
+def index_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"{segment:08d}.idx")
+
+
+def list_segments(directory: str) -> List[int]:
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(SEGMENT_RE.match, names) if m)
+
+
+def make_cursor(segment: int, offset: int) -> int:
+    return (segment << OFFSET_BITS) | offset
+
+
+def split_cursor(cursor: int) -> Tuple[int, int]:
+    return cursor >> OFFSET_BITS, cursor & OFFSET_MASK
+
+
+@dataclass
+class EventFilter:
+    """Matches events by agent, skill and [since, until] on the `ts` field"""
+    agents: Optional[Sequence[str]] = None
+    skills: Optional[Sequence[str]] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+
+    def __call__(self, event: Dict[str, Any]) -> bool:
+        if self.agents and event.get("agent") not in self.agents:
+            return False
+        if self.skills and event.get("skill") not in self.skills:
+            return False
+        if self.since is not None or self.until is not None:
+            ts = event.get("ts")
+            if ts is None:
+                return False
+            if self.since is not None and ts < self.since:
+                return False
+            if self.until is not None and ts > self.until:
+                return False
+        return True
+
+
+@dataclass
+class Page:
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[int] = None   # Where to resume; None when exhausted
+    tail: int = 0                       # End of the complete lines in the log
+    reached_since: bool = False         # Backward scan passed the `since` bound
+
+
+def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def read_backward(path: str, before: Optional[int] = None, limit: int = 100,
+                  match: Callable[[Dict[str, Any]], bool] = EventFilter(),
+                  scan_limit: int = 8 * 1024 * 1024) -> Page:
+    """
+    Newest-first page of events starting before byte offset `before`
+    (default: end of file). Reads fixed-size blocks from the end, so cost
+    depends on the page, not on the size of the log. Stops after
+    `scan_limit` bytes and returns a cursor to continue from.
+    Assumes events are appended in time order, so a `since` filter ends
+    the scan at the first older event.
+    """
+    page = Page()
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return page
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        page.tail = _complete_end(f, size)
+        pos = page.tail if before is None else min(before, page.tail)
+        scanned = 0
+        consumed = False     # Has at least one whole line been examined
+        carry = b""
+        since = getattr(match, "since", None)
+        while pos > 0:
+            step = min(BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + carry
+            scanned += step
+            lines = chunk.split(b"\n")
+            # The first piece may be a partial line unless we hit the start
+            carry = lines.pop(0) if pos > 0 else b""
+            offset = pos + len(carry) + (1 if pos > 0 else 0)
+            starts = []
+            for line in lines:
+                starts.append(offset)
+                offset += len(line) + 1
+            for line, start in zip(reversed(lines), reversed(starts)):
+                if not line.strip():
+                    continue
+                consumed = True
+                event = _decode(line)
+                if event is None:
+                    continue
+                if since is not None and event.get("ts") is not None and event["ts"] < since:
+                    page.next_cursor = None
+                    page.reached_since = True
+                    return page
+                if match(event):
+                    page.events.append(event)
+                    if len(page.events) >= limit:
+                        page.next_cursor = start if start > 0 else None
+                        return page
+            if scanned >= scan_limit and pos > 0 and consumed:
+                page.next_cursor = pos + len(carry) + 1
+                return page
+        if carry.strip():
+            event = _decode(carry)
+            if event is not None and match(event):
+                page.events.append(event)
+    return page
+
+
+def read_forward(path: str, after: int = 0, limit: int = 100,
+                 match: Callable[[Dict[str, Any]], bool] = EventFilter(),
+                 scan_limit: int = 8 * 1024 * 1024) -> Page:
+    """
+    Oldest-first page of complete lines starting at byte offset `after`.
+    `next_cursor` is the offset just past the last line consumed, which is
+    what a live tail polls from.
+    """
+    page = Page(next_cursor=after)
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return page
+    with f:
+        f.seek(after)
+        pos = after
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Writer is mid-append; pick it up next time
+            pos += len(line)
+            event = _decode(line) if line.strip() else None
+            if event is not None and match(event):
+                page.events.append(event)
+            if len(page.events) >= limit or pos - after >= scan_limit:
+                break
+        page.next_cursor = pos
+        page.tail = max(pos, _complete_end(f, os.fstat(f.fileno()).st_size))
+    return page
+
+
+def log_end(path: str) -> int:
+    """Offset just past the last complete line of a log file"""
+    try:
+        with open(path, "rb") as f:
+            return _complete_end(f, os.fstat(f.fileno()).st_size)
+    except FileNotFoundError:
+        return 0
+
+
+def _complete_end(f, size: int) -> int:
+    """Offset just past the last newline (ignores a torn final line)"""
+    pos = size
+    while pos > 0:
+        step = min(BLOCK_SIZE, pos)
+        f.seek(pos - step)
+        chunk = f.read(step)
+        idx = chunk.rfind(b"\n")
+        if idx >= 0:
+            return pos - step + idx + 1
+        pos -= step
+    return 0
+
+
+class EventLogReader:
+    """
+    Reads a segmented log written by EventLogWriter.
+    Cursors are opaque ints packing (segment, offset). The sparse `.idx`
+    sidecars let time-bounded reads start next to the requested window
+    instead of scanning from either end.
+    """
+    def __init__(self, directory: str = "data/log"):
+        self.directory = directory
+        self._index_cache: Dict[int, Tuple[int, List[float], List[int]]] = {}
+
+    def tail(self) -> int:
+        segments = list_segments(self.directory)
+        if not segments:
+            return 0
+        last = segments[-1]
+        return make_cursor(last, log_end(segment_path(self.directory, last)))
+
+    def read_backward(self, cursor: Optional[int] = None, limit: int = 100,
+                      match: EventFilter = EventFilter(),
+                      scan_limit: int = 8 * 1024 * 1024) -> Page:
+        """Newest-first page before `cursor` (default: the end, or the `until` bound)"""
+        segments = list_segments(self.directory)
+        result = Page(tail=self.tail())
+        if not segments:
+            return result
+        if cursor is None:
+            until = getattr(match, "until", None)
+            cursor = self._seek(segments, until, side="after") if until is not None else None
+        segment, offset = split_cursor(cursor) if cursor is not None else (segments[-1], None)
+        for seg in reversed([s for s in segments if s <= segment]):
+            before = offset if seg == segment else None
+            page = read_backward(segment_path(self.directory, seg), before=before,
+                                 limit=limit - len(result.events), match=match,
+                                 scan_limit=scan_limit)
+            result.events.extend(page.events)
+            scan_limit -= page.tail if before is None else min(before, page.tail)
+            if page.next_cursor is not None:
+                result.next_cursor = make_cursor(seg, page.next_cursor)
+                return result
+            if page.reached_since or seg == segments[0]:
+                return result
+            if len(result.events) >= limit or scan_limit <= 0:
+                # Resume from the start of this segment, i.e. the end of the previous one
+                result.next_cursor = make_cursor(seg, 0)
+                return result
+        return result
+
+    def read_forward(self, cursor: Optional[int] = None, limit: int = 100,
+                     match: EventFilter = EventFilter(),
+                     scan_limit: int = 8 * 1024 * 1024) -> Page:
+        """Oldest-first page from `cursor` (default: the start, or the `since` bound)"""
+        segments = list_segments(self.directory)
+        since = getattr(match, "since", None)
+        if since is not None and segments:
+            start = self._seek(segments, since, side="before")
+            cursor = start if cursor is None else max(cursor, start)
+        cursor = cursor or (make_cursor(segments[0], 0) if segments else 0)
+        segment, offset = split_cursor(cursor)
+        result = Page(next_cursor=cursor)
+        for seg in [s for s in segments if s >= segment]:
+            after = offset if seg == segment else 0
+            page = read_forward(segment_path(self.directory, seg), after=after,
+                                limit=limit - len(result.events), match=match,
+                                scan_limit=scan_limit)
+            result.events.extend(page.events)
+            result.next_cursor = make_cursor(seg, page.next_cursor)
+            result.tail = make_cursor(seg, page.tail)
+            scan_limit -= page.next_cursor - after
+            if len(result.events) >= limit or scan_limit <= 0:
+                break
+            if page.next_cursor < page.tail:
+                break  # Stopped short of the segment end
+            if seg != segments[-1]:
+                # Continue from the start of the next segment
+                result.next_cursor = make_cursor(seg + 1, 0)
+        return result
+
+    def _seek(self, segments: List[int], ts: float, side: str) -> int:
+        """
+        side="before": cursor of the last index point older than `ts`
+        (everything before it is older too).
+        side="after": cursor of the first index point newer than `ts`
+        (everything after it is newer too).
+        """
+        if side == "before":
+            for seg in reversed(segments):
+                stamps, offsets = self._load_index(seg)
+                pos = bisect_left(stamps, ts)
+                if pos > 0:
+                    return make_cursor(seg, offsets[pos - 1])
+            return make_cursor(segments[0], 0)
+        for seg in segments:
+            stamps, offsets = self._load_index(seg)
+            pos = bisect_right(stamps, ts)
+            if pos < len(stamps):
+                return make_cursor(seg, offsets[pos])
+        return self.tail()
+
+    def _load_index(self, segment: int) -> Tuple[List[float], List[int]]:
+        path = index_path(self.directory, segment)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return [], []
+        cached = self._index_cache.get(segment)
+        if cached and cached[0] == size:
+            return cached[1], cached[2]
+        stamps, offsets = [], []
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and line.endswith("\n"):
+                    stamps.append(float(parts[0]))
+                    offsets.append(int(parts[1]))
+        self._index_cache[segment] = (size, stamps, offsets)
+        return stamps, offsets
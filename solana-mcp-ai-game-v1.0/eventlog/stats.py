@@ -0,0 +1,176 @@
+
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, List, Optional
+
+from eventlog.reader import EventLogReader, list_segments, log_end, segment_path, split_cursor
+from memory.wal import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+# Buckets kept per resolution (None: all); bounds memory and checkpoint size
+RETENTION = {"minute": 2 * 24 * 60, "hour": 90 * 24, "day": None}
+CHECKPOINT_VERSION = 1
+
+
+class EventStats:
+    """
+    Counters over an event log, advanced incrementally: events and proofs
+    (events carrying a zk_hash) per agent and per skill, plus time buckets
+    at minute/hour/day resolution. refresh() reads only what was appended
+    since the last call. The position and counters are checkpointed to
+    `checkpoint_path`, so a restart resumes from there instead of
+    rescanning the whole log.
+    """
+    def __init__(self, directory: str = "data/log",
+                 checkpoint_path: Optional[str] = None,
+                 checkpoint_every: int = 50_000,
+                 retention: Optional[Dict[str, Optional[int]]] = None):
+        self.directory = directory
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.retention = dict(RETENTION, **(retention or {}))
+        self._reader = EventLogReader(directory)
+        self._lock = threading.Lock()
+        self._reset()
+        if checkpoint_path:
+            self._load_checkpoint()
+
+    def _reset(self) -> None:
+        self.cursor = 0
+        self.events = 0
+        self.proofs = 0
+        self.agents: Dict[str, List[int]] = {}
+        self.skills: Dict[str, List[int]] = {}
+        self._buckets: Dict[str, Dict[int, List[int]]] = {r: {} for r in RESOLUTIONS}
+        self._starts: Dict[str, List[int]] = {r: [] for r in RESOLUTIONS}
+        self._unsaved = 0
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        """Count one event"""
+        proof = 1 if event.get("zk_hash") else 0
+        self.events += 1
+        self.proofs += proof
+        for counters, key in ((self.agents, event.get("agent")), (self.skills, event.get("skill"))):
+            counts = counters.setdefault(str(key), [0, 0])
+            counts[0] += 1
+            counts[1] += proof
+        ts = event.get("ts")
+        if isinstance(ts, (int, float)):
+            for resolution, width in RESOLUTIONS.items():
+                self._bucket(resolution, int(ts // width * width), 1, proof)
+
+    def _bucket(self, resolution: str, start: int, events: int, proofs: int) -> None:
+        buckets = self._buckets[resolution]
+        counts = buckets.get(start)
+        if counts is None:
+            starts = self._starts[resolution]
+            keep = self.retention.get(resolution)
+            if keep and len(starts) >= keep and start < starts[0]:
+                return  # Older than anything retained
+            counts = buckets[start] = [0, 0]
+            if not starts or start > starts[-1]:
+                starts.append(start)
+            else:
+                insort(starts, start)
+            if keep and len(starts) > keep:
+                del buckets[starts.pop(0)]
+        counts[0] += events
+        counts[1] += proofs
+
+    def refresh(self, page_size: int = 10_000) -> int:
+        """Fold in events appended since the last refresh; returns how many"""
+        with self._lock:
+            seen = 0
+            while True:
+                page = self._reader.read_forward(self.cursor, limit=page_size)
+                for event in page.events:
+                    self.observe(event)
+                seen += len(page.events)
+                if page.next_cursor is None or page.next_cursor == self.cursor:
+                    break
+                self.cursor = page.next_cursor
+            self._unsaved += seen
+            if self.checkpoint_path and self._unsaved >= self.checkpoint_every:
+                self._save_checkpoint()
+            return seen
+
+    def snapshot(self, resolution: str = "hour", since: Optional[float] = None,
+                 until: Optional[float] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Totals plus the buckets at `resolution` overlapping [since, until];
+        with `limit`, only the newest that many.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}'")
+        width = RESOLUTIONS[resolution]
+        with self._lock:
+            starts = self._starts[resolution]
+            lo = 0 if since is None else bisect_left(starts, since // width * width)
+            hi = len(starts) if until is None else bisect_right(starts, until)
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            buckets = self._buckets[resolution]
+            return {
+                "events": self.events,
+                "proofs": self.proofs,
+                "agents": {k: {"events": e, "proofs": p} for k, (e, p) in self.agents.items()},
+                "skills": {k: {"events": e, "proofs": p} for k, (e, p) in self.skills.items()},
+                "resolution": resolution,
+                "buckets": [{"start": s, "events": buckets[s][0], "proofs": buckets[s][1]}
+                            for s in starts[lo:hi]],
+                "cursor": self.cursor,
+            }
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            if self.checkpoint_path:
+                self._save_checkpoint()
+
+    def _save_checkpoint(self) -> None:
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "cursor": self.cursor,
+            "events": self.events,
+            "proofs": self.proofs,
+            "agents": self.agents,
+            "skills": self.skills,
+            "buckets": {r: [[s, *self._buckets[r][s]] for s in self._starts[r]] for r in RESOLUTIONS},
+        }
+        # Workers sharing the log save here too; each writes its own temp file
+        write_json_atomic(self.checkpoint_path, state)
+        self._unsaved = 0
+
+    def _load_checkpoint(self) -> None:
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable stats checkpoint {self.checkpoint_path}: {str(e)}")
+            return
+        if state.get("version") != CHECKPOINT_VERSION or not self._cursor_valid(state["cursor"]):
+            # The log was replaced or truncated; count it from the start
+            logger.warning(f"Stats checkpoint {self.checkpoint_path} doesn't match the log, rebuilding")
+            return
+        self.cursor = state["cursor"]
+        self.events = state["events"]
+        self.proofs = state["proofs"]
+        self.agents = state["agents"]
+        self.skills = state["skills"]
+        for resolution in RESOLUTIONS:
+            for start, events, proofs in state["buckets"].get(resolution, []):
+                self._bucket(resolution, start, events, proofs)
+        logger.info(f"Loaded stats checkpoint at {self.events} events")
+
+    def _cursor_valid(self, cursor: int) -> bool:
+        if cursor == 0:
+            return True
+        segment, offset = split_cursor(cursor)
+        if segment not in list_segments(self.directory):
+            return False
+        return offset <= log_end(segment_path(self.directory, segment))
@@ -0,0 +1,194 @@
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: one writer per directory
+    fcntl = None
+
+from eventlog.reader import index_path, list_segments, read_backward, segment_path
+
+logger = logging.getLogger(__name__)
+
+
+class EventLogWriter:
+    """
+    Buffered, rotating JSONL event log.
+    Appends are buffered and written once `flush_bytes` accumulate or
+    `flush_interval` seconds pass. Segments are capped at `segment_bytes`;
+    each has a sparse `.idx` sidecar of "timestamp offset" lines, one per
+    `index_interval` bytes, so readers can seek to a time range.
+    Several writers (processes) may share a directory: each flush holds an
+    exclusive lock on `.lock` there and re-reads the current segment and its
+    size, so rotation and index offsets follow the real files. Readers seek
+    by `ts`, so a `ts` the writer stamped is raised at flush to the newest
+    one already logged if another writer got ahead; a `ts` the caller set
+    is written as given.
+    """
+    def __init__(self, directory: str = "data/log",
+                 segment_bytes: int = 64 * 1024 * 1024,
+                 flush_bytes: int = 64 * 1024,
+                 flush_interval: float = 1.0,
+                 index_interval: int = 64 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, ".lock"), "a")
+
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._buffered_ts: List[Optional[float]] = []
+        self._stamped: List[Optional[Dict[str, Any]]] = []   # Event, if we set its ts
+        self._buffer_size = 0
+        self._last_flush = time.monotonic()
+
+        segments = list_segments(directory)
+        self._segment = segments[-1] if segments else 1
+        self._open_segment(self._segment)
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="eventlog-flusher", daemon=True)
+        self._flusher.start()
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """Buffer one event; `ts` (epoch seconds) is added if missing"""
+        event = dict(event)
+        stamped = "ts" not in event
+        if stamped:
+            event["ts"] = time.time()
+        line = (json.dumps(event) + "\n").encode()
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered_ts.append(event["ts"])
+            self._stamped.append(event if stamped else None)
+            self._buffer_size += len(line)
+            if self._buffer_size >= self.flush_bytes:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self._stop.set()
+        if threading.current_thread() is not self._flusher:
+            self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+            self._index.close()
+            self._lock_file.close()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval / 2):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Event log flush failed: {str(e)}")
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            self._sync_segment()
+            if any(self._stamped):
+                self._restamp(self._last_ts())
+            self._write_buffer()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+        self._buffer, self._buffered_ts, self._stamped, self._buffer_size = [], [], [], 0
+
+    def _sync_segment(self) -> None:
+        """Catch up with rotations and appends by other writers"""
+        segments = list_segments(self.directory)
+        if segments and segments[-1] > self._segment:
+            self._file.close()
+            self._index.close()
+            self._segment = segments[-1]
+            self._open_segment(self._segment)
+        self._size = os.fstat(self._file.fileno()).st_size
+
+    def _last_ts(self) -> Optional[float]:
+        """Newest `ts` in the log; the segment before helps right after a rotation"""
+        for segment in (self._segment, self._segment - 1):
+            newest = read_backward(segment_path(self.directory, segment), limit=1).events
+            if newest:
+                ts = newest[0].get("ts")
+                return ts if isinstance(ts, (int, float)) else None
+        return None
+
+    def _restamp(self, newest: Optional[float]) -> None:
+        """Keep stamped events from landing behind what other writers logged"""
+        for i, event in enumerate(self._stamped):
+            ts = self._buffered_ts[i]
+            if event is not None and newest is not None and ts < newest:
+                event["ts"] = ts = newest
+                self._buffer[i] = (json.dumps(event) + "\n").encode()
+                self._buffered_ts[i] = ts
+            if isinstance(ts, (int, float)) and (newest is None or ts > newest):
+                newest = ts
+
+    def _write_buffer(self) -> None:
+        chunk = []
+        index_lines = []
+        for line, ts in zip(self._buffer, self._buffered_ts):
+            if self._size > 0 and self._size + len(line) > self.segment_bytes:
+                self._write(chunk, index_lines)
+                chunk, index_lines = [], []
+                self._rotate()
+            if self._size == 0 or self._size - self._last_indexed >= self.index_interval:
+                index_lines.append(f"{ts} {self._size}\n")
+                self._last_indexed = self._size
+            chunk.append(line)
+            self._size += len(line)
+        self._write(chunk, index_lines)
+
+    def _write(self, chunk: List[bytes], index_lines: List[str]) -> None:
+        if chunk:
+            self._file.write(b"".join(chunk))
+            self._file.flush()
+        if index_lines:
+            # Written after the data so an index entry never points past EOF
+            self._index.write("".join(index_lines))
+            self._index.flush()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._index.close()
+        self._segment += 1
+        self._open_segment(self._segment)
+        logger.info(f"Rotated event log to segment {self._segment}")
+
+    def _open_segment(self, segment: int) -> None:
+        path = segment_path(self.directory, segment)
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        self._index = open(index_path(self.directory, segment), "a")
+        # Index the first append after a restart
+        self._last_indexed = -self.index_interval
+
+
+_event_log: Optional[EventLogWriter] = None
+
+
+def get_event_log() -> Optional[EventLogWriter]:
+    """Process-wide event log, if one has been configured"""
+    return _event_log
+
+
+def set_event_log(writer: Optional[EventLogWriter]) -> None:
+    global _event_log
+    _event_log = writer
@@ -0,0 +1,153 @@
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from llm.decoder import DEFAULT_DECISIONS, NOOP, validate_skill_calls
+
+logger = logging.getLogger(__name__)
+
+Request = Tuple[str, Dict[str, Any]]
+
+
+def request_key(agent: str, context: Dict[str, Any]) -> str:
+    payload = json.dumps([agent, context], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FakeBackend:
+    """
+    Local stand-in for a batched model endpoint. Every call costs `latency`
+    seconds plus `per_item_latency` per request, and answers from
+    `decisions` (agent -> raw output) like mock_llm_decision.
+    """
+    def __init__(self, latency: float = 0.05, per_item_latency: float = 0.0,
+                 decisions: Optional[Dict[str, Any]] = None):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.decisions = DEFAULT_DECISIONS if decisions is None else decisions
+        self.batch_sizes: List[int] = []
+
+    async def decide_batch(self, requests: List[Request]) -> List[Any]:
+        self.batch_sizes.append(len(requests))
+        await asyncio.sleep(self.latency + self.per_item_latency * len(requests))
+        return [self.decisions.get(agent, NOOP) for agent, _ in requests]
+
+
+class CallableBackend:
+    """Adapts a sync per-request decision function; each batch runs in one worker thread"""
+    def __init__(self, fn: Callable[[str, Dict[str, Any]], Any]):
+        self.fn = fn
+
+    async def decide_batch(self, requests: List[Request]) -> List[Any]:
+        return await asyncio.to_thread(lambda: [self.fn(agent, ctx) for agent, ctx in requests])
+
+
+@dataclass
+class ClientStats:
+    requests: int = 0
+    coalesced: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+    batch_sizes: List[int] = field(default_factory=list)
+
+
+class _LoopState:
+    def __init__(self, max_in_flight: int):
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.pending: List[Tuple[str, str, Dict[str, Any], asyncio.Future]] = []
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: set = set()
+
+
+class AsyncDecisionClient:
+    """
+    Async front end for skill decisions.
+    Identical requests that are pending or in flight share one backend slot.
+    Distinct requests arriving within `batch_window` seconds go out together,
+    up to `max_batch` per call, with at most `max_in_flight` backend calls
+    at once. Each batch's outputs are validated against SkillCall together.
+    """
+    def __init__(self, backend, max_batch: int = 64, batch_window: float = 0.005,
+                 max_in_flight: int = 8):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_in_flight = max_in_flight
+        self.stats = ClientStats()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._state: Optional[_LoopState] = None
+
+    async def decide(self, agent: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        state = self._loop_state()
+        self.stats.requests += 1
+        key = request_key(agent, context)
+        future = state.in_flight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            state.in_flight[key] = future
+            state.pending.append((key, agent, context, future))
+            if len(state.pending) >= self.max_batch:
+                self._flush(state)
+            elif state.timer is None:
+                state.timer = asyncio.get_running_loop().call_later(
+                    self.batch_window, self._flush, state)
+        result = await asyncio.shield(future)
+        return {"action": result["action"], "params": dict(result["params"])}
+
+    async def decide_many(self, requests: Sequence[Request]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.decide(agent, ctx) for agent, ctx in requests)))
+
+    def _loop_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Loop-bound primitives can't be shared, e.g. across asyncio.run calls
+            self._loop = loop
+            self._state = _LoopState(self.max_in_flight)
+        return self._state
+
+    def _flush(self, state: _LoopState) -> None:
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        while state.pending:
+            batch = state.pending[:self.max_batch]
+            del state.pending[:self.max_batch]
+            task = asyncio.get_running_loop().create_task(self._run_batch(state, batch))
+            state.tasks.add(task)
+            task.add_done_callback(state.tasks.discard)
+
+    async def _run_batch(self, state: _LoopState, batch) -> None:
+        try:
+            async with state.semaphore:
+                self.stats.batches += 1
+                self.stats.batch_sizes.append(len(batch))
+                outputs = await self.backend.decide_batch([(agent, ctx) for _, agent, ctx, _ in batch])
+            if len(outputs) != len(batch):
+                raise ValueError(f"Backend returned {len(outputs)} results for {len(batch)} requests")
+            for (_, _, _, future), result in zip(batch, validate_skill_calls(outputs)):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            self.stats.failed_batches += 1
+            logger.error(f"Decision batch of {len(batch)} failed: {str(e)}")
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key, _, _, _ in batch:
+                state.in_flight.pop(key, None)
+
+
+def timed_tick(client: AsyncDecisionClient, requests: Sequence[Request]) -> Tuple[List[Dict[str, Any]], float]:
+    """Run one tick of decisions to completion; returns (decisions, seconds)"""
+    start = time.perf_counter()
+    decisions = asyncio.run(client.decide_many(requests))
+    return decisions, time.perf_counter() - start
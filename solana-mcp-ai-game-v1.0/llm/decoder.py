@@ -1,23 +1,44 @@
 
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import Any, List
 import random
 
 class SkillCall(BaseModel):
     action: str
     params: dict
 
+NOOP = {"action": "noop", "params": {}}
+
+DEFAULT_DECISIONS = {
+    "tavernkeeper": {"action": "brew_item", "params": {"flavor": "elven"}},
+    "miner": {"action": "mine", "params": {"location": "deep_cave"}},
+    "thief": {"action": "steal", "params": {"target": "bag"}},
+    "guard": {"action": "inspect", "params": {"area": "market"}}
+}
+
+_skill_calls = TypeAdapter(List[SkillCall])
+
 def mock_llm_decision(agent: str, context: dict) -> dict:
     # Simulate structured function call output
-    options = {
-        "tavernkeeper": {"action": "brew_item", "params": {"flavor": "elven"}},
-        "miner": {"action": "mine", "params": {"location": "deep_cave"}},
-        "thief": {"action": "steal", "params": {"target": "bag"}},
-        "guard": {"action": "inspect", "params": {"area": "market"}}
-    }
-    output = options.get(agent, {"action": "noop", "params": {}})
+    output = DEFAULT_DECISIONS.get(agent, NOOP)
     try:
         validated = SkillCall(**output)
         return validated.dict()
     except ValidationError as e:
         print("❌ Invalid Skill:", e)
-        return {"action": "noop", "params": {}}
+        return dict(NOOP)
+
+def validate_skill_calls(outputs: List[Any]) -> List[dict]:
+    """Validate a batch of model outputs at once; invalid entries become noop"""
+    try:
+        return [call.model_dump() for call in _skill_calls.validate_python(outputs)]
+    except ValidationError:
+        pass
+    results = []
+    for output in outputs:
+        try:
+            results.append(SkillCall.model_validate(output).model_dump())
+        except ValidationError as e:
+            print("❌ Invalid Skill:", e)
+            results.append(dict(NOOP))
+    return results
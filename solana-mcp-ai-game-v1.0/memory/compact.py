@@ -0,0 +1,392 @@
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from heapq import merge
+from itertools import islice
+from operator import itemgetter
+import logging
+import sys
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from memory.graph import MemoryEntry
+
+logger = logging.getLogger(__name__)
+
+
+class _RowIndex:
+    """
+    Rows of one topic/agent/tag ordered by (timestamp, row).
+    Evicted rows are skipped lazily and purged once they outnumber live ones.
+    """
+    __slots__ = ("rows", "head", "dead")
+
+    def __init__(self):
+        self.rows = array("I")
+        self.head = 0    # rows[:head] are evicted
+        self.dead = 0    # evicted rows after head
+
+    def live(self) -> int:
+        return len(self.rows) - self.head - self.dead
+
+
+class RetentionPolicy:
+    """Per-topic retention: drop entries older than `ttl` seconds or beyond `max_size`"""
+    __slots__ = ("ttl", "max_size")
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = ttl
+        self.max_size = max_size
+
+
+class CompactMemoryGraph:
+    """
+    Column-oriented MemoryGraph backend for long-running simulations.
+    Entries live in typed arrays addressed by internal row numbers;
+    agent, topic and tag names are interned once in a string table and
+    tag combinations are shared. MemoryEntry objects are materialized
+    only when returned from a read.
+    """
+    def __init__(self, default_retention: Optional[RetentionPolicy] = None,
+                 vacuum_min_rows: int = 4096):
+        self._strings: List[str] = []            # Interned agent/topic/tag names
+        self._string_ids: Dict[str, int] = {}
+        self._tagsets: List[Tuple[int, ...]] = [()]
+        self._tagset_ids: Dict[Tuple[int, ...], int] = {(): 0}
+
+        # Columns, one slot per row
+        self._uid_hi = array("Q")
+        self._uid_lo = array("Q")
+        self._ts = array("d")
+        self._agent = array("I")
+        self._topic = array("I")
+        self._tagset = array("I")
+        self._alive = bytearray()
+        self._content: List[Any] = []
+        self._refs: Dict[int, List[int]] = {}    # Sparse: row -> referenced rows
+
+        self._row_of: Dict[int, int] = {}        # uuid int -> row
+        self._topics: Dict[int, _RowIndex] = defaultdict(_RowIndex)
+        self._agent_index: Dict[int, _RowIndex] = defaultdict(_RowIndex)
+        self._tag_index: Dict[int, _RowIndex] = defaultdict(_RowIndex)
+        self._time_index = _RowIndex()
+
+        self._retention: Dict[str, RetentionPolicy] = {}
+        self._default_retention = default_retention
+        self._vacuum_min_rows = vacuum_min_rows
+        self._live = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    # ---- Writes ---------------------------------------------------------
+
+    def set_retention(self, topic: str, ttl: Optional[float] = None,
+                      max_size: Optional[int] = None) -> None:
+        """Configure retention for a topic and apply it immediately"""
+        self._retention[topic] = RetentionPolicy(ttl=ttl, max_size=max_size)
+        if topic in self._string_ids:
+            self._enforce(self._string_ids[topic])
+
+    def add_memory(self, topic: str, agent: str, content: Any,
+                   tags: Optional[List[str]] = None,
+                   timestamp: Optional[float] = None) -> MemoryEntry:
+        """Add a memory entry with optional tags"""
+        ts = time.time() if timestamp is None else timestamp
+        uid = uuid.uuid4().int
+        topic_id = self._intern(topic)
+        agent_id = self._intern(agent)
+        tag_ids = tuple(sorted({self._intern(t) for t in (tags or [])}))
+        tagset = self._tagset_ids.get(tag_ids)
+        if tagset is None:
+            tagset = len(self._tagsets)
+            self._tagsets.append(tag_ids)
+            self._tagset_ids[tag_ids] = tagset
+
+        row = len(self._ts)
+        self._uid_hi.append(uid >> 64)
+        self._uid_lo.append(uid & 0xFFFFFFFFFFFFFFFF)
+        self._ts.append(ts)
+        self._agent.append(agent_id)
+        self._topic.append(topic_id)
+        self._tagset.append(tagset)
+        self._alive.append(1)
+        self._content.append(content)
+        self._row_of[uid] = row
+        self._live += 1
+
+        self._index_add(self._topics[topic_id], row)
+        self._index_add(self._agent_index[agent_id], row)
+        for tag_id in tag_ids:
+            self._index_add(self._tag_index[tag_id], row)
+        self._index_add(self._time_index, row)
+
+        # Materialize before retention runs: it may evict or renumber this row
+        entry = self._materialize(row)
+        self._enforce(topic_id)
+        logger.debug(f"Added memory: {topic} / {agent} / {entry.entry_id}")
+        return entry
+
+    def connect_memories(self, source_id: str, target_id: str) -> bool:
+        """Create a reference between two memory entries"""
+        source = self._lookup(source_id)
+        target = self._lookup(target_id)
+        if source is None or target is None:
+            return False
+        self._refs.setdefault(source, []).append(target)
+        return True
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Apply TTL policies to every topic; returns the number of evicted entries"""
+        before = self.evicted
+        for topic_id in list(self._topics):
+            self._enforce(topic_id, now)
+        return self.evicted - before
+
+    # ---- Reads ----------------------------------------------------------
+
+    def get(self, entry_id: str) -> Optional[MemoryEntry]:
+        row = self._lookup(entry_id)
+        return None if row is None else self._materialize(row)
+
+    def get_topic(self, topic: str) -> List[MemoryEntry]:
+        """Get all memories for a topic"""
+        index = self._index_for(self._topics, topic)
+        if index is None:
+            return []
+        alive = self._alive
+        return [self._materialize(r) for r in index.rows[index.head:] if alive[r]]
+
+    def get_recent(self, topic: str, limit: int = 3) -> List[MemoryEntry]:
+        """Get most recent memories for a topic"""
+        index = self._index_for(self._topics, topic)
+        if index is None:
+            return []
+        return [self._materialize(r) for _, r in islice(self._iter_newest(index), limit)]
+
+    def query(self,
+              topics: Optional[List[str]] = None,
+              agents: Optional[List[str]] = None,
+              tags: Optional[List[str]] = None,
+              time_range: Optional[Tuple[float, float]] = None,
+              limit: int = 100) -> List[MemoryEntry]:
+        """
+        Advanced query with multiple filters
+        Returns entries that match ALL specified criteria, newest first
+        """
+        start, end = time_range if time_range else (None, None)
+        candidates = []
+        if topics:
+            candidates.append([ix for ix in (self._index_for(self._topics, t) for t in set(topics)) if ix])
+        if agents:
+            candidates.append([ix for ix in (self._index_for(self._agent_index, a) for a in set(agents)) if ix])
+        for tag in set(tags or []):
+            ix = self._index_for(self._tag_index, tag)
+            candidates.append([ix] if ix else [])
+        if not candidates:
+            candidates.append([self._time_index])
+
+        driver = min(candidates, key=lambda ixs: sum(self._count(ix, start, end) for ix in ixs))
+        if not driver:
+            return []
+        topic_set = {self._string_ids.get(t) for t in topics} if topics else None
+        agent_set = {self._string_ids.get(a) for a in agents} if agents else None
+        tag_set = {self._string_ids.get(t) for t in tags} if tags else None
+
+        streams = [self._iter_newest(ix, start, end) for ix in driver]
+        stream = streams[0] if len(streams) == 1 else merge(*streams, key=itemgetter(0), reverse=True)
+        results = []
+        for _, row in stream:
+            if len(results) >= limit:
+                break
+            if topic_set is not None and self._topic[row] not in topic_set:
+                continue
+            if agent_set is not None and self._agent[row] not in agent_set:
+                continue
+            if tag_set is not None and not tag_set.issubset(self._tagsets[self._tagset[row]]):
+                continue
+            results.append(self._materialize(row))
+        return results
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Approximate bytes held by this graph, by component.
+        Content is measured shallowly (sys.getsizeof per item).
+        """
+        getsize = sys.getsizeof
+        columns = sum(getsize(c) for c in (self._uid_hi, self._uid_lo, self._ts, self._agent,
+                                           self._topic, self._tagset, self._alive, self._content))
+        id_map = getsize(self._row_of) + sum(getsize(k) for k in self._row_of)
+        indexes = sum(getsize(ix.rows)
+                      for group in (self._topics, self._agent_index, self._tag_index)
+                      for ix in group.values()) + getsize(self._time_index.rows)
+        references = getsize(self._refs) + sum(getsize(v) for v in self._refs.values())
+        strings = (getsize(self._strings) + getsize(self._string_ids)
+                   + sum(getsize(s) for s in self._strings)
+                   + getsize(self._tagsets) + getsize(self._tagset_ids)
+                   + sum(getsize(t) for t in self._tagsets))
+        content = sum(getsize(c) for c in self._content if c is not None)
+        usage = {
+            "entries": self._live,
+            "rows": len(self._ts),
+            "columns": columns,
+            "id_map": id_map,
+            "indexes": indexes,
+            "references": references,
+            "strings": strings,
+            "content": content,
+        }
+        usage["total"] = columns + id_map + indexes + references + strings + content
+        return usage
+
+    # ---- Internals ------------------------------------------------------
+
+    def _intern(self, name: str) -> int:
+        sid = self._string_ids.get(name)
+        if sid is None:
+            sid = len(self._strings)
+            self._strings.append(sys.intern(name))
+            self._string_ids[name] = sid
+        return sid
+
+    def _lookup(self, entry_id: str) -> Optional[int]:
+        try:
+            row = self._row_of.get(int(entry_id, 16))
+        except (TypeError, ValueError):
+            return None
+        return row if row is not None and self._alive[row] else None
+
+    def _index_for(self, group: Dict[int, _RowIndex], name: str) -> Optional[_RowIndex]:
+        sid = self._string_ids.get(name)
+        if sid is None or sid not in group:
+            return None
+        return group[sid]
+
+    def _index_add(self, index: _RowIndex, row: int) -> None:
+        rows, ts = index.rows, self._ts
+        if len(rows) == index.head or ts[row] >= ts[rows[-1]]:
+            rows.append(row)
+        else:
+            insort(rows, row, lo=index.head, key=ts.__getitem__)
+
+    def _bounds(self, index: _RowIndex, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        rows, key = index.rows, self._ts.__getitem__
+        lo = index.head if start is None else bisect_left(rows, start, lo=index.head, key=key)
+        hi = len(rows) if end is None else bisect_right(rows, end, lo=index.head, key=key)
+        return lo, max(lo, hi)
+
+    def _count(self, index: _RowIndex, start: Optional[float], end: Optional[float]) -> int:
+        if start is None and end is None:
+            return index.live()
+        lo, hi = self._bounds(index, start, end)
+        return hi - lo
+
+    def _iter_newest(self, index: _RowIndex, start: Optional[float] = None,
+                     end: Optional[float] = None) -> Iterator[Tuple[float, int]]:
+        lo, hi = self._bounds(index, start, end)
+        rows, ts, alive = index.rows, self._ts, self._alive
+        for i in range(hi - 1, lo - 1, -1):
+            row = rows[i]
+            if alive[row]:
+                yield ts[row], row
+
+    def _uid(self, row: int) -> str:
+        return f"{(self._uid_hi[row] << 64) | self._uid_lo[row]:032x}"
+
+    def _materialize(self, row: int) -> MemoryEntry:
+        strings = self._strings
+        return MemoryEntry(
+            agent_id=strings[self._agent[row]],
+            content=self._content[row],
+            timestamp=self._ts[row],
+            entry_id=self._uid(row),
+            tags={strings[t] for t in self._tagsets[self._tagset[row]]},
+            references=[self._uid(r) for r in self._refs.get(row, ()) if self._alive[r]],
+            topic=strings[self._topic[row]]
+        )
+
+    def _enforce(self, topic_id: int, now: Optional[float] = None) -> None:
+        policy = self._retention.get(self._strings[topic_id], self._default_retention)
+        if policy is None:
+            return
+        index = self._topics.get(topic_id)
+        if index is None:
+            return
+        rows, ts, alive = index.rows, self._ts, self._alive
+        cutoff = None
+        if policy.ttl is not None:
+            cutoff = (time.time() if now is None else now) - policy.ttl
+        evicted = 0
+        while index.head < len(rows):
+            row = rows[index.head]
+            if alive[row]:
+                over_size = policy.max_size is not None and index.live() > policy.max_size
+                expired = cutoff is not None and ts[row] < cutoff
+                if not (over_size or expired):
+                    break
+                self._evict(row, skip=index)
+                evicted += 1
+            else:
+                index.dead -= 1
+            index.head += 1
+        if evicted:
+            self._maybe_purge(index)
+            self._maybe_vacuum()
+
+    def _evict(self, row: int, skip: Optional[_RowIndex] = None) -> None:
+        self._alive[row] = 0
+        self._content[row] = None
+        self._refs.pop(row, None)
+        self._live -= 1
+        self.evicted += 1
+        for index in self._indexes_of(row):
+            if index is skip:
+                continue
+            index.dead += 1
+            self._maybe_purge(index)
+
+    def _indexes_of(self, row: int) -> List[_RowIndex]:
+        indexes = [self._topics[self._topic[row]], self._agent_index[self._agent[row]],
+                   self._time_index]
+        indexes.extend(self._tag_index[t] for t in self._tagsets[self._tagset[row]])
+        return indexes
+
+    def _maybe_purge(self, index: _RowIndex) -> None:
+        if (index.head + index.dead) * 2 <= len(index.rows):
+            return
+        alive = self._alive
+        index.rows = array("I", (r for r in index.rows[index.head:] if alive[r]))
+        index.head = index.dead = 0
+
+    def _maybe_vacuum(self) -> None:
+        """Renumber rows once evicted rows outnumber live ones"""
+        total = len(self._ts)
+        if total < self._vacuum_min_rows or (total - self._live) * 2 <= total:
+            return
+        keep = [r for r in range(total) if self._alive[r]]
+        remap = array("i", [-1]) * total
+        for new, old in enumerate(keep):
+            remap[old] = new
+
+        for name in ("_uid_hi", "_uid_lo", "_ts", "_agent", "_topic", "_tagset"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[r] for r in keep)))
+        self._content = [self._content[r] for r in keep]
+        self._alive = bytearray(b"\x01") * len(keep)
+        self._refs = {remap[src]: [remap[t] for t in targets if remap[t] >= 0]
+                      for src, targets in self._refs.items() if remap[src] >= 0}
+        self._row_of = {(self._uid_hi[r] << 64) | self._uid_lo[r]: r for r in range(len(keep))}
+        for group in (self._topics, self._agent_index, self._tag_index):
+            for sid, index in list(group.items()):
+                rows = array("I", (remap[r] for r in index.rows[index.head:] if remap[r] >= 0))
+                if rows:
+                    index.rows, index.head, index.dead = rows, 0, 0
+                else:
+                    del group[sid]
+        index = self._time_index
+        index.rows = array("I", (remap[r] for r in index.rows[index.head:] if remap[r] >= 0))
+        index.head = index.dead = 0
+        logger.debug(f"Vacuumed compact memory graph: {total} -> {len(keep)} rows")
@@ -1,13 +1,20 @@
 
-from collections import defaultdict
+from collections import defaultdict, deque
+from itertools import islice
 import time
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Callable, Dict, Iterator, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 import json
 import logging
+import os
+import threading
 from datetime import datetime
 import uuid
 
+from memory.time_index import TimeIndex, merge_newest
+from memory.wal import WriteAheadLog, Compactor, write_json_atomic
+from telemetry.tracing import span
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -18,6 +25,7 @@ class MemoryEntry:
     entry_id: str = field(default_factory=lambda: uuid.uuid4().hex)
     tags: Set[str] = field(default_factory=set)
     references: List[str] = field(default_factory=list)
+    topic: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to serializable dictionary"""
@@ -28,67 +36,245 @@ class MemoryEntry:
             "timestamp": self.timestamp,
             "datetime": datetime.fromtimestamp(self.timestamp).isoformat(),
             "tags": list(self.tags),
-            "references": self.references
+            "references": list(self.references),
+            "topic": self.topic
         }
 
-class MemoryGraph:
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemoryEntry":
+        """Rebuild an entry from its serialized form"""
+        return cls(
+            entry_id=data["id"],
+            agent_id=data["agent"],
+            content=data["content"],
+            timestamp=data["timestamp"],
+            tags=set(data.get("tags", [])),
+            references=list(data.get("references", [])),
+            topic=data.get("topic")
+        )
+
+class GraphTraversal:
+    """
+    Reference-graph walks shared by the MemoryGraph implementations.
+    Subclasses provide `_get_entry(entry_id)` and
+    `_neighbors(entry_id, direction, fan_out)`.
+    """
+    def ancestors(self, entry_id: str, max_depth: Optional[int] = None,
+                  **kwargs) -> List[MemoryEntry]:
+        """Entries reachable by following references (what this memory builds on)"""
+        return self.traverse(entry_id, direction="out", max_depth=max_depth, **kwargs)
+    
+    def descendants(self, entry_id: str, max_depth: Optional[int] = None,
+                    **kwargs) -> List[MemoryEntry]:
+        """Entries reachable by following referrers (what builds on this memory)"""
+        return self.traverse(entry_id, direction="in", max_depth=max_depth, **kwargs)
+    
+    def neighborhood(self, entry_id: str, hops: int = 1, **kwargs) -> List[MemoryEntry]:
+        """Entries within `hops` edges in either direction"""
+        return self.traverse(entry_id, direction="both", max_depth=hops, **kwargs)
+    
+    def traverse(self, entry_id: str,
+                 direction: str = "out",
+                 max_depth: Optional[int] = None,
+                 fan_out: Optional[int] = None,
+                 max_nodes: int = 1000,
+                 agents: Optional[List[str]] = None,
+                 tags: Optional[List[str]] = None) -> List[MemoryEntry]:
+        """
+        Breadth-first walk from `entry_id`, nearest entries first.
+        direction: "out" follows references, "in" follows referrers, "both" follows both
+        fan_out: most recent edges followed per entry (None for all)
+        agents/tags: entries that don't match are neither returned nor walked through
+        The start entry is not included; work is bounded by `max_nodes`.
+        """
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"Unknown traversal direction '{direction}'")
+        if self._get_entry(entry_id) is None:
+            return []
+        agent_set = set(agents) if agents else None
+        tag_set = set(tags) if tags else None
+        
+        visited = {entry_id}
+        frontier = deque([(entry_id, 0)])
+        results = []
+        while frontier and len(results) < max_nodes:
+            current, depth = frontier.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbor_id in self._neighbors(current, direction, fan_out):
+                if neighbor_id in visited:
+                    continue
+                visited.add(neighbor_id)
+                neighbor = self._get_entry(neighbor_id)
+                if neighbor is None:
+                    continue
+                if agent_set is not None and neighbor.agent_id not in agent_set:
+                    continue
+                if tag_set is not None and not tag_set <= neighbor.tags:
+                    continue
+                results.append(neighbor)
+                if len(results) >= max_nodes:
+                    break
+                frontier.append((neighbor_id, depth + 1))
+        return results
+
+class MemoryGraph(GraphTraversal):
     """
     Advanced memory graph implementation with indexing, querying,
     and persistence capabilities.
     """
-    def __init__(self, persist_path: Optional[str] = None):
-        self._topics = defaultdict(list)
-        self._agent_index = defaultdict(list)  # Agent -> entry_ids
-        self._tag_index = defaultdict(set)     # Tag -> entry_ids
-        self._entry_map = {}                   # entry_id -> Entry
+    def __init__(self, persist_path: Optional[str] = None,
+                 persist_mode: str = "snapshot",
+                 fsync: str = "interval",
+                 compact_threshold: int = 10000,
+                 compact_interval: float = 5.0,
+                 snapshot_format: str = "json"):
+        """
+        persist_mode "snapshot" rewrites `persist_path` on every write.
+        persist_mode "wal" appends each mutation to `persist_path + ".wal"`
+        and a background compactor folds the log into the snapshot once
+        `compact_threshold` records have accumulated.
+        snapshot_format "binary" writes memory-mappable snapshots (see
+        memory.snapshot). Binary snapshots are served from the mapped file
+        as a read-only base layer; new writes are indexed in memory on top.
+        """
+        if persist_mode not in ("snapshot", "wal"):
+            raise ValueError(f"Unknown persist_mode '{persist_mode}'")
+        if snapshot_format not in ("json", "binary"):
+            raise ValueError(f"Unknown snapshot_format '{snapshot_format}'")
+        # All indices hold entry ids in timestamp order
+        self._topics = defaultdict(TimeIndex)
+        self._agent_index = defaultdict(TimeIndex)  # Agent -> entry_ids
+        self._tag_index = defaultdict(TimeIndex)    # Tag -> entry_ids
+        self._time_index = TimeIndex()              # Every entry
+        self._referrers = defaultdict(list)         # entry_id -> ids referencing it
+        self._entry_map = {}                        # entry_id -> Entry
+        self._base = None                           # Mapped binary snapshot, if loaded
+        self._listeners = []                        # Called with each new entry
+        self._snapshot_format = snapshot_format
         self._persist_path = persist_path
+        self._persist_mode = persist_mode
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()  # One compaction at a time
+        self._seq = 0                          # Last applied mutation number
+        self._wal = None
+        self._compactor = None
         
         if persist_path:
             self._load_from_disk()
+            if persist_mode == "wal":
+                self._recover_wal()
+                self._wal = WriteAheadLog(persist_path + ".wal", fsync=fsync)
+                self._compactor = Compactor(self, interval=compact_interval,
+                                            threshold=compact_threshold)
+                self._compactor.start()
     
     def add_memory(self, topic: str, agent: str, content: Any, 
-                  tags: Optional[List[str]] = None) -> MemoryEntry:
-        """Add a memory entry with optional tags"""
+                  tags: Optional[List[str]] = None,
+                  timestamp: Optional[float] = None) -> MemoryEntry:
+        """Add a memory entry with optional tags (and timestamp, default now)"""
         tags = set(tags or [])
-        entry = MemoryEntry(agent_id=agent, content=content, tags=tags)
+        entry = MemoryEntry(agent_id=agent, content=content, tags=tags, topic=topic)
+        if timestamp is not None:
+            entry.timestamp = timestamp
         
-        # Store in primary topic collection
-        self._topics[topic].append(entry.entry_id)
-        
-        # Update indices
-        self._agent_index[agent].append(entry.entry_id)
-        for tag in tags:
-            self._tag_index[tag].add(entry.entry_id)
-        
-        # Store the actual entry
-        self._entry_map[entry.entry_id] = entry
+        # No agent label of its own: writers pass per-NPC ids
+        with span("memory_write"), self._lock:
+            self._index_entry(entry)
+            self._seq += 1
+            # Taken with the entry indexed, so a new subscriber either sees it
+            # here or in its own backfill
+            listeners = list(self._listeners)
+            
+            # Persist if configured
+            if self._wal:
+                self._log({"op": "add", "seq": self._seq, "entry": entry.to_dict()})
+            elif self._persist_path:
+                self._persist_to_disk()
         
-        # Persist if configured
-        if self._persist_path:
-            self._persist_to_disk()
+        # Outside the lock: a slow listener doesn't stall writers or readers
+        for listener in listeners:
+            try:
+                listener(entry)
+            except Exception as e:
+                logger.error(f"Memory listener {listener!r} failed on {entry.entry_id}: {str(e)}",
+                             exc_info=True)
             
         logger.debug(f"Added memory: {topic} / {agent} / {entry.entry_id}")
         return entry
     
     def connect_memories(self, source_id: str, target_id: str) -> bool:
         """Create a reference between two memory entries"""
-        if source_id not in self._entry_map or target_id not in self._entry_map:
-            return False
-            
-        self._entry_map[source_id].references.append(target_id)
-        if self._persist_path:
-            self._persist_to_disk()
+        with self._lock:
+            if self._get_entry(source_id) is None or self._get_entry(target_id) is None:
+                return False
+            self._connect(source_id, target_id)
         return True
     
+    def _connect(self, source_id: str, target_id: str) -> None:
+        """Record a reference; the target may live in another graph (shard)"""
+        with self._lock:
+            self._link(self._get_entry(source_id), target_id)
+            self._seq += 1
+            if self._wal:
+                self._log({"op": "connect", "seq": self._seq,
+                           "source": source_id, "target": target_id})
+            elif self._persist_path:
+                self._persist_to_disk()
+    
+    def _index_entry(self, entry: MemoryEntry) -> None:
+        """Store an entry and update all indices"""
+        ts, eid = entry.timestamp, entry.entry_id
+        # Store in primary topic collection
+        if entry.topic is not None:
+            self._topics[entry.topic].add(ts, eid)
+        
+        # Update indices
+        self._agent_index[entry.agent_id].add(ts, eid)
+        for tag in entry.tags:
+            self._tag_index[tag].add(ts, eid)
+        self._time_index.add(ts, eid)
+        for target_id in entry.references:
+            self._referrers[target_id].append(eid)
+        
+        # Store the actual entry
+        self._entry_map[entry.entry_id] = entry
+    
+    def subscribe(self, listener: Callable[[MemoryEntry], None]) -> None:
+        """Call `listener` with every entry added from now on, e.g. a search index"""
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def entries(self) -> Iterator[MemoryEntry]:
+        """Every entry, snapshot base first"""
+        if self._base is not None:
+            yield from self._base.entries()
+        with self._lock:
+            current = list(self._entry_map.values())
+        yield from current
+    
+    def __len__(self) -> int:
+        return len(self._entry_map) + (len(self._base) if self._base is not None else 0)
+    
     def get_topic(self, topic: str) -> List[MemoryEntry]:
         """Get all memories for a topic"""
-        entry_ids = self._topics.get(topic, [])
-        return [self._entry_map[eid] for eid in entry_ids if eid in self._entry_map]
+        indexes = self._with_base(self._topics.get(topic), "topic", topic)
+        if not indexes:
+            return []
+        if len(indexes) == 1:
+            ids = indexes[0]
+        else:
+            ids = [eid for _, eid in merge_newest(indexes)]
+            ids.reverse()
+        return [e for e in map(self._get_entry, ids) if e is not None]
     
     def get_recent(self, topic: str, limit: int = 3) -> List[MemoryEntry]:
         """Get most recent memories for a topic"""
-        entries = self.get_topic(topic)
-        return sorted(entries, key=lambda x: x.timestamp, reverse=True)[:limit]
+        indexes = self._with_base(self._topics.get(topic), "topic", topic)
+        if not indexes:
+            return []
+        entries = (self._get_entry(eid) for _, eid in merge_newest(indexes))
+        return list(islice((e for e in entries if e is not None), limit))
     
     def query(self, 
              topics: Optional[List[str]] = None,
@@ -98,85 +284,220 @@ class MemoryGraph:
              limit: int = 100) -> List[MemoryEntry]:
         """
         Advanced query with multiple filters
-        Returns entries that match ALL specified criteria
+        Returns entries that match ALL specified criteria, newest first
         """
-        # Start with all entry IDs
-        result_set = set(self._entry_map.keys())
+        start, end = time_range if time_range else (None, None)
         
-        # Filter by topic
+        # Each filter contributes a candidate stream: topics and agents are
+        # unions of their indices, every tag is a stream of its own.
+        candidates = []
         if topics:
-            topic_entries = set()
-            for topic in topics:
-                topic_entries.update(self._topics.get(topic, []))
-            result_set &= topic_entries
-            
-        # Filter by agent
+            candidates.append([ix for t in set(topics)
+                               for ix in self._with_base(self._topics.get(t), "topic", t)])
         if agents:
-            agent_entries = set()
-            for agent in agents:
-                agent_entries.update(self._agent_index.get(agent, []))
-            result_set &= agent_entries
-        
-        # Filter by tag (require all tags)
-        if tags:
-            tag_entries = set.intersection(
-                *[self._tag_index.get(tag, set()) for tag in tags]
-            )
-            result_set &= tag_entries
+            candidates.append([ix for a in set(agents)
+                               for ix in self._with_base(self._agent_index.get(a), "agent", a)])
+        for tag in set(tags or []):
+            candidates.append(self._with_base(self._tag_index.get(tag), "tag", tag))
+        if not candidates:
+            candidates.append(self._with_base(self._time_index, "time"))
         
-        # Convert to entries
-        results = [self._entry_map[eid] for eid in result_set if eid in self._entry_map]
+        # Drive the scan from the smallest candidate set within the time
+        # range and check the remaining filters against each entry.
+        driver = min(candidates, key=lambda ix: sum(i.count(start, end) for i in ix))
+        if not driver:
+            return []
+        topic_set = set(topics) if topics else None
+        agent_set = set(agents) if agents else None
+        tag_set = set(tags) if tags else None
         
-        # Filter by time range
-        if time_range:
-            start, end = time_range
-            results = [e for e in results if start <= e.timestamp <= end]
-        
-        # Sort by timestamp (newest first) and limit
-        results.sort(key=lambda x: x.timestamp, reverse=True)
-        return results[:limit]
+        results = []
+        for _, eid in merge_newest(driver, start, end):
+            if len(results) >= limit:
+                break
+            entry = self._get_entry(eid)
+            if entry is None:
+                continue
+            if topic_set is not None and entry.topic not in topic_set:
+                continue
+            if agent_set is not None and entry.agent_id not in agent_set:
+                continue
+            if tag_set is not None and not tag_set <= entry.tags:
+                continue
+            results.append(entry)
+        return results
+    
+    def get_references(self, entry_id: str) -> List[MemoryEntry]:
+        """Entries that `entry_id` refers to"""
+        entry = self._get_entry(entry_id)
+        if entry is None:
+            return []
+        return [e for e in map(self._get_entry, list(entry.references)) if e is not None]
+    
+    def get_referrers(self, entry_id: str) -> List[MemoryEntry]:
+        """Entries that refer to `entry_id`"""
+        return [e for e in map(self._get_entry, self._referrer_ids(entry_id)) if e is not None]
+    
+    def _get_entry(self, entry_id: str) -> Optional[MemoryEntry]:
+        entry = self._entry_map.get(entry_id)
+        if entry is None and self._base is not None:
+            entry = self._base.get(entry_id)
+        return entry
+    
+    def _referrer_ids(self, entry_id: str) -> List[str]:
+        ids = self._base.referrer_ids(entry_id) if self._base is not None else []
+        ids.extend(self._referrers.get(entry_id, ()))
+        return ids
+    
+    def _with_base(self, index: Optional[TimeIndex], kind: str, name: Optional[str] = None) -> List:
+        """The in-memory index plus its counterpart in the mapped snapshot"""
+        indexes = [index] if index else []
+        if self._base is not None:
+            mapped = self._base.index(kind, name)
+            if mapped is not None:
+                indexes.append(mapped)
+        return indexes
+    
+    def _neighbors(self, entry_id: str, direction: str, fan_out: Optional[int]) -> List[str]:
+        neighbors = []
+        if direction in ("out", "both"):
+            refs = self._get_entry(entry_id).references
+            neighbors.extend(reversed(refs[-fan_out:] if fan_out else refs))
+        if direction in ("in", "both"):
+            refs = self._referrer_ids(entry_id)
+            neighbors.extend(reversed(refs[-fan_out:] if fan_out else refs))
+        return neighbors
+    
+    def _link(self, source: MemoryEntry, target_id: str) -> None:
+        source.references.append(target_id)
+        if self._base is not None and source.entry_id not in self._entry_map:
+            self._base.keep(source)   # Otherwise the snapshot may evict it
+        self._referrers[target_id].append(source.entry_id)
+    
+    def compact(self) -> None:
+        """Fold the write-ahead log into a fresh snapshot"""
+        if not self._wal:
+            return
+        # A second compaction between our rotate and write would let our
+        # older snapshot replace its newer one after the log was discarded
+        with self._compact_lock:
+            with self._lock:
+                state = self._export_state()
+                self._wal.rotate()
+            # Serialization and fsync happen outside the lock; writers keep
+            # appending to the new log meanwhile.
+            self._write_snapshot(state)
+            self._wal.discard_rotated()
+        logger.debug(f"Compacted memory graph at seq {state['seq']}")
+    
+    def close(self) -> None:
+        """Stop background compaction and flush the log"""
+        if self._compactor:
+            self._compactor.stop()
+            self._compactor = None
+        if self._wal:
+            self._wal.close()
+            self._wal = None
+    
+    def _log(self, record: Dict[str, Any]) -> None:
+        try:
+            self._wal.append(record)
+        except Exception as e:
+            logger.error(f"Failed to append to memory log: {str(e)}")
+    
+    def export_state(self) -> Dict[str, Any]:
+        """Serializable copy of the whole graph, as written to snapshots"""
+        with self._lock:
+            return self._export_state()
+    
+    def load_state(self, data: Dict[str, Any]) -> None:
+        """Add the entries of an exported state to this graph"""
+        # Older snapshots only record topic membership in "topics"
+        topic_of = {eid: topic for topic, ids in data.get("topics", {}).items()
+                    for eid in ids}
+        with self._lock:
+            self._seq = max(self._seq, data.get("seq", 0))
+            for entry_id, entry_data in data.get("entries", {}).items():
+                if self._get_entry(entry_id) is not None:
+                    continue
+                entry = MemoryEntry.from_dict(entry_data)
+                if entry.topic is None:
+                    entry.topic = topic_of.get(entry_id)
+                self._index_entry(entry)
+    
+    def _export_state(self) -> Dict[str, Any]:
+        topics = {k: v.ids() for k, v in self._topics.items()}
+        entries = {}
+        if self._base is not None:
+            for topic in self._base.topics():
+                topics[topic] = self._base.index("topic", topic).ids() + topics.get(topic, [])
+            entries = {e.entry_id: e.to_dict() for e in self._base.entries()}
+        entries.update((k, v.to_dict()) for k, v in self._entry_map.items())
+        return {"seq": self._seq, "topics": topics, "entries": entries}
+    
+    def _write_snapshot(self, state: Dict[str, Any], durable: bool = True) -> None:
+        if self._snapshot_format == "binary":
+            from memory.snapshot import write_snapshot
+            write_snapshot(self._persist_path, map(MemoryEntry.from_dict, state["entries"].values()),
+                           seq=state["seq"], durable=durable)
+        else:
+            write_json_atomic(self._persist_path, state, durable=durable)
     
     def _persist_to_disk(self) -> None:
         """Save memory state to disk"""
         try:
-            with open(self._persist_path, 'w') as f:
-                export_data = {
-                    "topics": {k: v for k, v in self._topics.items()},
-                    "entries": {k: v.to_dict() for k, v in self._entry_map.items()}
-                }
-                json.dump(export_data, f)
+            self._write_snapshot(self._export_state(), durable=False)
         except Exception as e:
             logger.error(f"Failed to persist memory graph: {str(e)}")
     
     def _load_from_disk(self) -> None:
         """Load memory state from disk"""
+        from memory.snapshot import MappedSnapshot, is_binary_snapshot
         try:
-            with open(self._persist_path, 'r') as f:
-                data = json.load(f)
-                
-                # Restore topics
-                self._topics = defaultdict(list, data.get("topics", {}))
-                
-                # Restore entries and rebuild indices
-                for entry_id, entry_data in data.get("entries", {}).items():
-                    entry = MemoryEntry(
-                        entry_id=entry_id,
-                        agent_id=entry_data["agent"],
-                        content=entry_data["content"],
-                        timestamp=entry_data["timestamp"],
-                        tags=set(entry_data.get("tags", [])),
-                        references=entry_data.get("references", [])
-                    )
-                    self._entry_map[entry_id] = entry
-                    
-                    # Rebuild indices
-                    self._agent_index[entry.agent_id].append(entry_id)
-                    for tag in entry.tags:
-                        self._tag_index[tag].add(entry_id)
+            if is_binary_snapshot(self._persist_path):
+                # Indices and entries stay in the mapped file
+                self._base = MappedSnapshot(self._persist_path)
+                self._seq = self._base.seq
+            else:
+                with open(self._persist_path, 'r') as f:
+                    # Restore entries and rebuild indices
+                    self.load_state(json.load(f))
                         
             logger.info(f"Loaded memory graph from {self._persist_path}: "
-                      f"{len(self._entry_map)} entries across {len(self._topics)} topics")
+                      f"{len(self)} entries")
         except FileNotFoundError:
             logger.info(f"No existing memory file at {self._persist_path}, starting fresh")
         except Exception as e:
             logger.error(f"Failed to load memory graph: {str(e)}")
+    
+    def _recover_wal(self) -> None:
+        """Replay the log tail (rotated log first) on top of the snapshot"""
+        log_path = self._persist_path + ".wal"
+        replayed = 0
+        for path in (log_path + ".old", log_path):
+            for record in WriteAheadLog.replay(path):
+                if record.get("seq", 0) <= self._seq:
+                    continue
+                self._apply(record)
+                self._seq = record["seq"]
+                replayed += 1
+        if replayed or os.path.exists(log_path + ".old"):
+            # Start from a clean snapshot so the old logs can be dropped
+            self._write_snapshot(self._export_state())
+            for path in (log_path + ".old", log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        logger.info(f"Replayed {replayed} logged mutations for {self._persist_path}")
+    
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record.get("op")
+        if op == "add":
+            entry = MemoryEntry.from_dict(record["entry"])
+            if self._get_entry(entry.entry_id) is None:
+                self._index_entry(entry)
+        elif op == "connect":
+            source = self._get_entry(record["source"])
+            if source is not None:
+                self._link(source, record["target"])
+        else:
+            logger.warning(f"Skipping unknown memory log op: {op}")
@@ -0,0 +1,336 @@
+
+"""
+Relevance retrieval over memory content.
+
+    retriever = Retriever.attach(graph)
+    retriever.retrieve("thirsty for elven wine", k=5, filters={"topics": ["tavern"]})
+
+The "bm25" mode keeps an inverted index of content terms that is updated
+as memories are added and ranks matches with BM25. The "dense" mode keeps
+a hashed bag-of-words embedding per entry in one contiguous NumPy matrix
+and ranks by cosine similarity. Filters take the keys of
+MemoryGraph.query (topics, agents, tags, time_range) and are applied to
+the candidates before the top-k selection.
+"""
+from array import array
+import logging
+import re
+import threading
+import zlib
+from collections import Counter
+from math import log
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from memory.graph import MemoryEntry
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Too common to say anything about relevance
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its me my
+no not of on or our she so that the their them they this to was we were what when
+who will with you your
+""".split())
+
+
+def content_text(content: Any) -> str:
+    """Searchable text of an entry's content; dict keys are left out"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        return " ".join(content_text(v) for v in content.values())
+    if isinstance(content, (list, tuple, set)):
+        return " ".join(content_text(v) for v in content)
+    return "" if content is None else str(content)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def hashed_embedding(tokens: Iterable[str], dim: int) -> np.ndarray:
+    """L2-normalized signed feature hashing of `tokens` (stable across processes)"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    return vector
+
+
+class _Column:
+    """Growable NumPy column; capacity doubles so appends are amortized O(1)"""
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, width: int = 0, capacity: int = 1024):
+        shape = (capacity, width) if width else (capacity,)
+        self.data = np.zeros(shape, dtype=dtype)
+        self.size = 0
+
+    def append(self, value) -> None:
+        if self.size == len(self.data):
+            grown = np.zeros((2 * len(self.data),) + self.data.shape[1:], dtype=self.data.dtype)
+            grown[:self.size] = self.data
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class Retriever:
+    """
+    Top-k relevance search over memory entries.
+    Rows are assigned in insertion order, so every postings list is sorted.
+    Entry objects are looked up in `graph` when one is attached; the
+    retriever itself only holds ids, filter postings and the index for
+    the chosen mode.
+    """
+    def __init__(self, graph=None, mode: str = "bm25", dim: int = 64,
+                 k1: float = 1.2, b: float = 0.75):
+        if mode not in ("bm25", "dense"):
+            raise ValueError(f"Unknown retrieval mode '{mode}'")
+        self.graph = graph
+        self.mode = mode
+        self.dim = dim
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._labels: Dict[Tuple[str, str], array] = {}   # ("topics"|"agents"|"tags", name) -> rows
+        self._timestamp = _Column(np.float64)
+        # bm25
+        self._postings: Dict[str, Tuple[array, array]] = {}  # Term -> (rows, term frequencies)
+        self._max_tf: Dict[str, int] = {}
+        self._lengths = _Column(np.float64)
+        self._total_length = 0.0
+        self._min_length = None
+        # dense
+        self._vectors = _Column(np.float32, width=dim) if mode == "dense" else None
+
+    @classmethod
+    def attach(cls, graph, **kwargs) -> "Retriever":
+        """Index everything in `graph` and follow its new memories"""
+        retriever = cls(graph, **kwargs)
+        graph.subscribe(retriever.add)
+        for entry in graph.entries():
+            retriever.add(entry)
+        return retriever
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, entry: MemoryEntry) -> None:
+        """Index one entry; entries already indexed are ignored"""
+        tokens = tokenize(content_text(entry.content))
+        labels = [("agents", entry.agent_id)] + [("tags", tag) for tag in entry.tags]
+        if entry.topic is not None:
+            labels.append(("topics", entry.topic))
+        with self._lock:
+            if entry.entry_id in self._rows:
+                return
+            row = len(self._ids)
+            self._ids.append(entry.entry_id)
+            self._rows[entry.entry_id] = row
+            self._timestamp.append(entry.timestamp)
+            for label in labels:
+                rows = self._labels.get(label)
+                if rows is None:
+                    rows = self._labels[label] = array("I")
+                rows.append(row)
+            if self._vectors is not None:
+                self._vectors.append(hashed_embedding(tokens, self.dim))
+                return
+            self._lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            if tokens and (self._min_length is None or len(tokens) < self._min_length):
+                self._min_length = len(tokens)
+            for term, tf in Counter(tokens).items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = (array("I"), array("f"))
+                    self._max_tf[term] = tf
+                elif tf > self._max_tf[term]:
+                    self._max_tf[term] = tf
+                posting[0].append(row)
+                posting[1].append(tf)
+
+    def search(self, text: str, k: int = 5,
+               filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """(entry_id, score) of the `k` best matches, best first"""
+        tokens = tokenize(text)
+        if not tokens or k <= 0:
+            return []
+        with self._lock:
+            # Views of the postings arrays must be gone before add() can grow them
+            return self._search(tokens, k, filters or {}) if self._ids else []
+
+    def retrieve(self, text: str, k: int = 5,
+                 filters: Optional[Dict[str, Any]] = None) -> List[MemoryEntry]:
+        """The `k` entries most relevant to `text`, best first"""
+        if self.graph is None:
+            raise ValueError("retrieve() needs a graph to load entries from; use search()")
+        entries = (self.graph._get_entry(eid) for eid, _ in self.search(text, k, filters))
+        return [e for e in entries if e is not None]
+
+    def context(self, text: str, k: int = 5, filters: Optional[Dict[str, Any]] = None) -> str:
+        """Relevant memories as prompt text for the `{memory}` slot"""
+        return " ".join(content_text(e.content) for e in self.retrieve(text, k, filters))
+
+    def _search(self, tokens: List[str], k: int, filters: Dict[str, Any]) -> List[Tuple[str, float]]:
+        allowed = self._allowed_rows(filters)
+        if allowed is not None and not len(allowed):
+            return []
+        time_range = filters.get("time_range")
+        if self._vectors is not None:
+            rows, scores = self._dense_scores(tokens, allowed, time_range)
+        else:
+            rows, scores = self._bm25_scores(tokens, k, allowed, time_range)
+        if len(rows) > k:
+            # Rows are sorted, so ties at the cut go to the older entries
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            above = np.flatnonzero(scores > kth)
+            top = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+            rows, scores = rows[top], scores[top]
+        order = np.lexsort((rows, -scores))
+        return [(self._ids[rows[i]], float(scores[i])) for i in order]
+
+    def _label_rows(self, key: str, name: str) -> np.ndarray:
+        rows = self._labels.get((key, name))
+        return np.frombuffer(rows, dtype=np.uint32) if rows is not None else _NO_ROWS
+
+    def _allowed_rows(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Sorted rows passing the topic/agent/tag filters; None when there are none"""
+        allowed = None
+        for key in ("topics", "agents"):
+            names = filters.get(key)
+            if names:
+                rows = [self._label_rows(key, name) for name in set(names)]
+                rows = _union(rows)
+                allowed = rows if allowed is None else np.intersect1d(allowed, rows, assume_unique=True)
+        for tag in set(filters.get("tags") or []):
+            rows = self._label_rows("tags", tag)
+            allowed = rows if allowed is None else np.intersect1d(allowed, rows, assume_unique=True)
+        return allowed
+
+    def _keep(self, rows: np.ndarray, allowed: Optional[np.ndarray],
+              time_range: Optional[Tuple[float, float]]) -> np.ndarray:
+        keep = np.ones(len(rows), dtype=bool)
+        if allowed is not None:
+            keep &= _contains(allowed, rows)
+        if time_range:
+            start, end = time_range
+            ts = self._timestamp.view()[rows]
+            if start is not None:
+                keep &= ts >= start
+            if end is not None:
+                keep &= ts <= end
+        return keep
+
+    def _bm25_scores(self, tokens: List[str], k: int, allowed: Optional[np.ndarray],
+                     time_range: Optional[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(self._ids)
+        avgdl = self._total_length / n or 1.0
+        # The best a term can add: its largest tf in the shortest entry
+        shortest = self.k1 * (1 - self.b + self.b * (self._min_length or 0) / avgdl)
+        terms = []
+        for term in set(tokens):
+            posting = self._postings.get(term)
+            if posting is not None:
+                df, tf = len(posting[0]), self._max_tf[term]
+                idf = log(1 + (n - df + 0.5) / (df + 0.5))
+                terms.append((idf, np.frombuffer(posting[0], dtype=np.uint32),
+                              np.frombuffer(posting[1], dtype=np.float32),
+                              idf * tf * (self.k1 + 1) / (tf + shortest)))
+        if not terms:
+            return _NO_ROWS, np.empty(0)
+
+        # MaxScore: the k-th best score among entries containing the rarest
+        # terms is a threshold. Common terms whose bounds add up to less than
+        # it can't lift an entry into the top k on their own, so only entries
+        # with at least one of the remaining (essential) terms are scored.
+        terms.sort(key=lambda t: t[3])
+        seed = _NO_ROWS
+        for term in reversed(terms):
+            rows = term[1][self._keep(term[1], allowed, time_range)]
+            seed = _union([seed, rows]) if len(seed) else rows
+            if len(seed) >= k:
+                break
+        threshold = 0.0
+        if len(seed) >= k:
+            scores = self._score_rows(seed, terms, avgdl)
+            threshold = np.partition(scores, len(seed) - k)[len(seed) - k]
+        bound, split = 0.0, 0
+        while split < len(terms) - 1 and bound + terms[split][3] < threshold:
+            bound += terms[split][3]
+            split += 1
+        essential = terms[split:]
+
+        if allowed is not None and len(allowed) < sum(len(t[1]) for t in essential):
+            # A selective filter: score its rows directly
+            rows = allowed[self._keep(allowed, None, time_range)]
+        else:
+            rows = _union([t[1] for t in essential])
+            rows = rows[self._keep(rows, allowed, time_range)]
+        scores = self._score_rows(rows, terms, avgdl)
+        hit = scores > 0
+        return rows[hit], scores[hit]
+
+    def _score_rows(self, rows: np.ndarray, terms, avgdl: float) -> np.ndarray:
+        """BM25 of sorted `rows`, matching them against every postings list"""
+        norm = self.k1 * (1 - self.b + self.b * self._lengths.view()[rows] / avgdl)
+        scores = np.zeros(len(rows))
+        if not len(rows):
+            return scores
+        for idf, posting, tfs, _ in terms:
+            # Binary-search the shorter list in the longer one
+            if len(posting) < len(rows):
+                at = np.minimum(np.searchsorted(rows, posting), len(rows) - 1)
+                matched = np.flatnonzero(rows[at] == posting)
+                at, tf = at[matched], tfs[matched]
+            else:
+                pos = np.minimum(np.searchsorted(posting, rows), len(posting) - 1)
+                at = np.flatnonzero(posting[pos] == rows)
+                tf = tfs[pos[at]]
+            scores[at] += idf * tf * (self.k1 + 1) / (tf + norm[at])
+        return scores
+
+    def _dense_scores(self, tokens: List[str], allowed: Optional[np.ndarray],
+                      time_range: Optional[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.arange(len(self._ids)) if allowed is None else allowed
+        rows = rows[self._keep(rows, None, time_range)] if time_range else rows
+        vectors = self._vectors.view()
+        query = hashed_embedding(tokens, self.dim)
+        scores = vectors @ query if allowed is None and not time_range else vectors[rows] @ query
+        hit = scores > 0
+        return rows[hit], scores[hit]
+
+
+_NO_ROWS = np.empty(0, dtype=np.uint32)
+
+
+def _union(arrays: List[np.ndarray]) -> np.ndarray:
+    """Sorted distinct rows of several sorted arrays"""
+    if len(arrays) == 1:
+        return arrays[0]
+    rows = np.concatenate(arrays)
+    rows.sort()
+    distinct = np.empty(len(rows), dtype=bool)
+    distinct[:1] = True
+    np.not_equal(rows[1:], rows[:-1], out=distinct[1:])
+    return rows[distinct]
+
+
+def _contains(sorted_rows: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    if not len(sorted_rows):
+        return np.zeros(len(rows), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_rows, rows), len(sorted_rows) - 1)
+    return sorted_rows[pos] == rows
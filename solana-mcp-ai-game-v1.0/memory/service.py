@@ -0,0 +1,505 @@
+
+"""
+MemoryGraph served over Unix sockets so several processes share one memory.
+
+    python -m memory.service --socket-dir /tmp/memory --shards 4 --persist data/memory
+
+starts one server process per shard; topics are assigned to shards with
+shard_for_topic, the same mapping ShardedMemoryGraph uses. MemoryClient
+offers the MemoryGraph API on top of a connection pool per shard, and
+pipeline() sends many calls as one batch frame per shard. Workers attach
+with connect(socket_dir), e.g. `python -m sim.engine --memory-socket-dir`.
+
+Frames are a 4-byte big-endian length followed by a JSON object. Requests
+are {"op", "args"}; "batch" carries {"calls": [[op, args], ...]}. Replies
+are {"result"} or {"error"}, in request order on each connection.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import socket
+import socketserver
+import struct
+import threading
+import time
+from heapq import merge
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from memory.graph import GraphTraversal, MemoryEntry, MemoryGraph
+from memory.sharded import shard_for_topic
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+SOCKET_RE = re.compile(r"^memory-(\d+)-of-(\d+)\.sock$")
+
+
+def socket_name(index: int, shards: int) -> str:
+    return f"memory-{index}-of-{shards}.sock"
+
+
+class MemoryServiceError(Exception):
+    """The memory server rejected a call"""
+
+
+def _send(sock: socket.socket, message: Dict[str, Any]) -> None:
+    payload = json.dumps(message, default=str).encode()
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Memory server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock: socket.socket) -> Dict[str, Any]:
+    size, = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+def _dicts(entries: List[MemoryEntry]) -> List[Dict[str, Any]]:
+    return [e.to_dict() for e in entries]
+
+
+def _operations(graph: MemoryGraph) -> Dict[str, Callable[..., Any]]:
+    """What a shard server answers; entries travel as MemoryEntry.to_dict()"""
+    def locked(fn: Callable[..., Any]) -> Callable[..., Any]:
+        # Connections run in threads of their own; reads must not see a
+        # half-indexed add_memory
+        def call(*args, **kwargs):
+            with graph._lock:
+                return fn(*args, **kwargs)
+        return call
+
+    def get_entries(ids: List[str]) -> List[Dict[str, Any]]:
+        entries = (graph._get_entry(eid) for eid in ids)
+        return [e.to_dict() for e in entries if e is not None]
+
+    def link(source: str, target: str) -> bool:
+        # The target may live on another shard; the client checked it exists
+        with graph._lock:
+            if graph._get_entry(source) is None:
+                return False
+            graph._connect(source, target)
+        return True
+
+    def query(topics=None, agents=None, tags=None, time_range=None, limit=100):
+        return _dicts(graph.query(topics, agents, tags, tuple(time_range) if time_range else None, limit))
+
+    return {
+        "ping": lambda: True,
+        "len": locked(lambda: len(graph)),
+        "add_memory": lambda topic, agent, content, tags=None, timestamp=None:
+            graph.add_memory(topic, agent, content, tags=tags, timestamp=timestamp).to_dict(),
+        "get_topic": locked(lambda topic: _dicts(graph.get_topic(topic))),
+        "get_recent": locked(lambda topic, limit=3: _dicts(graph.get_recent(topic, limit))),
+        "query": locked(query),
+        "get_entries": locked(get_entries),
+        "referrer_ids": locked(lambda entry_id: graph._referrer_ids(entry_id)),
+        "link": link,
+        "compact": graph.compact,
+    }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        sock, ops = self.request, self.server.operations
+        while True:
+            try:
+                request = _recv(sock)
+            except (ConnectionError, OSError):
+                return
+            if request.get("op") == "batch":
+                reply = {"result": [_call(ops, op, args) for op, args in request.get("calls", [])]}
+            else:
+                reply = _call(ops, request.get("op"), request.get("args"))
+            _send(sock, reply)
+
+
+def _call(ops: Dict[str, Callable[..., Any]], op: str, args: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    fn = ops.get(op)
+    if fn is None:
+        return {"error": f"Unknown op '{op}'"}
+    try:
+        return {"result": fn(**(args or {}))}
+    except Exception as e:
+        logger.error(f"Memory op {op} failed: {str(e)}")
+        return {"error": str(e)}
+
+
+class MemoryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """One MemoryGraph behind a Unix socket; a thread per connection"""
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, graph: Optional[MemoryGraph] = None):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.graph = graph if graph is not None else MemoryGraph()
+        self.operations = _operations(self.graph)
+        super().__init__(socket_path, _Handler)
+
+
+def serve(socket_path: str, persist_path: Optional[str] = None, **graph_kwargs) -> None:
+    """Run a shard server until the process is terminated"""
+    graph = MemoryGraph(persist_path=persist_path, **graph_kwargs)
+    with MemoryServer(socket_path, graph) as server:
+        logger.info(f"Memory shard serving {len(graph)} entries on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            graph.close()
+
+
+class MemoryCluster:
+    """Starts and stops one server process per shard"""
+    def __init__(self, socket_dir: str, shards: int = 4, persist_path: Optional[str] = None,
+                 start_timeout: float = 10.0, **graph_kwargs):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        os.makedirs(socket_dir, exist_ok=True)
+        self.socket_paths = [os.path.join(socket_dir, socket_name(i, shards)) for i in range(shards)]
+        # Spawned, not forked: the parent may already be running threads
+        ctx = multiprocessing.get_context("spawn")
+        self._processes = []
+        for i, path in enumerate(self.socket_paths):
+            shard_path = f"{persist_path}.{i}-of-{shards}" if persist_path else None
+            process = ctx.Process(target=serve, args=(path, shard_path), kwargs=graph_kwargs,
+                                  name=f"memory-shard-{i}", daemon=True)
+            process.start()
+            self._processes.append(process)
+        deadline = time.monotonic() + start_timeout
+        for path in self.socket_paths:
+            _wait_for_socket(path, deadline)
+
+    def client(self, **kwargs) -> "MemoryClient":
+        return MemoryClient(self.socket_paths, **kwargs)
+
+    def close(self) -> None:
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join()
+        for path in self.socket_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self) -> "MemoryCluster":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _wait_for_socket(path: str, deadline: float) -> None:
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Memory server on {path} did not start")
+            time.sleep(0.02)
+
+
+class _ConnectionPool:
+    """Up to `size` connections to one shard, reused LIFO"""
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.Semaphore(size)
+
+    def acquire(self) -> socket.socket:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.path)
+                return sock
+            except OSError:
+                self._slots.release()
+                raise
+
+    def release(self, sock: socket.socket, broken: bool = False) -> None:
+        if broken:
+            sock.close()
+        else:
+            self._idle.put(sock)
+        self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class MemoryClient(GraphTraversal):
+    """
+    MemoryGraph API backed by shard servers. Topic-addressed calls go to
+    the topic's shard; entry-addressed calls ask every shard, since ids
+    don't record where an entry lives. Safe to share between threads.
+    """
+    def __init__(self, socket_paths: List[str], pool_size: int = 4):
+        self._pools = [_ConnectionPool(path, pool_size) for path in socket_paths]
+
+    def __len__(self) -> int:
+        return sum(self._fan_out("len", {}))
+
+    def shard_index(self, topic: str) -> int:
+        return shard_for_topic(topic, len(self._pools))
+
+    def add_memory(self, topic: str, agent: str, content: Any,
+                   tags: Optional[List[str]] = None,
+                   timestamp: Optional[float] = None) -> MemoryEntry:
+        """Add a memory entry with optional tags (and timestamp, default now)"""
+        return MemoryEntry.from_dict(self._call(self.shard_index(topic), "add_memory", {
+            "topic": topic, "agent": agent, "content": content, "tags": tags, "timestamp": timestamp}))
+
+    def connect_memories(self, source_id: str, target_id: str) -> bool:
+        """Create a reference between two memory entries, possibly across shards"""
+        owners = self._owners([source_id, target_id])
+        if source_id not in owners or target_id not in owners:
+            return False
+        return self._call(owners[source_id], "link", {"source": source_id, "target": target_id})
+
+    def get_topic(self, topic: str) -> List[MemoryEntry]:
+        """Get all memories for a topic"""
+        return _entries(self._call(self.shard_index(topic), "get_topic", {"topic": topic}))
+
+    def get_recent(self, topic: str, limit: int = 3) -> List[MemoryEntry]:
+        """Get most recent memories for a topic"""
+        return _entries(self._call(self.shard_index(topic), "get_recent", {"topic": topic, "limit": limit}))
+
+    def query(self,
+              topics: Optional[List[str]] = None,
+              agents: Optional[List[str]] = None,
+              tags: Optional[List[str]] = None,
+              time_range: Optional[Tuple[float, float]] = None,
+              limit: int = 100) -> List[MemoryEntry]:
+        """
+        Advanced query with multiple filters
+        Returns entries that match ALL specified criteria, newest first
+        """
+        args = {"agents": agents, "tags": tags, "time_range": time_range, "limit": limit}
+        if topics:
+            by_shard: Dict[int, List[str]] = {}
+            for topic in set(topics):
+                by_shard.setdefault(self.shard_index(topic), []).append(topic)
+            calls = [(i, "query", dict(args, topics=shard_topics)) for i, shard_topics in by_shard.items()]
+        else:
+            calls = [(i, "query", args) for i in range(len(self._pools))]
+        partials = [_entries(r) for r in self._pipelined(calls) if r]
+        if len(partials) == 1:
+            return partials[0]
+        return list(islice(merge(*partials, key=lambda e: e.timestamp, reverse=True), limit))
+
+    def get_references(self, entry_id: str) -> List[MemoryEntry]:
+        """Entries that `entry_id` refers to"""
+        entry = self._get_entry(entry_id)
+        return self._get_entries(entry.references) if entry is not None else []
+
+    def get_referrers(self, entry_id: str) -> List[MemoryEntry]:
+        """Entries that refer to `entry_id`"""
+        return self._get_entries(self._referrer_ids(entry_id))
+
+    def compact(self) -> None:
+        self._fan_out("compact", {})
+
+    def pipeline(self) -> "Pipeline":
+        return Pipeline(self)
+
+    def close(self) -> None:
+        for pool in self._pools:
+            pool.close()
+
+    def _get_entry(self, entry_id: str) -> Optional[MemoryEntry]:
+        entries = self._get_entries([entry_id])
+        return entries[0] if entries else None
+
+    def _get_entries(self, ids: List[str]) -> List[MemoryEntry]:
+        """Entries for `ids` in that order, skipping unknown ids"""
+        if not ids:
+            return []
+        found = {}
+        for partial in self._fan_out("get_entries", {"ids": list(ids)}):
+            for data in partial:
+                found[data["id"]] = data
+        return [MemoryEntry.from_dict(found[eid]) for eid in ids if eid in found]
+
+    def _referrer_ids(self, entry_id: str) -> List[str]:
+        # A reference is recorded on the source's shard
+        return [eid for ids in self._fan_out("referrer_ids", {"entry_id": entry_id}) for eid in ids]
+
+    def _neighbors(self, entry_id: str, direction: str, fan_out: Optional[int]) -> List[str]:
+        neighbors = []
+        if direction in ("out", "both"):
+            entry = self._get_entry(entry_id)
+            refs = entry.references if entry is not None else []
+            neighbors.extend(reversed(refs[-fan_out:] if fan_out else refs))
+        if direction in ("in", "both"):
+            refs = self._referrer_ids(entry_id)
+            neighbors.extend(reversed(refs[-fan_out:] if fan_out else refs))
+        return neighbors
+
+    def _owners(self, ids: List[str]) -> Dict[str, int]:
+        owners = {}
+        for shard, partial in enumerate(self._fan_out("get_entries", {"ids": ids})):
+            for data in partial:
+                owners[data["id"]] = shard
+        return owners
+
+    def _call(self, shard: int, op: str, args: Dict[str, Any]) -> Any:
+        return self._pipelined([(shard, op, args)])[0]
+
+    def _fan_out(self, op: str, args: Dict[str, Any]) -> List[Any]:
+        return self._pipelined([(i, op, args) for i in range(len(self._pools))])
+
+    def _pipelined(self, calls: List[Tuple[int, str, Dict[str, Any]]]) -> List[Any]:
+        """
+        Send every call before reading any reply, so calls to different
+        shards overlap; calls to the same shard share one batch frame.
+        """
+        by_shard: Dict[int, List[int]] = {}
+        for position, (shard, _, _) in enumerate(calls):
+            by_shard.setdefault(shard, []).append(position)
+        sent = []
+        try:
+            # Pools are bounded: taking them in one global order keeps threads
+            # that share this client from each holding a slot another needs
+            for shard in sorted(by_shard):
+                positions = by_shard[shard]
+                sock = self._pools[shard].acquire()
+                sent.append((shard, sock, positions))
+                if len(positions) == 1:
+                    _, op, args = calls[positions[0]]
+                    _send(sock, {"op": op, "args": args})
+                else:
+                    _send(sock, {"op": "batch", "calls": [[calls[p][1], calls[p][2]] for p in positions]})
+            results: List[Any] = [None] * len(calls)
+            errors = []
+            while sent:
+                shard, sock, positions = sent[0]
+                reply = _recv(sock)
+                sent.pop(0)
+                self._pools[shard].release(sock)
+                replies = [reply] if len(positions) == 1 else reply["result"]
+                for position, r in zip(positions, replies):
+                    if "error" in r:
+                        errors.append(r["error"])
+                    else:
+                        results[position] = r["result"]
+        except Exception:
+            # A half-read connection can't be reused
+            for shard, sock, _ in sent:
+                self._pools[shard].release(sock, broken=True)
+            raise
+        if errors:
+            raise MemoryServiceError(errors[0])
+        return results
+
+
+class Pipeline:
+    """
+    Queue calls and send them together on exit (or on execute()); each
+    queued call returns a zero-argument function that gives its result.
+
+        with client.pipeline() as p:
+            pending = [p.add_memory("tavern", "bard", line) for line in lines]
+        entries = [get() for get in pending]
+    """
+    def __init__(self, client: MemoryClient):
+        self._client = client
+        self._calls: List[Tuple[int, str, Dict[str, Any]]] = []
+        self._decoders: List[Callable[[Any], Any]] = []
+        self._results: Optional[List[Any]] = None
+
+    def add_memory(self, topic: str, agent: str, content: Any,
+                   tags: Optional[List[str]] = None,
+                   timestamp: Optional[float] = None) -> Callable[[], MemoryEntry]:
+        return self._queue(self._client.shard_index(topic), "add_memory", {
+            "topic": topic, "agent": agent, "content": content, "tags": tags,
+            "timestamp": timestamp}, MemoryEntry.from_dict)
+
+    def get_recent(self, topic: str, limit: int = 3) -> Callable[[], List[MemoryEntry]]:
+        return self._queue(self._client.shard_index(topic), "get_recent",
+                           {"topic": topic, "limit": limit}, _entries)
+
+    def get_topic(self, topic: str) -> Callable[[], List[MemoryEntry]]:
+        return self._queue(self._client.shard_index(topic), "get_topic", {"topic": topic}, _entries)
+
+    def execute(self) -> List[Any]:
+        if self._results is None:
+            raw = self._client._pipelined(self._calls) if self._calls else []
+            self._results = [decode(r) for decode, r in zip(self._decoders, raw)]
+        return self._results
+
+    def _queue(self, shard: int, op: str, args: Dict[str, Any], decode: Callable[[Any], Any]):
+        position = len(self._calls)
+        self._calls.append((shard, op, args))
+        self._decoders.append(decode)
+        return lambda: self.execute()[position]
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.execute()
+
+
+def connect(socket_dir: str, pool_size: int = 4) -> MemoryClient:
+    """Client for the shards `python -m memory.service` serves from `socket_dir`"""
+    found: Dict[int, Dict[int, str]] = {}
+    for name in os.listdir(socket_dir):
+        match = SOCKET_RE.match(name)
+        if match:
+            index, shards = int(match.group(1)), int(match.group(2))
+            found.setdefault(shards, {})[index] = os.path.join(socket_dir, name)
+    complete = [paths for shards, paths in found.items() if len(paths) == shards]
+    if len(complete) != 1:
+        raise MemoryServiceError(f"Expected one complete set of memory shards in {socket_dir}")
+    paths = complete[0]
+    return MemoryClient([paths[i] for i in range(len(paths))], pool_size=pool_size)
+
+
+def _entries(data: List[Dict[str, Any]]) -> List[MemoryEntry]:
+    return [MemoryEntry.from_dict(d) for d in data]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve MemoryGraph shards over Unix sockets")
+    parser.add_argument("--socket-dir", type=str, default="/tmp/memory-graph")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--persist", type=str, default=None, help="Snapshot path prefix per shard")
+    args = parser.parse_args(argv)
+
+    graph_kwargs = {"persist_mode": "wal"} if args.persist else {}
+    cluster = MemoryCluster(args.socket_dir, args.shards, args.persist, **graph_kwargs)
+    print(f"Serving {args.shards} memory shards: {' '.join(cluster.socket_paths)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,167 @@
+
+from heapq import merge
+from itertools import islice
+import logging
+import zlib
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from memory.graph import GraphTraversal, MemoryEntry, MemoryGraph
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for_topic(topic: str, shards: int) -> int:
+    """Stable topic -> shard mapping (independent of PYTHONHASHSEED)"""
+    return zlib.crc32(topic.encode("utf-8")) % shards
+
+
+class ShardedMemoryGraph(GraphTraversal):
+    """
+    Thread-safe MemoryGraph split into topic shards.
+    Every shard is a MemoryGraph guarded by its own lock, so writers only
+    serialize with readers and writers of topics on the same shard, and a
+    reader never observes a half-indexed entry. Cross-topic queries visit
+    the relevant shards one at a time and merge their newest-first results.
+    Critical sections never await, so the graph is safe to call from
+    coroutines as well as from thread pools.
+    """
+    def __init__(self, shards: int = 16, persist_path: Optional[str] = None,
+                 **graph_kwargs):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self._shards: List[MemoryGraph] = []
+        for i in range(shards):
+            # The shard count is part of the file name so a resized graph
+            # never routes topics to another shard's data.
+            path = f"{persist_path}.{i}-of-{shards}" if persist_path else None
+            self._shards.append(MemoryGraph(persist_path=path, **graph_kwargs))
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def subscribe(self, listener: Callable[[MemoryEntry], None]) -> None:
+        for shard in self._shards:
+            shard.subscribe(listener)
+
+    def entries(self) -> Iterator[MemoryEntry]:
+        for shard in self._shards:
+            yield from shard.entries()
+
+    def shard(self, topic: str) -> MemoryGraph:
+        return self._shards[shard_for_topic(topic, len(self._shards))]
+
+    def add_memory(self, topic: str, agent: str, content: Any,
+                   tags: Optional[List[str]] = None,
+                   timestamp: Optional[float] = None) -> MemoryEntry:
+        """Add a memory entry with optional tags (and timestamp, default now)"""
+        return self.shard(topic).add_memory(topic, agent, content, tags=tags, timestamp=timestamp)
+
+    def connect_memories(self, source_id: str, target_id: str) -> bool:
+        """Create a reference between two memory entries, possibly across shards"""
+        source = self._owner(source_id)
+        target = self._owner(target_id)
+        if source is None or target is None:
+            return False
+        first, second = sorted((source, target), key=id)
+        with first._lock, second._lock:
+            if source._get_entry(source_id) is None or target._get_entry(target_id) is None:
+                return False
+            source._connect(source_id, target_id)
+        return True
+
+    def get_topic(self, topic: str) -> List[MemoryEntry]:
+        """Get all memories for a topic"""
+        shard = self.shard(topic)
+        with shard._lock:
+            return shard.get_topic(topic)
+
+    def get_recent(self, topic: str, limit: int = 3) -> List[MemoryEntry]:
+        """Get most recent memories for a topic"""
+        shard = self.shard(topic)
+        with shard._lock:
+            return shard.get_recent(topic, limit)
+
+    def query(self,
+              topics: Optional[List[str]] = None,
+              agents: Optional[List[str]] = None,
+              tags: Optional[List[str]] = None,
+              time_range: Optional[Tuple[float, float]] = None,
+              limit: int = 100) -> List[MemoryEntry]:
+        """
+        Advanced query with multiple filters
+        Returns entries that match ALL specified criteria, newest first
+        """
+        if topics:
+            by_shard: Dict[int, List[str]] = defaultdict(list)
+            for topic in set(topics):
+                by_shard[shard_for_topic(topic, len(self._shards))].append(topic)
+            targets = [(self._shards[i], shard_topics) for i, shard_topics in by_shard.items()]
+        else:
+            targets = [(shard, None) for shard in self._shards]
+
+        partials = []
+        for shard, shard_topics in targets:
+            with shard._lock:
+                partial = shard.query(topics=shard_topics, agents=agents, tags=tags,
+                                      time_range=time_range, limit=limit)
+            if partial:
+                partials.append(partial)
+        if len(partials) == 1:
+            return partials[0]
+        merged = merge(*partials, key=lambda e: e.timestamp, reverse=True)
+        return list(islice(merged, limit))
+
+    def get_references(self, entry_id: str) -> List[MemoryEntry]:
+        """Entries that `entry_id` refers to"""
+        entry = self._get_entry(entry_id)
+        if entry is None:
+            return []
+        return [e for e in map(self._get_entry, list(entry.references)) if e is not None]
+
+    def get_referrers(self, entry_id: str) -> List[MemoryEntry]:
+        """Entries that refer to `entry_id`"""
+        return [e for e in map(self._get_entry, self._referrer_ids(entry_id)) if e is not None]
+
+    def compact(self) -> None:
+        for shard in self._shards:
+            shard.compact()
+
+    def close(self) -> None:
+        for shard in self._shards:
+            shard.close()
+
+    def _owner(self, entry_id: str) -> Optional[MemoryGraph]:
+        for shard in self._shards:
+            if shard._get_entry(entry_id) is not None:
+                return shard
+        return None
+
+    def _get_entry(self, entry_id: str) -> Optional[MemoryEntry]:
+        for shard in self._shards:
+            entry = shard._get_entry(entry_id)
+            if entry is not None:
+                return entry
+        return None
+
+    def _referrer_ids(self, entry_id: str) -> List[str]:
+        # A reference is recorded on the source's shard, so incoming edges
+        # can come from any shard.
+        ids = []
+        for shard in self._shards:
+            with shard._lock:
+                ids.extend(shard._referrer_ids(entry_id))
+        return ids
+
+    def _neighbors(self, entry_id: str, direction: str, fan_out: Optional[int]) -> List[str]:
+        neighbors = []
+        if direction in ("out", "both"):
+            owner = self._owner(entry_id)
+            if owner is not None:
+                with owner._lock:
+                    refs = list(owner._get_entry(entry_id).references)
+                neighbors.extend(reversed(refs[-fan_out:] if fan_out else refs))
+        if direction in ("in", "both"):
+            refs = self._referrer_ids(entry_id)
+            neighbors.extend(reversed(refs[-fan_out:] if fan_out else refs))
+        return neighbors
@@ -0,0 +1,371 @@
+
+"""
+Binary MemoryGraph snapshots that can be memory-mapped.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header    magic, version, section count, seq, entry count, string count
+    sections  (id, offset, length) per section
+    strings   agent/topic/tag names: offsets (Q) + UTF-8 blob
+    ids       entry ids: offsets (Q) + blob, and rows sorted by id (I)
+    columns   timestamp (d), agent (I), topic (I) per row
+    postings  per agent/topic/tag: offsets (Q) + row numbers (I), oldest first
+    referrers per row: offsets (Q) + referring row numbers (I)
+    meta      per row: JSON [tags, references]
+    content   per row: JSON content
+    external  JSON {target id: [source ids]} for references leaving the file
+
+Rows are in timestamp order, so every postings list is too. Opening a
+snapshot reads the header and the string table; index lookups bisect the
+mapped arrays and entry content is decoded only when it is accessed.
+"""
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import json
+import mmap
+import struct
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from memory.graph import MemoryEntry
+from memory.wal import atomic_write
+
+MAGIC = b"MGSNAP\x00\x01"
+VERSION = 1
+NO_TOPIC = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<8sIIQQQ")
+_SECTION = struct.Struct("<IIQQ")
+
+(STR_OFF, STR_BLOB, ID_OFF, ID_BLOB, ID_ORDER, TS, AGENT, TOPIC,
+ AGENT_POST_OFF, AGENT_POST, TOPIC_POST_OFF, TOPIC_POST, TAG_POST_OFF, TAG_POST,
+ REF_OFF, REF_ROWS, META_OFF, META_BLOB, CONTENT_OFF, CONTENT_BLOB, EXTERNAL) = range(21)
+
+_FORMATS = {STR_OFF: "Q", ID_OFF: "Q", ID_ORDER: "I", TS: "d", AGENT: "I", TOPIC: "I",
+            AGENT_POST_OFF: "Q", AGENT_POST: "I", TOPIC_POST_OFF: "Q", TOPIC_POST: "I",
+            TAG_POST_OFF: "Q", TAG_POST: "I", REF_OFF: "Q", REF_ROWS: "I",
+            META_OFF: "Q", CONTENT_OFF: "Q"}
+
+
+def is_binary_snapshot(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _offsets_and_blob(chunks: List[bytes]) -> Tuple[bytes, bytes]:
+    offsets = [0]
+    for chunk in chunks:
+        offsets.append(offsets[-1] + len(chunk))
+    return struct.pack(f"<{len(offsets)}Q", *offsets), b"".join(chunks)
+
+
+def _postings(lists: List[List[int]]) -> Tuple[bytes, bytes]:
+    offsets = [0]
+    rows: List[int] = []
+    for posting in lists:
+        rows.extend(posting)
+        offsets.append(len(rows))
+    return struct.pack(f"<{len(offsets)}Q", *offsets), struct.pack(f"<{len(rows)}I", *rows)
+
+
+def write_snapshot(path: str, entries: Iterable[MemoryEntry], seq: int = 0,
+                   durable: bool = True) -> None:
+    """Write `entries` as a binary snapshot (atomically, via a temp file)"""
+    entries = sorted(entries, key=lambda e: e.timestamp)  # Stable: ties keep their order
+    row_of = {e.entry_id: row for row, e in enumerate(entries)}
+    strings: Dict[str, int] = {}
+
+    def intern(name: str) -> int:
+        sid = strings.get(name)
+        if sid is None:
+            sid = strings[name] = len(strings)
+        return sid
+
+    agent_rows: Dict[int, List[int]] = {}
+    topic_rows: Dict[int, List[int]] = {}
+    tag_rows: Dict[int, List[int]] = {}
+    referrers: List[List[int]] = [[] for _ in entries]
+    external: Dict[str, List[str]] = {}
+    agents, topics, meta, content = [], [], [], []
+    for row, entry in enumerate(entries):
+        agent = intern(entry.agent_id)
+        agents.append(agent)
+        agent_rows.setdefault(agent, []).append(row)
+        if entry.topic is None:
+            topics.append(NO_TOPIC)
+        else:
+            topic = intern(entry.topic)
+            topics.append(topic)
+            topic_rows.setdefault(topic, []).append(row)
+        for tag in sorted(entry.tags):
+            tag_rows.setdefault(intern(tag), []).append(row)
+        for target in entry.references:
+            target_row = row_of.get(target)
+            if target_row is not None:
+                referrers[target_row].append(row)
+            else:
+                # e.g. an entry on another shard
+                external.setdefault(target, []).append(entry.entry_id)
+        meta.append(json.dumps([sorted(entry.tags), list(entry.references)]).encode())
+        content.append(json.dumps(entry.content).encode())
+
+    n, m = len(entries), len(strings)
+    ids = [e.entry_id.encode() for e in entries]
+    sections = {}
+    sections[STR_OFF], sections[STR_BLOB] = _offsets_and_blob([s.encode() for s in strings])
+    sections[ID_OFF], sections[ID_BLOB] = _offsets_and_blob(ids)
+    sections[ID_ORDER] = struct.pack(f"<{n}I", *sorted(range(n), key=ids.__getitem__))
+    sections[TS] = struct.pack(f"<{n}d", *(e.timestamp for e in entries))
+    sections[AGENT] = struct.pack(f"<{n}I", *agents)
+    sections[TOPIC] = struct.pack(f"<{n}I", *topics)
+    for off_id, rows_id, by_string in ((AGENT_POST_OFF, AGENT_POST, agent_rows),
+                                       (TOPIC_POST_OFF, TOPIC_POST, topic_rows),
+                                       (TAG_POST_OFF, TAG_POST, tag_rows)):
+        sections[off_id], sections[rows_id] = _postings([by_string.get(s, []) for s in range(m)])
+    sections[REF_OFF], sections[REF_ROWS] = _postings(referrers)
+    sections[META_OFF], sections[META_BLOB] = _offsets_and_blob(meta)
+    sections[CONTENT_OFF], sections[CONTENT_BLOB] = _offsets_and_blob(content)
+    sections[EXTERNAL] = json.dumps(external).encode()
+
+    table_size = _HEADER.size + _SECTION.size * len(sections)
+    offset = (table_size + 7) & ~7
+    layout = []
+    for section_id in sorted(sections):
+        layout.append((section_id, offset, len(sections[section_id])))
+        offset = (offset + len(sections[section_id]) + 7) & ~7
+
+    with atomic_write(path, "wb", durable) as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(layout), seq, n, m))
+        for section_id, section_offset, length in layout:
+            f.write(_SECTION.pack(section_id, 0, section_offset, length))
+        for section_id, section_offset, _ in layout:
+            f.write(b"\x00" * (section_offset - f.tell()))
+            f.write(sections[section_id])
+
+
+class MappedIndex:
+    """A postings list in the mapped file, with the TimeIndex read interface"""
+    __slots__ = ("_snapshot", "_rows", "_ts")
+
+    def __init__(self, snapshot: "MappedSnapshot", rows):
+        self._snapshot = snapshot
+        self._rows = rows          # Row numbers, oldest first (memoryview or range)
+        self._ts = snapshot._arrays[TS]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[str]:
+        entry_id = self._snapshot.entry_id
+        return (entry_id(row) for row in self._rows)
+
+    def ids(self) -> List[str]:
+        return list(self)
+
+    def bounds(self, start: Optional[float] = None,
+               end: Optional[float] = None) -> Tuple[int, int]:
+        ts = self._ts.__getitem__
+        lo = 0 if start is None else bisect_left(self._rows, start, key=ts)
+        hi = len(self._rows) if end is None else bisect_right(self._rows, end, key=ts)
+        return lo, max(lo, hi)
+
+    def count(self, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        lo, hi = self.bounds(start, end)
+        return hi - lo
+
+    def iter_newest(self, start: Optional[float] = None,
+                    end: Optional[float] = None) -> Iterator[Tuple[float, str]]:
+        lo, hi = self.bounds(start, end)
+        ts, rows, entry_id = self._ts, self._rows, self._snapshot.entry_id
+        for i in range(hi - 1, lo - 1, -1):
+            row = rows[i]
+            yield ts[row], entry_id(row)
+
+
+class MappedEntry(MemoryEntry):
+    """
+    MemoryEntry backed by a snapshot row. Ids, agent, topic and timestamp
+    come from the mapped columns; tags and references decode on first use,
+    content separately on first access.
+    """
+    def __init__(self, snapshot: "MappedSnapshot", row: int):
+        self._snapshot = snapshot
+        self._row = row
+        self._meta: Optional[Tuple[set, list]] = None
+        self._loaded = False
+        self._content = None
+        self.entry_id = snapshot.entry_id(row)
+        self.agent_id = snapshot.string(snapshot._arrays[AGENT][row])
+        topic = snapshot._arrays[TOPIC][row]
+        self.topic = None if topic == NO_TOPIC else snapshot.string(topic)
+        self.timestamp = snapshot._arrays[TS][row]
+
+    @property
+    def content(self) -> Any:
+        if not self._loaded:
+            self._content = json.loads(self._snapshot._blob(CONTENT_OFF, CONTENT_BLOB, self._row).decode())
+            self._loaded = True
+        return self._content
+
+    @content.setter
+    def content(self, value: Any) -> None:
+        self._content, self._loaded = value, True
+
+    @property
+    def tags(self) -> set:
+        return self._load_meta()[0]
+
+    @tags.setter
+    def tags(self, value: set) -> None:
+        self._meta = (value, self._load_meta()[1])
+
+    @property
+    def references(self) -> list:
+        return self._load_meta()[1]
+
+    @references.setter
+    def references(self, value: list) -> None:
+        self._meta = (self._load_meta()[0], value)
+
+    def _load_meta(self) -> Tuple[set, list]:
+        if self._meta is None:
+            tags, references = json.loads(self._snapshot._blob(META_OFF, META_BLOB, self._row).decode())
+            self._meta = (set(tags), references)
+        return self._meta
+
+
+class MappedSnapshot:
+    """
+    Read-only view of a binary snapshot file. The last `cache_size`
+    entries and id lookups are cached; entries changed in memory since
+    (see keep) stay until the snapshot is closed.
+    """
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        self.cache_size = cache_size
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, sections, self.seq, self.size, strings = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} memory snapshot")
+        self._arrays: Dict[int, Any] = {}
+        self._starts: Dict[int, int] = {}
+        for i in range(sections):
+            section_id, _, offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + i * _SECTION.size)
+            view = self._view[offset:offset + length]
+            fmt = _FORMATS.get(section_id)
+            self._arrays[section_id] = view.cast(fmt) if fmt else view
+            self._starts[section_id] = offset
+        # The string table is small (distinct agents, topics and tags)
+        names = [self._blob(STR_OFF, STR_BLOB, i).decode() for i in range(strings)]
+        self._strings = names
+        self._string_ids = {name: i for i, name in enumerate(names)}
+        self._external: Dict[str, List[str]] = json.loads(bytes(self._arrays[EXTERNAL]))
+        self._cache_lock = threading.Lock()
+        self._entries: "OrderedDict[int, MappedEntry]" = OrderedDict()
+        self._kept: Dict[int, MappedEntry] = {}
+        self._row_ids: "OrderedDict[str, int]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def string(self, sid: int) -> str:
+        return self._strings[sid]
+
+    def entry_id(self, row: int) -> str:
+        return self._blob(ID_OFF, ID_BLOB, row).decode()
+
+    def row_of(self, entry_id: str) -> Optional[int]:
+        with self._cache_lock:
+            row = self._row_ids.get(entry_id)
+            if row is not None:
+                self._row_ids.move_to_end(entry_id)
+                return row
+        order = self._arrays[ID_ORDER]
+        key = entry_id.encode()
+        pos = bisect_left(order, key, key=lambda row: self._blob(ID_OFF, ID_BLOB, row))
+        if pos < len(order) and self._blob(ID_OFF, ID_BLOB, order[pos]) == key:
+            row = order[pos]
+            with self._cache_lock:
+                self._row_ids[entry_id] = row
+                if len(self._row_ids) > self.cache_size:
+                    self._row_ids.popitem(last=False)
+            return row
+        return None
+
+    def entry(self, row: int) -> MappedEntry:
+        with self._cache_lock:
+            entry = self._kept.get(row)
+            if entry is not None:
+                return entry
+            entry = self._entries.get(row)
+            if entry is not None:
+                self._entries.move_to_end(row)
+                return entry
+            entry = self._entries[row] = MappedEntry(self, row)
+            if len(self._entries) > self.cache_size:
+                self._entries.popitem(last=False)
+            return entry
+
+    def keep(self, entry: MappedEntry) -> None:
+        """Pin an entry that now differs from its row, e.g. a link was added"""
+        with self._cache_lock:
+            self._kept[entry._row] = entry
+            self._entries.pop(entry._row, None)
+
+    def get(self, entry_id: str) -> Optional[MappedEntry]:
+        row = self.row_of(entry_id)
+        return None if row is None else self.entry(row)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return self.row_of(entry_id) is not None
+
+    def index(self, kind: str, name: Optional[str] = None) -> Optional[MappedIndex]:
+        """Postings for an "agent", "topic" or "tag" name; kind "time" covers every row"""
+        if kind == "time":
+            return MappedIndex(self, range(self.size)) if self.size else None
+        sid = self._string_ids.get(name)
+        if sid is None:
+            return None
+        off_id, rows_id = {"agent": (AGENT_POST_OFF, AGENT_POST), "topic": (TOPIC_POST_OFF, TOPIC_POST),
+                           "tag": (TAG_POST_OFF, TAG_POST)}[kind]
+        offsets = self._arrays[off_id]
+        lo, hi = offsets[sid], offsets[sid + 1]
+        return MappedIndex(self, self._arrays[rows_id][lo:hi]) if hi > lo else None
+
+    def referrer_ids(self, entry_id: str) -> List[str]:
+        row = self.row_of(entry_id)
+        if row is None:
+            return list(self._external.get(entry_id, ()))
+        offsets = self._arrays[REF_OFF]
+        return [self.entry_id(r) for r in self._arrays[REF_ROWS][offsets[row]:offsets[row + 1]]]
+
+    def entries(self) -> Iterator[MappedEntry]:
+        # Rows nobody has looked up stay out of the cache
+        return (self._cached(row) or MappedEntry(self, row) for row in range(self.size))
+
+    def _cached(self, row: int) -> Optional[MappedEntry]:
+        with self._cache_lock:
+            return self._kept.get(row) or self._entries.get(row)
+
+    def topics(self) -> List[str]:
+        offsets = self._arrays[TOPIC_POST_OFF]
+        return [name for sid, name in enumerate(self._strings) if offsets[sid + 1] > offsets[sid]]
+
+    def close(self) -> None:
+        # Views must be released before the map can close
+        self._arrays.clear()
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # Still referenced by a live MappedIndex; freed with it
+
+    def _blob(self, off_id: int, blob_id: int, i: int) -> bytes:
+        offsets = self._arrays[off_id]
+        start = self._starts[blob_id]
+        return self._mmap[start + offsets[i]:start + offsets[i + 1]]
@@ -0,0 +1,75 @@
+
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class TimeIndex:
+    """
+    Entry ids kept in timestamp order (ties in insertion order).
+    Appends of non-decreasing timestamps are O(1); range lookups
+    are binary searches over the timestamp column.
+    """
+    __slots__ = ("_ts", "_ids")
+
+    def __init__(self):
+        self._ts: List[float] = []
+        self._ids: List[str] = []
+
+    def add(self, timestamp: float, entry_id: str) -> None:
+        if not self._ts or timestamp >= self._ts[-1]:
+            self._ts.append(timestamp)
+            self._ids.append(entry_id)
+        else:
+            pos = bisect_right(self._ts, timestamp)
+            self._ts.insert(pos, timestamp)
+            self._ids.insert(pos, entry_id)
+
+    def remove(self, timestamp: float, entry_id: str) -> bool:
+        pos = bisect_left(self._ts, timestamp)
+        while pos < len(self._ts) and self._ts[pos] == timestamp:
+            if self._ids[pos] == entry_id:
+                del self._ts[pos]
+                del self._ids[pos]
+                return True
+            pos += 1
+        return False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def ids(self) -> List[str]:
+        """All ids, oldest first"""
+        return list(self._ids)
+
+    def bounds(self, start: Optional[float] = None,
+               end: Optional[float] = None) -> Tuple[int, int]:
+        """Slice positions covering start <= timestamp <= end"""
+        lo = 0 if start is None else bisect_left(self._ts, start)
+        hi = len(self._ts) if end is None else bisect_right(self._ts, end)
+        return lo, max(lo, hi)
+
+    def count(self, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        lo, hi = self.bounds(start, end)
+        return hi - lo
+
+    def iter_newest(self, start: Optional[float] = None,
+                    end: Optional[float] = None) -> Iterator[Tuple[float, str]]:
+        """Yield (timestamp, entry_id) newest first within the range"""
+        lo, hi = self.bounds(start, end)
+        ts, ids = self._ts, self._ids
+        for i in range(hi - 1, lo - 1, -1):
+            yield ts[i], ids[i]
+
+
+def merge_newest(indexes: Iterable[TimeIndex], start: Optional[float] = None,
+                 end: Optional[float] = None) -> Iterator[Tuple[float, str]]:
+    """Lazy k-way merge of several indexes, newest first"""
+    streams = [index.iter_newest(start, end) for index in indexes]
+    if len(streams) == 1:
+        return streams[0]
+    return merge(*streams, key=itemgetter(0), reverse=True)
@@ -0,0 +1,180 @@
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class WriteAheadLog:
+    """
+    Append-only JSONL mutation log.
+    Every record is flushed to the OS on append; fsync follows the policy:
+    "always" (every append), "interval" (at most every `fsync_interval`
+    seconds) or "never" (left to the OS).
+    """
+    def __init__(self, path: str, fsync: str = "interval",
+                 fsync_interval: float = 1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.path = path
+        self.rotated_path = path + ".old"
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.records_since_rotate = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record and apply the fsync policy"""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.records_since_rotate += 1
+            self._dirty = True
+            if self.fsync == "always":
+                self._sync_locked()
+            elif self.fsync == "interval":
+                self._sync_if_due_locked()
+
+    def sync_if_due(self) -> None:
+        """fsync pending appends if the interval policy says so"""
+        with self._lock:
+            if self.fsync == "interval":
+                self._sync_if_due_locked()
+
+    def sync(self) -> None:
+        """Force pending appends to stable storage"""
+        with self._lock:
+            self._sync_locked()
+
+    def rotate(self) -> None:
+        """
+        Move the live log aside so a snapshot can absorb it.
+        If a previous rotation was never discarded (failed compaction),
+        the live log is appended to it so no records are lost.
+        """
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+            if os.path.exists(self.rotated_path):
+                with open(self.rotated_path, "ab") as dst, open(self.path, "rb") as src:
+                    shutil.copyfileobj(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.records_since_rotate = 0
+
+    def discard_rotated(self) -> None:
+        """Drop the rotated log once its records are in a durable snapshot"""
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync_locked()
+            self._file.close()
+
+    def _sync_if_due_locked(self) -> None:
+        if self._dirty and time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        if self._dirty and not self._file.closed:
+            os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def replay(path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield records from a log file in append order.
+        A torn final line (crash mid-append) is skipped.
+        """
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line_no, line in enumerate(f, 1):
+                if not line.endswith("\n"):
+                    logger.warning(f"Ignoring torn record at {path}:{line_no}")
+                    break
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring corrupt record at {path}:{line_no}")
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", durable: bool = True):
+    """
+    File object for a uniquely named temp file beside `path`, renamed over
+    `path` once the block finishes; concurrent writers never share a temp
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                    prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(path: str, data: Any, durable: bool = True) -> None:
+    """Write JSON to a temp file and rename it over `path`"""
+    with atomic_write(path, "w", durable) as f:
+        json.dump(data, f)
+
+
+class Compactor(threading.Thread):
+    """Background thread that periodically folds a graph's log into its snapshot"""
+    def __init__(self, graph, interval: float = 5.0, threshold: int = 10000):
+        super().__init__(name="memory-compactor", daemon=True)
+        self.graph = graph
+        self.interval = interval
+        self.threshold = threshold
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            wal: Optional[WriteAheadLog] = self.graph._wal
+            if wal is None:
+                return
+            try:
+                wal.sync_if_due()
+                if wal.records_since_rotate >= self.threshold:
+                    self.graph.compact()
+            except Exception as e:
+                logger.error(f"Background compaction failed: {str(e)}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
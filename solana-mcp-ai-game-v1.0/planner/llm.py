@@ -1,13 +1,290 @@
 
-import openai
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import string
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import openai
+except ImportError:  # Only needed for the OpenAI-backed model
+    openai = None
+
+logger = logging.getLogger(__name__)
+
+
+class PromptTemplate:
+    """A prompt file parsed once into literal text and fields"""
+    def __init__(self, source: str):
+        self.source = source
+        self.version = hashlib.sha256(source.encode()).hexdigest()[:16]
+        self._parts: List[Tuple[str, Optional[str], str, Optional[str]]] = [
+            (literal, field, spec or "", conversion)
+            for literal, field, spec, conversion in string.Formatter().parse(source)
+        ]
+        self.fields = [field for _, field, _, _ in self._parts if field is not None]
+        # Attribute/index lookups and nested specs are left to str.format
+        self._simple = all(f.isidentifier() and "{" not in s
+                           for _, f, s, _ in self._parts if f is not None)
+
+    def render(self, **values: Any) -> str:
+        if not self._simple:
+            return self.source.format(**values)
+        out = []
+        for literal, field, spec, conversion in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = values[field]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "s":
+                value = str(value)
+            elif conversion == "a":
+                value = ascii(value)
+            out.append(format(value, spec))
+        return "".join(out)
+
+
+class PromptTemplates:
+    """
+    Prompt templates under `directory`, compiled on first use.
+    Files are stat'ed at most every `check_interval` seconds and recompiled
+    when their mtime or size changes.
+    """
+    def __init__(self, directory: str = "prompts", check_interval: float = 1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._templates: Dict[str, Tuple[Tuple[int, int], float, PromptTemplate]] = {}
+
+    def get(self, agent_name: str) -> PromptTemplate:
+        now = time.monotonic()
+        cached = self._templates.get(agent_name)
+        if cached and now < cached[1]:
+            return cached[2]
+        path = os.path.join(self.directory, f"{agent_name}.txt")
+        st = os.stat(path)
+        stat = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._templates.get(agent_name)
+            if cached and cached[0] == stat:
+                template = cached[2]
+            else:
+                with open(path) as f:
+                    template = PromptTemplate(f.read())
+                if cached:
+                    logger.info(f"Reloaded prompt template {agent_name}")
+            self._templates[agent_name] = (stat, now + self.check_interval, template)
+        return template
+
+    def invalidate(self, agent_name: Optional[str] = None) -> None:
+        with self._lock:
+            if agent_name is None:
+                self._templates.clear()
+            else:
+                self._templates.pop(agent_name, None)
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: Any) -> Any:
+    """Case- and whitespace-insensitive form of a prompt input"""
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip().casefold()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def decision_key(agent_name: str, memory: Any, player_input: Any, version: str = "") -> str:
+    """Cache key; `version` ties decisions to the prompt template that produced them"""
+    payload = json.dumps([agent_name, version, _normalize(memory), _normalize(player_input)],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "hit_rate": self.hit_rate}
+
+
+class DecisionCache:
+    """
+    LRU cache of model decisions with a TTL.
+    With `disk_path`, entries are also written to a SQLite file that is
+    consulted on memory misses, so decisions survive restarts.
+    """
+    def __init__(self, max_entries: int = 4096, ttl: Optional[float] = 600.0,
+                 disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS decisions "
+                             "(key TEXT PRIMARY KEY, expires REAL, value TEXT)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.stats.expirations += 1
+            if self._db is not None:
+                row = self._db.execute("SELECT expires, value FROM decisions WHERE key = ?",
+                                       (key,)).fetchone()
+                if row is not None and row[0] > now:
+                    self._store(key, row[0], row[1])
+                    self.stats.disk_hits += 1
+                    return row[1]
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        expires = time.time() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._store(key, expires, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO decisions VALUES (?, ?, ?)",
+                                 (key, expires, value))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM decisions")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, expires: float, value: str) -> None:
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+
+class OpenAIChatModel:
+    """Chat completion round trip to the OpenAI API"""
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        self.model = model
+
+    def __call__(self, prompt: str) -> str:
+        if openai is None:
+            raise RuntimeError("The openai package is required for OpenAIChatModel")
+        resp = openai.ChatCompletion.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return resp.choices[0].message['content'].strip()
+
+
+_ACTIONS = re.compile(r"available actions:\s*([^\n.]+)", re.IGNORECASE)
+
+
+class LocalModel:
+    """
+    Offline stand-in model. Picks one of the actions listed in the prompt
+    ("available actions: a, b"), deterministically per prompt, after
+    `latency` seconds.
+    """
+    def __init__(self, latency: float = 0.0, choose: Optional[Callable[[str], str]] = None):
+        self.latency = latency
+        self.choose = choose
+        self.calls = 0
+
+    def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.choose is not None:
+            return self.choose(prompt)
+        match = _ACTIONS.search(prompt)
+        actions = [a.strip() for a in match.group(1).split(",")] if match else ["noop"]
+        return random.Random(prompt).choice(actions)
+
+
+_templates = PromptTemplates()
+_cache = DecisionCache()
+_model: Callable[[str], str] = OpenAIChatModel()
+_retriever = None
+_recall_k = 5
+
+
+def set_model(model: Callable[[str], str]) -> None:
+    """Swap the backing model, e.g. for LocalModel in offline runs"""
+    global _model
+    _model = model
+
+
+def get_decision_cache() -> DecisionCache:
+    return _cache
+
+
+def set_decision_cache(cache: DecisionCache) -> None:
+    global _cache
+    _cache = cache
+
+
+def set_retriever(retriever, k: int = 5) -> None:
+    """Fill `{memory}` from `retriever` (memory.retrieval) when callers pass memory=None"""
+    global _retriever, _recall_k
+    _retriever, _recall_k = retriever, k
+
 
 def get_next_skill_from_prompt(agent_name, memory, player_input):
-    template_path = f"prompts/{agent_name}.txt"
-    with open(template_path) as f:
-        template = f.read()
-    prompt = template.format(memory=memory, player_input=player_input)
-    resp = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return resp.choices[0].message['content'].strip()
+    if memory is None and _retriever is not None:
+        memory = _retriever.context(str(player_input), k=_recall_k)
+    template = _templates.get(agent_name)
+    key = decision_key(agent_name, memory, player_input, template.version)
+    decision = _cache.get(key)
+    if decision is not None:
+        return decision
+    prompt = template.render(memory=memory, player_input=player_input)
+    decision = _model(prompt)
+    _cache.put(key, decision)
+    return decision
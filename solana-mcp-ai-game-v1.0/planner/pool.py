@@ -0,0 +1,164 @@
+
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+
+class DispatchPool:
+    """
+    Runs agent dispatches on a bounded worker pool, off the event loop.
+    At most `workers` dispatches run at once and `max_queue` more may wait;
+    admit() refuses work beyond that so callers can shed load (HTTP 429)
+    instead of queueing without bound. Single requests arriving in the same
+    loop iteration, and batches, go to the pool in chunks of `chunk_size`,
+    so a burst costs a few pool submissions rather than one per pair.
+    """
+    def __init__(self, dispatch_fn: Optional[Callable[[str, str], Dict[str, Any]]] = None,
+                 workers: int = 8, max_queue: int = 1024, chunk_size: int = 32):
+        if dispatch_fn is None:
+            from planner.planner import dispatch as dispatch_fn
+        self.dispatch_fn = dispatch_fn
+        self.workers = workers
+        self.max_queue = max_queue
+        self.chunk_size = chunk_size
+        self.stats: Dict[str, int] = {"admitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dispatch")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queued: List[Tuple[Pair, asyncio.Future]] = []
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def pending(self) -> int:
+        """Dispatches admitted and not yet finished"""
+        return self._pending
+
+    def admit(self, count: int = 1) -> bool:
+        """Reserve room for `count` dispatches; False when the pool is full"""
+        with self._lock:
+            if self._pending + count > self.capacity:
+                self.stats["rejected"] += count
+                return False
+            self._pending += count
+            self.stats["admitted"] += count
+            return True
+
+    async def run(self, agent: str, player: str) -> Dict[str, Any]:
+        """Dispatch one admitted pair on the pool"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures are loop-bound, e.g. across asyncio.run calls
+            self._loop, self._queued = loop, []
+        future = loop.create_future()
+        if not self._queued:
+            loop.call_soon(self._flush)
+        self._queued.append(((agent, player), future))
+        return await future
+
+    async def run_many(self, pairs: Sequence[Pair]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Dispatch admitted pairs; yields (index, result) as chunks finish"""
+        chunks: Dict[asyncio.Future, range] = {}
+        submitted = 0
+        try:
+            for i in range(0, len(pairs), self.chunk_size):
+                chunk = range(i, min(i + self.chunk_size, len(pairs)))
+                chunks[asyncio.wrap_future(self._submit([pairs[j] for j in chunk]))] = chunk
+                submitted += len(chunk)
+            waiting = set(chunks)
+            while waiting:
+                done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    for index, result in zip(chunks[future], future.result()):
+                        yield index, result
+        finally:
+            # e.g. the client went away mid-stream: drop chunks that haven't
+            # started; each chunk gives its slots back when its job ends
+            for future in chunks:
+                future.cancel()
+            self.release(len(pairs) - submitted)
+
+    def _flush(self) -> None:
+        queued, self._queued = self._queued, []
+        live = [(pair, future) for pair, future in queued if not future.cancelled()]
+        self.release(len(queued) - len(live))
+        for i in range(0, len(live), self.chunk_size):
+            chunk = live[i:i + self.chunk_size]
+            try:
+                job = asyncio.wrap_future(self._submit([pair for pair, _ in chunk]))
+            except Exception as e:
+                self.release(len(chunk))
+                for _, future in chunk:
+                    future.set_exception(e)
+                continue
+            job.add_done_callback(lambda job, chunk=chunk: _settle(job, chunk))
+
+    def release(self, count: int) -> None:
+        """Give back slots reserved by admit() that won't be dispatched"""
+        if count:
+            with self._lock:
+                self._pending -= count
+
+    def _submit(self, pairs: List[Pair]) -> Future:
+        # Slots are freed when the job ends (or is cancelled before it
+        # starts), not when the caller stops waiting, so admit() keeps
+        # bounding what the executor actually holds.
+        # Copy the context so tracing spans in the worker nest under the caller's
+        ctx = contextvars.copy_context()
+        job = self._executor.submit(ctx.run, self._dispatch_all, pairs)
+        job.add_done_callback(lambda _: self.release(len(pairs)))
+        return job
+
+    def _dispatch_all(self, pairs: List[Pair]) -> List[Dict[str, Any]]:
+        results, failed = [], 0
+        for agent, player in pairs:
+            try:
+                results.append(self.dispatch_fn(agent, player))
+            except Exception as e:
+                failed += 1
+                logger.error(f"Dispatch for {agent}/{player} failed: {str(e)}")
+                results.append({"error": str(e)})
+        with self._lock:
+            self.stats["completed"] += len(pairs) - failed
+            self.stats["failed"] += failed
+        return results
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def _settle(task: asyncio.Future, chunk: List[Tuple[Pair, asyncio.Future]]) -> None:
+    for i, (_, future) in enumerate(chunk):
+        if future.done():
+            continue
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result()[i])
+
+
+_pool: Optional[DispatchPool] = None
+
+
+def get_dispatch_pool() -> DispatchPool:
+    """Process-wide dispatch pool, created with defaults on first use"""
+    global _pool
+    if _pool is None:
+        _pool = DispatchPool()
+    return _pool
+
+
+def set_dispatch_pool(pool: Optional[DispatchPool]) -> None:
+    global _pool
+    _pool = pool
@@ -0,0 +1,163 @@
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from telemetry.tracing import span
+from tools.executor import SkillHandle, ToolChainExecutor
+
+logger = logging.getLogger(__name__)
+
+# Label for agents that aren't in the config
+UNKNOWN_AGENT = "unknown"
+
+
+class CompiledRegistry:
+    """Immutable view of one version of the skill and agent configs"""
+    def __init__(self, skills_config: Dict[str, Dict[str, Any]],
+                 rules: Dict[str, Dict[str, Any]], version: str):
+        self.skills_config = skills_config
+        self.rules = rules
+        self.version = version
+        self.executor = ToolChainExecutor(skills_config)
+        self.handles = self.executor.handles
+        self.chains: Dict[str, List[SkillHandle]] = {}
+        for agent, rule in rules.items():
+            chain = []
+            for skill_name in rule.get("behavior", []):
+                if skill_name not in self.handles:
+                    raise ValueError(f"Agent '{agent}' uses unknown skill '{skill_name}'")
+                chain.append(self.handles[skill_name])
+            self.chains[agent] = chain
+
+
+class SkillRegistry:
+    """
+    Skill and agent-rule registry compiled once and reused across dispatches.
+    Config files are stat'ed at most every `check_interval` seconds; when an
+    mtime or size changes the content hash decides whether to recompile.
+    A new version is swapped in atomically, and a broken config keeps the
+    previous version serving.
+    """
+    def __init__(self, skills_path: str = "config/skills.yaml",
+                 rules_path: str = "config/agent_rules.yaml",
+                 check_interval: float = 1.0):
+        self.skills_path = skills_path
+        self.rules_path = rules_path
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        self._stats: Optional[Tuple] = None
+        self._next_check = 0.0
+        self._compiled = self._compile(self._read_sources())
+        self._stats = self._stat_sources()
+        self._next_check = time.monotonic() + check_interval
+
+    @property
+    def compiled(self) -> CompiledRegistry:
+        self.maybe_reload()
+        return self._compiled
+
+    def dispatch(self, agent_type: str, player_id: str, event_log=None) -> Dict[str, Any]:
+        """Run an agent's behavior chain for a player, recording each action in `event_log`"""
+        chain = self.compiled.chains.get(agent_type) if isinstance(agent_type, str) else None
+        with span("dispatch", agent=agent_type if chain is not None else UNKNOWN_AGENT):
+            if chain is None:
+                return {"error": "unknown agent"}
+            actions = [handle(player_id) for handle in chain]
+            if event_log is not None:
+                now = time.time()
+                stamp = time.strftime("%H:%M:%S")
+                for handle, action in zip(chain, actions):
+                    event_log.append({"agent": agent_type, "player": player_id, "skill": handle.name,
+                                      "params": handle.params, "result": action,
+                                      "time": stamp, "ts": now})
+        return {"agent": agent_type, "player": player_id, "actions": actions}
+
+    def agent_label(self, agent_type: Any) -> str:
+        """
+        `agent_type` if it is a configured agent, else "unknown": metric labels
+        must not take arbitrary client input
+        """
+        if isinstance(agent_type, str) and agent_type in self._compiled.chains:
+            return agent_type
+        return UNKNOWN_AGENT
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        """Recompile if a config file changed; returns True when a new version was loaded"""
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False  # Another thread is already checking
+        try:
+            self._next_check = now + self.check_interval
+            try:
+                # Editors that save via temp file + rename leave a moment
+                # where the file is missing; keep serving and look again later
+                stats = self._stat_sources()
+                if not force and stats == self._stats:
+                    return False
+                sources = self._read_sources()
+            except OSError as e:
+                logger.warning(f"Keeping registry {self._compiled.version[:8]}, config unreadable: {str(e)}")
+                return False
+            self._stats = stats
+            if self._version(sources) == self._compiled.version:
+                return False
+            try:
+                compiled = self._compile(sources)
+            except Exception as e:
+                logger.error(f"Keeping registry {self._compiled.version[:8]}, reload failed: {str(e)}")
+                return False
+            self._compiled = compiled
+            logger.info(f"Reloaded skill registry {compiled.version[:8]}")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _stat_sources(self) -> Tuple:
+        stats = []
+        for path in (self.skills_path, self.rules_path):
+            st = os.stat(path)
+            stats.append((st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def _read_sources(self) -> Tuple[bytes, bytes]:
+        with open(self.skills_path, "rb") as f:
+            skills_src = f.read()
+        with open(self.rules_path, "rb") as f:
+            rules_src = f.read()
+        return skills_src, rules_src
+
+    @staticmethod
+    def _version(sources: Tuple[bytes, bytes]) -> str:
+        digest = hashlib.sha256()
+        for src in sources:
+            digest.update(hashlib.sha256(src).digest())
+        return digest.hexdigest()
+
+    def _compile(self, sources: Tuple[bytes, bytes]) -> CompiledRegistry:
+        with span("config_load"):
+            skills_src, rules_src = sources
+            skills_config = {s["name"]: s for s in yaml.safe_load(skills_src)["skills"]}
+            rules = yaml.safe_load(rules_src)["agents"]
+            return CompiledRegistry(skills_config, rules, self._version(sources))
+
+
+_default_registry: Optional[SkillRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_registry() -> SkillRegistry:
+    """Process-wide registry over the default config paths"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                _default_registry = SkillRegistry()
+    return _default_registry
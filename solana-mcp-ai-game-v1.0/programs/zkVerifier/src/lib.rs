@@ -58,6 +58,36 @@ pub mod zk_verifier {
         Ok(())
     }
 
+    /// Records the Merkle root of a batch of agent actions
+    /// @param root - Root over the batch's action leaves
+    /// @param size - Number of actions in the batch
+    /// @param timestamp - Unix timestamp when the batch was sealed
+    pub fn store_batch_root(
+        ctx: Context<StoreBatchRoot>,
+        root: [u8; 32],
+        size: u32,
+        timestamp: i64
+    ) -> Result<()> {
+        require!(size > 0, ErrorCode::EmptyBatch);
+        require!(timestamp > 0, ErrorCode::InvalidTimestamp);
+        
+        let batch = &mut ctx.accounts.batch;
+        batch.root = root;
+        batch.size = size;
+        batch.timestamp = timestamp;
+        batch.authority = ctx.accounts.user.key();
+        
+        emit!(BatchCommitted {
+            batch_id: batch.key(),
+            root,
+            size,
+            timestamp,
+            authority: ctx.accounts.user.key(),
+        });
+        
+        Ok(())
+    }
+
     /// Verifies if provided data matches a stored hash
     /// Returns true if verification passes
     pub fn verify_action(ctx: Context, data: String) -> Result {
@@ -144,6 +174,27 @@ pub struct ActionRecord {
     // Total: ~265 bytes
 }
 
+/// Merkle root of a batch of actions stored on-chain
+#[account]
+#[derive(Debug)]
+pub struct BatchRecord {
+    pub root: [u8; 32],           // 32 bytes
+    pub size: u32,                // 4 bytes
+    pub timestamp: i64,           // 8 bytes
+    pub authority: Pubkey,        // 32 bytes
+    // Total: 76 bytes
+}
+
+/// Event emitted when a batch root is committed
+#[event]
+pub struct BatchCommitted {
+    pub batch_id: Pubkey,
+    pub root: [u8; 32],
+    pub size: u32,
+    pub timestamp: i64,
+    pub authority: Pubkey,
+}
+
 /// Event emitted when a new action is recorded
 #[event]
 pub struct ActionRecorded {
@@ -184,6 +235,21 @@ pub struct StoreAction {
     pub system_program: Program,
 }
 
+#[derive(Accounts)]
+pub struct StoreBatchRoot<'info> {
+    #[account(
+        init,
+        payer = user,
+        space = 8 + 32 + 4 + 8 + 32
+    )]
+    pub batch: Account<'info, BatchRecord>,
+    
+    #[account(mut)]
+    pub user: Signer<'info>,
+    
+    pub system_program: Program<'info, System>,
+}
+
 #[derive(Accounts)]
 pub struct VerifyAction {
     pub record: Account,
@@ -214,4 +280,7 @@ pub enum ErrorCode {
     
     #[msg("Only the original authority can update metadata")]
     UnauthorizedMetadataUpdate,
+    
+    #[msg("Batch must contain at least one action")]
+    EmptyBatch,
 }
@@ -1,13 +1,103 @@
 
-from fastapi import FastAPI, Request
-from planner.planner import dispatch
+from contextlib import asynccontextmanager
+import asyncio
+import json
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from eventlog.writer import EventLogWriter, set_event_log
+from planner.pool import DispatchPool, get_dispatch_pool, set_dispatch_pool
+from planner.registry import get_registry
+from telemetry import tracing
+from telemetry.profiler import profile_for
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Every dispatched action is appended to the shared event log
+    event_log = EventLogWriter("data/log")
+    set_event_log(event_log)
+    pool = DispatchPool()
+    set_dispatch_pool(pool)
+    tracing.enable()
+    yield
+    tracing.enable(False)
+    set_dispatch_pool(None)
+    pool.close()
+    set_event_log(None)
+    event_log.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Largest /mcp/context/batch request accepted
+MAX_BATCH = 1000
+
+def _overloaded() -> JSONResponse:
+    return JSONResponse({"error": "overloaded"}, status_code=429, headers={"Retry-After": "1"})
 
 @app.post("/mcp/context")
 async def mcp_entry(req: Request):
     body = await req.json()
     agent = body.get("agent")
     player = body.get("player", "anonymous")
-    result = dispatch(agent, player)
+    pool = get_dispatch_pool()
+    if not pool.admit():
+        return _overloaded()
+    with tracing.span("mcp_context", agent=get_registry().agent_label(agent)):
+        # Config reloads and skill work run on the pool, not the event loop
+        result = await pool.run(agent, player)
     return result
+
+@app.post("/mcp/context/batch")
+async def mcp_batch(req: Request):
+    """
+    Dispatch many {"agent", "player"} requests at once. Results stream back
+    as NDJSON lines {"index": i, ...result} in completion order.
+    """
+    body = await req.json()
+    requests = body.get("requests") if isinstance(body, dict) else None
+    if not isinstance(requests, list) or not all(isinstance(r, dict) for r in requests):
+        raise HTTPException(status_code=400, detail='Expected {"requests": [{"agent": ..., "player": ...}, ...]}')
+    if len(requests) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH} requests per batch")
+    pairs = [(r.get("agent"), r.get("player", "anonymous")) for r in requests]
+    pool = get_dispatch_pool()
+    # All or nothing, so a client never gets half a batch because of load
+    if not pool.admit(len(pairs)):
+        return _overloaded()
+
+    return _BatchStream(pool, pairs)
+
+class _BatchStream(StreamingResponse):
+    """NDJSON results of admitted pairs; frees the slots if the body never starts"""
+    def __init__(self, pool: DispatchPool, pairs):
+        self._pool = pool
+        self._pairs = pairs
+        self._started = False
+        super().__init__(self._lines(), media_type="application/x-ndjson")
+
+    async def _lines(self):
+        self._started = True
+        async for index, result in self._pool.run_many(self._pairs):
+            yield json.dumps({"index": index, **result}) + "\n"
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Once started, run_many owns the slots
+            if not self._started:
+                self._pool.release(len(self._pairs))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-stage latency histograms and counters in Prometheus text format"""
+    pool = get_dispatch_pool()
+    lines = ["# TYPE mcp_dispatch_pending gauge", f"mcp_dispatch_pending {pool.pending()}",
+             "# TYPE mcp_dispatch_rejected_total counter",
+             f"mcp_dispatch_rejected_total {pool.stats['rejected']}"]
+    return PlainTextResponse(tracing.render_prometheus() + "\n".join(lines) + "\n",
+                             media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = Query(5.0, gt=0, le=60), interval: float = Query(0.005, ge=0.001)):
+    """Sample every thread for `seconds`; returns collapsed stacks for flamegraph.pl"""
+    return await asyncio.to_thread(profile_for, seconds, interval)
@@ -1,38 +1,38 @@
 
-from llm.decoder import mock_llm_decision
-from tools.executor import ToolChainExecutor
-from sdk.anchor_client import AnchorZKClient
-from memory.graph import MemoryGraph
-import yaml
-import json
-import random
-
-def simulate_agents():
-    agents = ["thief", "guard"]
-    context = {"env": "town-square", "time": "14:00"}
-    mem = MemoryGraph()
-
-    with open("config/skills.yaml") as f:
-        skills = {s["name"]: s for s in yaml.safe_load(f)["skills"]}
-    executor = ToolChainExecutor(skills)
-    zk = AnchorZKClient()
+from typing import Optional
 
-    logs = []
-
-    for _ in range(3):
-        for agent in agents:
-            skill = mock_llm_decision(agent, context)
-            result = executor.execute(skill["action"], agent)
-            proof = zk.store_proof(agent, str(result))
-            mem.add_memory("town-activity", agent, result)
+from eventlog.writer import EventLogWriter
+from memory.graph import MemoryGraph
+from memory.service import connect
+from sdk.anchor_client import AnchorZKClient
+from sdk.local_chain import LocalChain
+from sdk.pipeline import ProofPipeline
+from sim.engine import ClientDecider, WorldEngine
 
-            logs.append({
-                "agent": agent,
-                "skill": skill["action"],
-                "params": skill["params"],
-                "zk_hash": proof,
-                "time": time.strftime("%H:%M:%S")
-            })
-    with open("data/log.jsonl", "w") as f:
-        for log in logs:
-            f.write(json.dumps(log) + "\n")
+def simulate_agents(ticks: int = 3, config_path: str = "config/agents.yaml",
+                    memory_socket_dir: Optional[str] = None, decider=None):
+    """
+    Run the configured population for `ticks` ticks with memory, proofs and
+    logging. With `memory_socket_dir`, memory is the shared service there
+    (see memory.service) rather than a graph private to this process.
+    `decider` (an llm.client.AsyncDecisionClient) picks each NPC's tool;
+    without one, NPCs pick with their seeded RNGs.
+    """
+    # Proofs settle in the background; ticks don't wait on the chain
+    pipeline = ProofPipeline(LocalChain())
+    event_log = EventLogWriter("data/log")
+    memory = connect(memory_socket_dir) if memory_socket_dir else MemoryGraph()
+    decide = ClientDecider(decider) if decider is not None else None
+    engine = WorldEngine(config_path, memory=memory,
+                         prover=AnchorZKClient(pipeline=pipeline), event_log=event_log,
+                         decide=decide)
+    try:
+        engine.run(ticks)
+    finally:
+        pipeline.close()
+        event_log.close()
+        if memory_socket_dir:
+            memory.close()
+        if decide is not None:
+            decide.close()
+    return engine
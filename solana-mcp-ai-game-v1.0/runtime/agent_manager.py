@@ -1,6 +1,10 @@
 import asyncio
+import inspect
 import logging
-from typing import List, Dict, Any, Optional
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional
 from dataclasses import dataclass
 from planner.planner import dispatch
 
@@ -17,8 +21,15 @@ class AgentManager:
     Manages the lifecycle and execution of game agents.
     Provides concurrent execution and dependency management.
     """
-    def __init__(self, agent_config_path: str):
-        """Initialize with configuration file path instead of raw list"""
+    def __init__(self, agent_config_path: str,
+                 agent_timeout: float = 30.0,
+                 max_concurrency: int = 32,
+                 dispatch_fn: Optional[Callable] = None):
+        """
+        Initialize with configuration file path instead of raw list.
+        `agent_timeout` can be overridden per agent with a `timeout` key;
+        `max_concurrency` caps agents running at once across all calls.
+        """
         import yaml
         with open(agent_config_path, 'r') as f:
             config = yaml.safe_load(f)
@@ -26,7 +37,16 @@ class AgentManager:
         self.agents = config.get('agents', {})
         self.dependencies = config.get('dependencies', {})
         self.execution_order = self._resolve_execution_order()
+        self.levels = self._resolve_levels()
         self.results_cache = {}
+        self.agent_timeout = agent_timeout
+        self._dispatch = dispatch_fn or dispatch
+        self.max_concurrency = max_concurrency
+        # Event loop -> concurrency limit; dropped along with the loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        # Sync dispatch runs here so it never blocks the event loop
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix="agent")
         
     def _resolve_execution_order(self) -> List[str]:
         """Resolves agent execution order based on dependencies"""
@@ -50,41 +70,98 @@ class AgentManager:
             if agent not in visited:
                 visit(agent)
                 
-        return list(reversed(order))
+        # Post-order already lists every dependency before its dependents
+        return order
+
+    def _resolve_levels(self) -> List[List[str]]:
+        """Groups agents so each level only depends on earlier levels"""
+        depth: Dict[str, int] = {}
+        for agent in self.execution_order:
+            deps = self.dependencies.get(agent, [])
+            depth[agent] = 1 + max((depth[d] for d in deps if d in depth), default=-1)
+        levels: List[List[str]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for agent in self.execution_order:
+            levels[depth[agent]].append(agent)
+        return levels
     
-    async def run_agent(self, agent: str, context: AgentContext) -> Dict[str, Any]:
-        """Execute an agent with proper context and error handling"""
+    async def run_agent(self, agent: str, context: AgentContext,
+                        timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Execute an agent with proper context and error handling.
+        Records its wall time (s) in `timings` when given.
+        """
         logger.info(f"Running agent {agent} for player {context.player_id}")
+        timeout = (self.agents.get(agent) or {}).get("timeout", self.agent_timeout)
+        started = time.perf_counter()
         try:
-            result = await dispatch(agent, context.player_id, context.environment)
+            async with self._semaphore():
+                result = await asyncio.wait_for(self._call(agent, context), timeout)
             self.results_cache[agent] = result
             logger.debug(f"Agent {agent} execution completed: {result}")
             return result
+        except asyncio.TimeoutError:
+            # A sync dispatch keeps running in its worker thread; only the wait is abandoned
+            logger.error(f"Agent {agent} timed out after {timeout}s")
+            return {"error": f"timed out after {timeout}s", "agent": agent}
         except Exception as e:
             logger.error(f"Failed to execute agent {agent}: {str(e)}", exc_info=True)
             return {"error": str(e), "agent": agent}
+        finally:
+            if timings is not None:
+                timings[agent] = time.perf_counter() - started
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _call(self, agent: str, context: AgentContext) -> Dict[str, Any]:
+        if inspect.iscoroutinefunction(self._dispatch):
+            return await self._dispatch(agent, context.player_id)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._dispatch,
+                                          agent, context.player_id)
     
     async def run_all(self, player_id: str, environment: Dict[str, Any] = None) -> Dict[str, Any]:
         """
-        Execute all agents in dependency order with shared context
+        Execute all agents level by level: agents within a level run
+        concurrently, and an agent is skipped if any dependency failed.
         Returns consolidated results
         """
         environment = environment or {}
         context = AgentContext(player_id=player_id, environment=environment)
         
         results = {}
-        # Execute in dependency order, not randomly
-        for agent in self.execution_order:
-            results[agent] = await self.run_agent(agent, context)
-            # Update environment with results for next agents
+        timings: Dict[str, float] = {}
+        failed = set()
+        for level in self.levels:
+            runnable = []
+            for agent in level:
+                blocked = [d for d in self.dependencies.get(agent, []) if d in failed]
+                if blocked:
+                    results[agent] = {"error": f"skipped: upstream {', '.join(blocked)} failed",
+                                      "agent": agent}
+                    failed.add(agent)
+                else:
+                    runnable.append(agent)
+            level_results = await asyncio.gather(
+                *(self.run_agent(agent, context, timings) for agent in runnable))
+            for agent, result in zip(runnable, level_results):
+                results[agent] = result
+                if isinstance(result, dict) and "error" in result:
+                    failed.add(agent)
+            # Update environment with results for next level
             context.environment.update({
-                "latest_actions": {agent: results[agent]}
+                "latest_actions": dict(zip(runnable, level_results))
             })
             
         return {
             "player": player_id,
-            "timestamp": asyncio.get_event_loop().time(),
-            "results": results
+            "timestamp": asyncio.get_running_loop().time(),
+            "results": results,
+            "timings": {agent: timings.get(agent) for agent in results}
         }
     
     async def run_selective(self, agents: List[str], player_id: str, 
@@ -93,12 +170,14 @@ class AgentManager:
         environment = environment or {}
         context = AgentContext(player_id=player_id, environment=environment)
         
-        tasks = [self.run_agent(agent, context) for agent in agents 
-                if agent in self.agents]
-        results = await asyncio.gather(*tasks)
+        selected = [agent for agent in agents if agent in self.agents]
+        results = await asyncio.gather(*(self.run_agent(agent, context) for agent in selected))
         
         return {
             "player": player_id,
-            "agents": agents,
-            "results": dict(zip(agents, results))
+            "agents": selected,
+            "results": dict(zip(selected, results))
         }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
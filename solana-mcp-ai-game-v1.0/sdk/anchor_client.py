@@ -1,15 +1,119 @@
 
 import hashlib
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sdk.merkle import MerkleTree, ProofStep, leaf_hash, verify_inclusion
+from telemetry.tracing import span
+
+@dataclass
+class ProofReceipt:
+    """Where an action landed: its batch root plus the path proving inclusion"""
+    agent_id: str
+    digest: str
+    batch: int
+    index: int
+    root: str
+    proof: List[ProofStep]
 
 class AnchorZKClient:
-    def __init__(self):
+    def __init__(self, batch_size: int = 0, pipeline=None, action_type: int = 1,
+                 max_batches: int = 1024):
+        """
+        batch_size=0 keeps one proof per action. With batch_size > 0, action
+        digests are collected and only a Merkle root is committed per batch
+        (every `batch_size` actions, or on commit_batch(), e.g. once per tick).
+        Trees for the newest `max_batches` batches are kept to answer
+        get_receipt; older roots stay in `roots` but lose their receipts.
+        With a ProofPipeline, on-chain submissions happen in the background
+        and store_proof returns as soon as the digest is known.
+        """
         self.chain_memory = {}
+        self.batch_size = batch_size
+        self.pipeline = pipeline
+        self.action_type = action_type
+        self.roots: List[Dict] = []            # Committed batch roots, in order
+        self._pending: List[Tuple[str, str]] = []
+        self.max_batches = max_batches
+        # batch -> (tree, [(agent, digest)] per leaf), oldest first
+        self._batches: Dict[int, Tuple[MerkleTree, List[Tuple[str, str]]]] = {}
+        # digest -> (batch, index) of every retained leaf with that digest, oldest first
+        self._locations: Dict[str, List[Tuple[int, int]]] = {}
 
     def store_proof(self, agent_id, memory_str):
-        digest = hashlib.sha256(memory_str.encode()).hexdigest()
-        self.chain_memory[agent_id] = digest
+        # Agent ids may be per NPC; the label comes from the enclosing span
+        with span("proof"):
+            digest = hashlib.sha256(memory_str.encode()).hexdigest()
+            self.chain_memory[agent_id] = digest
+            if self.batch_size:
+                self._pending.append((agent_id, digest))
+                if len(self._pending) >= self.batch_size:
+                    self.commit_batch()
+            elif self.pipeline:
+                self.pipeline.submit("store_action", agent_id, self.action_type,
+                                     memory_str, int(time.time()))
         return digest
 
     def verify_proof(self, agent_id, value):
         digest = hashlib.sha256(value.encode()).hexdigest()
         return self.chain_memory.get(agent_id) == digest
+
+    def commit_batch(self) -> Optional[str]:
+        """Fold pending digests into a Merkle tree and commit its root"""
+        if not self._pending:
+            return None
+        batch = len(self.roots)
+        leaves, self._pending = self._pending, []
+        tree = MerkleTree([leaf_hash(agent, digest) for agent, digest in leaves])
+        for index, (_, digest) in enumerate(leaves):
+            self._locations.setdefault(digest, []).append((batch, index))
+        self._batches[batch] = (tree, leaves)
+        while len(self._batches) > self.max_batches:
+            self._forget(next(iter(self._batches)))
+        self._commit_root(tree.root, len(tree))
+        return tree.root
+
+    def get_receipt(self, memory_str: str, agent_id: Optional[str] = None) -> Optional[ProofReceipt]:
+        """
+        Inclusion proof for the newest committed copy of an action (by
+        `agent_id`, if given), or None if there isn't one yet
+        """
+        digest = hashlib.sha256(memory_str.encode()).hexdigest()
+        for batch, index in reversed(self._locations.get(digest, ())):
+            tree, leaves = self._batches[batch]
+            agent = leaves[index][0]
+            if agent_id is None or agent == agent_id:
+                return ProofReceipt(agent_id=agent, digest=digest, batch=batch, index=index,
+                                    root=tree.root, proof=tree.proof(index))
+        return None
+
+    def _forget(self, batch: int) -> None:
+        _, leaves = self._batches.pop(batch)
+        for _, digest in leaves:
+            # Batches are dropped oldest first, so theirs lead each list
+            locations = self._locations[digest]
+            del locations[0]
+            if not locations:
+                del self._locations[digest]
+
+    def verify_inclusion(self, memory_str: str, receipt: ProofReceipt) -> bool:
+        """Verify an action against its committed batch root in O(log n)"""
+        if not 0 <= receipt.batch < len(self.roots):
+            return False
+        if self.roots[receipt.batch]["root"] != receipt.root:
+            return False
+        digest = hashlib.sha256(memory_str.encode()).hexdigest()
+        return verify_inclusion(leaf_hash(receipt.agent_id, digest), receipt.proof, receipt.root)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Commit the open batch and wait for background submissions to settle"""
+        self.commit_batch()
+        if self.pipeline:
+            self.pipeline.flush(timeout)
+
+    def _commit_root(self, root: str, size: int) -> None:
+        timestamp = int(time.time())
+        self.roots.append({"root": root, "size": size, "timestamp": timestamp})
+        if self.pipeline:
+            self.pipeline.submit("store_batch_root", root, size, timestamp)
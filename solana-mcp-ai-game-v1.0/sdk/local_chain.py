@@ -0,0 +1,85 @@
+
+import asyncio
+import hashlib
+import random
+import time
+from typing import Dict, Optional
+
+# Mirrors ActionType in programs/zkVerifier/src/lib.rs
+ACTION_TYPES = {
+    "movement": 0,
+    "interaction": 1,
+    "crafting": 2,
+    "combat": 3,
+    "trading": 4,
+    "quest": 5,
+}
+
+
+class ChainError(Exception):
+    """The program rejected the instruction (retrying will not help)"""
+
+
+class TransientChainError(Exception):
+    """Simulated RPC/network failure (safe to retry)"""
+
+
+class LocalChain:
+    """
+    In-process stand-in for the zkVerifier program.
+    Applies the same validation as store_action / store_batch_root and
+    stores the resulting records, with configurable latency and a
+    transient failure rate so submission throughput can be measured offline.
+    """
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.records: Dict[str, Dict] = {}
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def store_action(self, agent_id: str, action_type: int, data: str,
+                           timestamp: int) -> str:
+        await self._network()
+        if not agent_id:
+            raise ChainError("Agent ID cannot be empty")
+        if not data:
+            raise ChainError("Action data cannot be empty")
+        if timestamp <= 0:
+            raise ChainError("Invalid timestamp")
+        if action_type not in ACTION_TYPES.values():
+            raise ChainError("Invalid action type")
+        return self._record({
+            "kind": "action",
+            "agent": agent_id,
+            "action_type": action_type,
+            "hash": hashlib.sha256(data.encode()).hexdigest(),
+            "timestamp": timestamp,
+        })
+
+    async def store_batch_root(self, root: str, size: int, timestamp: int) -> str:
+        await self._network()
+        if size <= 0:
+            raise ChainError("Batch must contain at least one action")
+        if timestamp <= 0:
+            raise ChainError("Invalid timestamp")
+        return self._record({"kind": "batch", "root": root, "size": size, "timestamp": timestamp})
+
+    def verify_action(self, signature: str, data: str) -> bool:
+        record = self.records.get(signature)
+        return bool(record) and record.get("hash") == hashlib.sha256(data.encode()).hexdigest()
+
+    async def _network(self) -> None:
+        self.calls += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise TransientChainError("simulated RPC failure")
+
+    def _record(self, record: Dict) -> str:
+        signature = hashlib.sha256(f"{len(self.records)}:{time.time_ns()}:{record}".encode()).hexdigest()
+        self.records[signature] = record
+        return signature
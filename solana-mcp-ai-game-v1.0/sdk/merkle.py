@@ -0,0 +1,66 @@
+
+import hashlib
+from typing import List, Sequence, Tuple
+
+# Domain separation keeps a leaf from ever being confused with an inner node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+# One proof step: (sibling hash hex, sibling is on the left)
+ProofStep = Tuple[str, bool]
+
+
+def leaf_hash(agent_id: str, digest: str) -> bytes:
+    """Leaf for one action: binds the agent to the action digest"""
+    return hashlib.sha256(LEAF_PREFIX + agent_id.encode() + b"\x00" + bytes.fromhex(digest)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """
+    Binary Merkle tree over a fixed list of leaves.
+    An odd node at the end of a level is promoted unchanged instead of
+    being paired with a copy of itself, so no two leaf lists share a root.
+    """
+    def __init__(self, leaves: Sequence[bytes]):
+        if not leaves:
+            raise ValueError("Merkle tree needs at least one leaf")
+        self.levels: List[List[bytes]] = [list(leaves)]
+        level = self.levels[0]
+        while len(level) > 1:
+            parent = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parent.append(level[-1])
+            self.levels.append(parent)
+            level = parent
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    @property
+    def root(self) -> str:
+        return self.levels[-1][0].hex()
+
+    def proof(self, index: int) -> List[ProofStep]:
+        """Sibling path from leaf `index` up to the root"""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Leaf {index} out of range")
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append((level[sibling].hex(), sibling < index))
+            index //= 2
+        return path
+
+
+def verify_inclusion(leaf: bytes, proof: Sequence[ProofStep], root: str) -> bool:
+    """Check a leaf against a root in O(log n) hashes"""
+    node = leaf
+    for sibling_hex, sibling_is_left in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        node = node_hash(sibling, node) if sibling_is_left else node_hash(node, sibling)
+    return node.hex() == root
@@ -0,0 +1,121 @@
+
+import asyncio
+import logging
+import random
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from sdk.local_chain import ChainError
+
+logger = logging.getLogger(__name__)
+
+
+class ProofPipeline:
+    """
+    Background submission of proof instructions to a chain client.
+    Submissions go into a bounded queue served by `max_in_flight` workers
+    on a dedicated event-loop thread; a full queue blocks the submitter
+    (backpressure). Transient failures are retried with full-jitter
+    exponential backoff; program errors fail immediately.
+    `chain` is any object with async instruction methods, e.g. LocalChain.
+    """
+    def __init__(self, chain, max_queue: int = 1024, max_in_flight: int = 8,
+                 max_retries: int = 5, base_delay: float = 0.05, max_delay: float = 2.0):
+        self.chain = chain
+        self.max_queue = max_queue
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats: Dict[str, int] = {"submitted": 0, "confirmed": 0, "failed": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+        self._rng = random.Random()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="proof-pipeline", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def submit(self, method: str, *args: Any, timeout: Optional[float] = None) -> Future:
+        """
+        Queue `chain.<method>(*args)`; returns a Future with the signature.
+        Blocks while the queue is full (up to `timeout` seconds).
+        """
+        if self._loop.is_closed():
+            raise RuntimeError("Proof pipeline is closed")
+        result: Future = Future()
+        put = asyncio.run_coroutine_threadsafe(self._queue.put((method, args, result)), self._loop)
+        try:
+            put.result(timeout)
+        except TimeoutError:
+            put.cancel()
+            # The put may still land; a cancelled result makes the worker
+            # skip it. If a worker already claimed it, it was submitted.
+            if result.cancel():
+                raise
+        with self._stats_lock:
+            self.stats["submitted"] += 1
+        return result
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until every queued submission has settled"""
+        asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop).result(timeout)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush, then stop the workers and the loop thread"""
+        if self._loop.is_closed():
+            return
+        self.flush(timeout)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.max_in_flight)]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _shutdown(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            method, args, result = await self._queue.get()
+            if not result.set_running_or_notify_cancel():
+                # The submitter timed out waiting for queue space
+                self._queue.task_done()
+                continue
+            try:
+                signature = await self._send(method, args)
+                self.stats["confirmed"] += 1
+                result.set_result(signature)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Proof submission {method} failed: {str(e)}")
+                result.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, method: str, args) -> str:
+        attempt = 0
+        while True:
+            try:
+                return await getattr(self.chain, method)(*args)
+            except ChainError:
+                raise
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._rng.uniform(0, delay))
@@ -0,0 +1,334 @@
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+from memory.wal import write_json_atomic
+from telemetry.tracing import span
+from tools.executor import SkillHandle
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+
+def _bind(handle: SkillHandle) -> Callable[[str, random.Random, int], Dict[str, Any]]:
+    """Direct call into a skill with only the per-tick arguments it accepts"""
+    klass, params = handle.klass, handle.params
+    takes_rng, takes_hour = "rng" in handle.accepts, "hour" in handle.accepts
+    if takes_rng and takes_hour:
+        return lambda pid, rng, hour: klass(pid, rng=rng, hour=hour, **params).run()
+    if takes_rng:
+        return lambda pid, rng, hour: klass(pid, rng=rng, **params).run()
+    if takes_hour:
+        return lambda pid, rng, hour: klass(pid, hour=hour, **params).run()
+    return lambda pid, rng, hour: klass(pid, **params).run()
+
+
+def derive_seed(seed: int, name: str) -> int:
+    """Independent, stable seed for one stream of the world seed"""
+    return int.from_bytes(hashlib.sha256(f"{seed}:{name}".encode()).digest()[:8], "big")
+
+
+class NPC:
+    __slots__ = ("npc_id", "agent_type", "tools", "rng", "inventory", "actions")
+
+    def __init__(self, npc_id: str, agent_type: str, tools: List[str], rng: random.Random):
+        self.npc_id = npc_id
+        self.agent_type = agent_type
+        self.tools = tools
+        self.rng = rng
+        self.inventory: Dict[str, float] = {}
+        self.actions = 0
+
+    def state(self) -> Dict[str, Any]:
+        version, internal, gauss = self.rng.getstate()
+        return {"id": self.npc_id, "type": self.agent_type, "inventory": self.inventory,
+                "actions": self.actions, "rng": [version, list(internal), gauss]}
+
+
+# Chooses a tool for each NPC given the tick's context; None leaves that
+# NPC to its seeded pick
+Decider = Callable[[List[NPC], Dict[str, Any]], List[Optional[str]]]
+
+
+class ClientDecider:
+    """
+    Decider backed by an AsyncDecisionClient (llm.client): all NPCs decide
+    together each tick, and NPCs of one type share a request, so the
+    client's coalescing keeps it to one model call per agent type.
+    Decisions outside an NPC's tools fall back to the seeded pick.
+    The client runs on one event loop in a thread of its own, so the
+    engine may tick from inside another loop too.
+    """
+    def __init__(self, client):
+        self.client = client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="sim-decider", daemon=True)
+        self._thread.start()
+
+    def __call__(self, npcs: List[NPC], context: Dict[str, Any]) -> List[Optional[str]]:
+        requests = [(npc.agent_type, dict(context, tools=npc.tools)) for npc in npcs]
+        decisions = asyncio.run_coroutine_threadsafe(self.client.decide_many(requests), self._loop).result()
+        return [d["action"] if d["action"] in npc.tools else None for npc, d in zip(npcs, decisions)]
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def prompt_decision(agent: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """Decision function for llm.client.CallableBackend using the prompt planner"""
+    from planner.llm import get_next_skill_from_prompt
+    player_input = f"Hour {context.get('hour')}. Available actions: {', '.join(context.get('tools', []))}."
+    return {"action": get_next_skill_from_prompt(agent, None, player_input).strip(), "params": {}}
+
+
+class WorldEngine:
+    """
+    Fixed-timestep world simulation.
+    Every tick, each NPC picks one of its tools with its own seeded RNG and
+    runs it at the tick's game time, so a run is a pure function of the
+    seed, the population and the tick count. Memory writes, proofs and
+    event logging are optional hooks; leave them off for headless load tests.
+    A `decide` hook (e.g. ClientDecider) replaces the seeded tool choice
+    with a planner's; replays then depend on the planner's answers too.
+    """
+    def __init__(self, config_path: str = "config/agents.yaml",
+                 skills_path: str = "config/skills.yaml",
+                 seed: Optional[int] = None,
+                 tick_rate: Optional[float] = None,
+                 memory=None, prover=None, event_log=None,
+                 agents: Optional[Dict[str, Dict[str, Any]]] = None,
+                 decide: Optional[Decider] = None):
+        with open(config_path) as f:
+            config = yaml.safe_load(f) or {}
+        sim = config.get("simulation", {})
+        self.seed = sim.get("seed", 0) if seed is None else seed
+        self.tick_rate = float(tick_rate or sim.get("tick_rate", 1.0))
+        self.start_time = float(sim.get("start_time", 0.0))
+        self.tick = 0
+        self.memory = memory
+        self.prover = prover
+        self.event_log = event_log
+        self.decide = decide
+
+        with open(skills_path) as f:
+            skills = {s["name"]: s for s in yaml.safe_load(f)["skills"]}
+        self.agents = agents if agents is not None else config.get("agents", {})
+        self.handles: Dict[str, SkillHandle] = {}
+        self._calls: Dict[str, Callable] = {}
+        self.npcs: List[NPC] = []
+        for agent_type in sorted(self.agents):
+            spec = self.agents[agent_type]
+            tools = list(spec.get("tools", []))
+            for tool in tools:
+                if tool not in skills:
+                    raise ValueError(f"Agent '{agent_type}' uses unknown skill '{tool}'")
+                if tool not in self.handles:
+                    self.handles[tool] = SkillHandle.resolve(tool, skills[tool])
+                    self._calls[tool] = _bind(self.handles[tool])
+            for i in range(spec.get("count", 1)):
+                npc_id = f"{agent_type}-{i}"
+                self.npcs.append(NPC(npc_id, agent_type, tools,
+                                     random.Random(derive_seed(self.seed, npc_id))))
+
+    @property
+    def world_time(self) -> float:
+        return self.start_time + self.tick / self.tick_rate
+
+    def step(self) -> None:
+        """Advance the world by one tick"""
+        now = self.world_time
+        hour = int(now // 3600) % 24
+        calls = self._calls
+        record = self.memory is not None or self.prover is not None or self.event_log is not None
+        # One span per tick rather than per skill call; the recording hooks
+        # still time each proof and memory write
+        with span("tick"):
+            choices = self._decisions(hour) if self.decide is not None else {}
+            for npc in self.npcs:
+                tools = npc.tools
+                if not tools:
+                    continue
+                tool = choices.get(npc.npc_id)
+                if tool is None:
+                    tool = tools[0] if len(tools) == 1 else tools[npc.rng.randrange(len(tools))]
+                result = calls[tool](npc.npc_id, npc.rng, hour)
+                npc.actions += 1
+                item = result.get("item")
+                if item is not None:
+                    npc.inventory[item] = round(npc.inventory.get(item, 0) + result.get("value", 1), 2)
+                if record:
+                    self._record(npc, tool, result, now)
+        self.tick += 1
+
+    def _decisions(self, hour: int) -> Dict[str, str]:
+        """The decide hook's picks for this tick, by NPC id"""
+        npcs = [npc for npc in self.npcs if len(npc.tools) > 1]
+        if not npcs:
+            return {}
+        try:
+            with span("decide"):
+                picks = self.decide(npcs, {"tick": self.tick, "hour": hour})
+        except Exception as e:
+            logger.error(f"Decisions for tick {self.tick} failed, using seeded picks: {str(e)}")
+            return {}
+        return {npc.npc_id: tool for npc, tool in zip(npcs, picks) if tool is not None}
+
+    def run(self, ticks: int, realtime: bool = False,
+            checkpoint_path: Optional[str] = None, checkpoint_every: int = 0) -> Dict[str, float]:
+        """
+        Run `ticks` ticks, as fast as possible unless `realtime` paces them at
+        `tick_rate`. Checkpoints every `checkpoint_every` ticks and at the end
+        when `checkpoint_path` is set.
+        """
+        start = time.perf_counter()
+        deadline = time.monotonic()
+        for _ in range(ticks):
+            self.step()
+            if checkpoint_path and checkpoint_every and self.tick % checkpoint_every == 0:
+                self.checkpoint(checkpoint_path)
+            if realtime:
+                deadline += 1.0 / self.tick_rate
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        if checkpoint_path:
+            self.checkpoint(checkpoint_path)
+        elapsed = time.perf_counter() - start
+        npc_ticks = ticks * len(self.npcs)
+        return {"ticks": ticks, "npc_ticks": npc_ticks, "elapsed": elapsed,
+                "npc_ticks_per_sec": npc_ticks / elapsed if elapsed else 0.0}
+
+    def state(self) -> Dict[str, Any]:
+        """Everything needed to continue the run, memory excluded"""
+        return {"version": CHECKPOINT_VERSION, "seed": self.seed, "tick_rate": self.tick_rate,
+                "start_time": self.start_time, "tick": self.tick, "agents": self.agents,
+                "npcs": [npc.state() for npc in self.npcs]}
+
+    def digest(self) -> str:
+        """Fingerprint of the world state; equal digests mean identical runs"""
+        return hashlib.sha256(json.dumps(self.state(), sort_keys=True).encode()).hexdigest()
+
+    def checkpoint(self, path: str) -> None:
+        state = self.state()
+        if self.memory is not None and hasattr(self.memory, "export_state"):
+            state["memory"] = self.memory.export_state()
+        write_json_atomic(path, state)
+        logger.info(f"Checkpointed world at tick {self.tick} to {path}")
+
+    @classmethod
+    def resume(cls, path: str, config_path: str = "config/agents.yaml",
+               skills_path: str = "config/skills.yaml", **hooks) -> "WorldEngine":
+        """Rebuild an engine from a checkpoint; the population comes from the checkpoint"""
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state.get('version')}")
+        engine = cls(config_path, skills_path, seed=state["seed"], tick_rate=state["tick_rate"],
+                     agents=state["agents"], **hooks)
+        engine.start_time = state["start_time"]
+        engine.tick = state["tick"]
+        by_id = {npc.npc_id: npc for npc in engine.npcs}
+        for saved in state["npcs"]:
+            npc = by_id[saved["id"]]
+            npc.inventory = saved["inventory"]
+            npc.actions = saved["actions"]
+            version, internal, gauss = saved["rng"]
+            npc.rng.setstate((version, tuple(internal), gauss))
+        if engine.memory is not None and "memory" in state and hasattr(engine.memory, "load_state"):
+            engine.memory.load_state(state["memory"])
+        logger.info(f"Resumed world at tick {engine.tick} from {path}")
+        return engine
+
+    def _record(self, npc: NPC, tool: str, result: Dict[str, Any], now: float) -> None:
+        proof = self.prover.store_proof(npc.npc_id, str(result)) if self.prover is not None else None
+        if self.memory is not None:
+            self.memory.add_memory(f"{npc.agent_type}-activity", npc.npc_id, result,
+                                   tags=[tool], timestamp=now)
+        if self.event_log is not None:
+            self.event_log.append({
+                "agent": npc.agent_type,
+                "player": npc.npc_id,
+                "skill": tool,
+                "params": self.handles[tool].params,
+                "result": result,
+                "zk_hash": proof,
+                "tick": self.tick,
+                "time": time.strftime("%H:%M:%S", time.gmtime(now)),
+                "ts": time.time()
+            })
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the world simulation")
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--config", type=str, default="config/agents.yaml")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Checkpoint file to write")
+    parser.add_argument("--checkpoint-every", type=int, default=0)
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint")
+    parser.add_argument("--headless", action="store_true",
+                        help="No memory, proofs or event log; run as fast as possible")
+    parser.add_argument("--realtime", action="store_true", help="Pace ticks at tick_rate")
+    parser.add_argument("--decisions", choices=("seeded", "planner"), default="seeded",
+                        help="Pick tools with each NPC's seeded RNG or ask the prompt planner")
+    parser.add_argument("--memory-socket-dir", type=str, default=None,
+                        help="Share memory through the memory.service shards here")
+    args = parser.parse_args(argv)
+
+    hooks: Dict[str, Any] = {}
+    pipeline = None
+    if not args.headless:
+        from eventlog.writer import EventLogWriter
+        from memory.graph import MemoryGraph
+        from sdk.anchor_client import AnchorZKClient
+        from sdk.local_chain import LocalChain
+        from sdk.pipeline import ProofPipeline
+        # Proofs settle in the background; ticks don't wait on the chain
+        pipeline = ProofPipeline(LocalChain())
+        if args.memory_socket_dir:
+            from memory.service import connect
+            memory = connect(args.memory_socket_dir)
+        else:
+            memory = MemoryGraph()
+        hooks = {"memory": memory, "prover": AnchorZKClient(pipeline=pipeline),
+                 "event_log": EventLogWriter("data/log")}
+
+    if args.decisions == "planner":
+        from llm.client import AsyncDecisionClient, CallableBackend
+        hooks["decide"] = ClientDecider(AsyncDecisionClient(CallableBackend(prompt_decision)))
+
+    if args.resume and args.checkpoint:
+        engine = WorldEngine.resume(args.checkpoint, args.config, **hooks)
+    else:
+        engine = WorldEngine(args.config, seed=args.seed, **hooks)
+    stats = engine.run(args.ticks, realtime=args.realtime, checkpoint_path=args.checkpoint,
+                       checkpoint_every=args.checkpoint_every)
+
+    if pipeline is not None:
+        pipeline.close()
+    if "event_log" in hooks:
+        hooks["event_log"].close()
+    if "decide" in hooks:
+        hooks["decide"].close()
+    if args.memory_socket_dir and "memory" in hooks:
+        hooks["memory"].close()
+    print(f"Tick {engine.tick}: {stats['npc_ticks']} NPC-ticks in {stats['elapsed']:.2f}s "
+          f"({stats['npc_ticks_per_sec']:.0f}/s), digest {engine.digest()[:16]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,55 @@
+
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+
+class SkillBatch:
+    """
+    Columnar results of one skill run for many players.
+    `columns` hold one value per player (lists or NumPy arrays) and
+    `constants` are shared by every row. Rows become dicts only when read.
+    """
+    def __init__(self, size: int, columns: Dict[str, Sequence[Any]],
+                 constants: Optional[Dict[str, Any]] = None,
+                 fields: Optional[Sequence[str]] = None):
+        self.size = size
+        self.columns = columns
+        self.constants = constants or {}
+        # Key order of the dicts, matching the skill's per-player run()
+        self.fields = tuple(fields or (*self.constants, *self.columns))
+        self._lists: Optional[Dict[str, List[Any]]] = None
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "SkillBatch":
+        """Wrap per-player results, e.g. from a skill without run_batch"""
+        fields = list(rows[0]) if rows else []
+        return cls(len(rows), {f: [row.get(f) for row in rows] for f in fields}, fields=fields)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, name: str) -> Sequence[Any]:
+        if name in self.columns:
+            return self.columns[name]
+        return [self.constants[name]] * self.size
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        lists = self._as_lists()
+        return {f: lists[f][index] if f in lists else self.constants[f] for f in self.fields}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        lists = self._as_lists()
+        fields = self.fields
+        columns = [lists[f] if f in lists else repeat(self.constants[f], self.size) for f in fields]
+        for values in zip(*columns):
+            yield dict(zip(fields, values))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def _as_lists(self) -> Dict[str, List[Any]]:
+        # One bulk conversion to Python values instead of one per element
+        if self._lists is None:
+            self._lists = {k: v.tolist() if hasattr(v, "tolist") else v
+                           for k, v in self.columns.items()}
+        return self._lists
@@ -1,4 +1,6 @@
 
+from skills.batch import SkillBatch
+
 class BrewItemSkill:
     def __init__(self, player_id, item_name="elven_wine"):
         self.player_id = player_id
@@ -12,3 +14,11 @@ class BrewItemSkill:
             "status": "minted",
             "nft_id": f"nft_{self.player_id}_{self.item_name}"
         }
+
+    @classmethod
+    def run_batch(cls, player_ids, item_name="elven_wine"):
+        return SkillBatch(len(player_ids), {
+            "player": list(player_ids),
+            "nft_id": [f"nft_{pid}_{item_name}" for pid in player_ids],
+        }, constants={"action": "brew_result", "item": item_name, "status": "minted"},
+            fields=("action", "player", "item", "status", "nft_id"))
@@ -1,13 +1,28 @@
 
+from skills.batch import SkillBatch
+
 class GenerateGreetingSkill:
-    def __init__(self, player_id):
+    def __init__(self, player_id, hour=None):
         self.player_id = player_id
+        self.hour = hour  # Game-world hour; defaults to the wall clock
 
     def run(self):
-        from datetime import datetime
-        hour = datetime.now().hour
-        greeting = "Good evening" if hour >= 18 else "Good day"
+        greeting = self._greeting(self.hour)
         return {
             "action": "greeting",
             "message": f"{greeting}, {self.player_id}! Welcome back."
         }
+
+    @classmethod
+    def run_batch(cls, player_ids, hour=None):
+        greeting = cls._greeting(hour)
+        return SkillBatch(len(player_ids), {
+            "message": [f"{greeting}, {pid}! Welcome back." for pid in player_ids],
+        }, constants={"action": "greeting"}, fields=("action", "message"))
+
+    @staticmethod
+    def _greeting(hour):
+        if hour is None:
+            from datetime import datetime
+            hour = datetime.now().hour
+        return "Good evening" if hour >= 18 else "Good day"
@@ -1,15 +1,40 @@
 
+import random
+
+try:
+    import numpy as np
+except ImportError:  # run_batch falls back to one draw per player
+    np = None
+
+from skills.batch import SkillBatch
+
+MINERALS = ["Iron Ore", "Silver", "Gold", "Mithril", "Platinum"]
+
 class MineSkill:
-    def __init__(self, player_id):
+    def __init__(self, player_id, rng=None):
         self.player_id = player_id
+        # Simulations pass a seeded per-agent stream for replayable results
+        self.rng = rng or random
 
     def run(self):
-        import random
-        minerals = ["Iron Ore", "Silver", "Gold", "Mithril", "Platinum"]
-        chosen = random.choice(minerals)
+        chosen = self.rng.choice(MINERALS)
         return {
             "action": "mine_result",
             "player": self.player_id,
             "item": chosen,
-            "value": round(random.uniform(0.3, 5.0), 2)
+            "value": round(self.rng.uniform(0.3, 5.0), 2)
         }
+
+    @classmethod
+    def run_batch(cls, player_ids, rng=None):
+        """Mine for every player at once; `rng` is a NumPy Generator or a seed"""
+        if np is None:
+            return SkillBatch.from_rows([cls(pid).run() for pid in player_ids])
+        if not isinstance(rng, np.random.Generator):
+            rng = np.random.default_rng(rng)
+        n = len(player_ids)
+        return SkillBatch(n, {
+            "player": list(player_ids),
+            "item": np.asarray(MINERALS)[rng.integers(0, len(MINERALS), n)],
+            "value": np.round(rng.uniform(0.3, 5.0, n), 2),
+        }, constants={"action": "mine_result"}, fields=("action", "player", "item", "value"))
@@ -0,0 +1,200 @@
+
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, from 50µs to 10s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LABELS = ("stage", "agent", "skill")
+
+Labels = Tuple[str, str, str]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set, Prometheus style"""
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[Labels, List] = {}   # labels -> [bucket counts, sum, count]
+
+    def observe(self, labels: Labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Labels, Tuple[List[int], float, int]]:
+        with self._lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+
+    def count(self, labels: Labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def quantile(self, labels: Labels, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile"""
+        series = self.snapshot().get(labels)
+        if not series or not series[2]:
+            return None
+        target = q * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[0]):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def get(self, labels: Labels) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+# Call counts come from the histogram, so a span costs one locked update
+stage_seconds = Histogram("mcp_stage_duration_seconds", "Time spent per pipeline stage")
+stage_errors = Counter("mcp_stage_errors_total", "Calls per pipeline stage that raised")
+
+_enabled = False
+# Labels of the enclosing span, so nested stages inherit agent/skill
+_current: contextvars.ContextVar[Labels] = contextvars.ContextVar("mcp_span", default=("", "", ""))
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("labels", "_start", "_token")
+
+    def __init__(self, stage: str, agent: Optional[str], skill: Optional[str]):
+        parent = _current.get()
+        self.labels = (stage, agent or parent[1], skill or parent[2])
+
+    def __enter__(self):
+        self._token = _current.set(self.labels)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        _current.reset(self._token)
+        stage_seconds.observe(self.labels, elapsed)
+        if exc_type is not None:
+            stage_errors.inc(self.labels)
+        return False
+
+
+def span(stage: str, agent: Optional[str] = None, skill: Optional[str] = None):
+    """Time a block as `stage`; a shared no-op when tracing is disabled"""
+    if not _enabled:
+        return _NOOP
+    return Span(stage, agent, skill)
+
+
+def traced(stage: str) -> Callable:
+    """Decorator form of span() for whole functions"""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(stage, None, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def reset() -> None:
+    for metric in (stage_seconds, stage_errors):
+        metric.reset()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(LABELS, labels) if value]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_prometheus() -> str:
+    """All stage metrics in the Prometheus text exposition format"""
+    hist = stage_seconds
+    series = sorted(hist.snapshot().items())
+    lines = ["# HELP mcp_stage_calls_total Completed calls per pipeline stage",
+             "# TYPE mcp_stage_calls_total counter"]
+    for labels, (_, _, count) in series:
+        lines.append(f"mcp_stage_calls_total{_label_str(labels)} {count}")
+    lines.append(f"# HELP {stage_errors.name} {stage_errors.help}")
+    lines.append(f"# TYPE {stage_errors.name} counter")
+    for labels, value in sorted(stage_errors.snapshot().items()):
+        lines.append(f"{stage_errors.name}{_label_str(labels)} {value:g}")
+
+    lines.append(f"# HELP {hist.name} {hist.help}")
+    lines.append(f"# TYPE {hist.name} histogram")
+    for labels, (counts, total, count) in series:
+        cumulative = 0
+        for bound, bucket_count in zip(hist.buckets, counts):
+            cumulative += bucket_count
+            le = 'le="%g"' % bound
+            lines.append(f"{hist.name}_bucket{_label_str(labels, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{hist.name}_bucket{_label_str(labels, le)} {count}")
+        lines.append(f"{hist.name}_sum{_label_str(labels)} {total:.9g}")
+        lines.append(f"{hist.name}_count{_label_str(labels)} {count}")
+    return "\n".join(lines) + "\n"
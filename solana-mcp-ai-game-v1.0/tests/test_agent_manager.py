@@ -0,0 +1,77 @@
+
+import asyncio
+import importlib.util
+import threading
+import time
+
+# runtime.py shadows the runtime/ directory, so load the module by path
+_spec = importlib.util.spec_from_file_location("agent_manager", "runtime/agent_manager.py")
+agent_manager = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(agent_manager)
+
+CONFIG = """
+agents:
+  thief: {}
+  guard: {}
+  merchant: {}
+  sheriff:
+    timeout: 0.05
+dependencies:
+  sheriff: [guard]
+  merchant: [thief]
+"""
+
+def _manager(tmp_path, dispatch_fn, **kwargs):
+    path = tmp_path / "agents.yaml"
+    path.write_text(CONFIG)
+    return agent_manager.AgentManager(str(path), dispatch_fn=dispatch_fn, **kwargs)
+
+def test_levels_run_concurrently(tmp_path):
+    # Both first-level agents must be inside dispatch at once to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    finished = set()
+
+    def dispatch(agent, player):
+        if agent in ("guard", "thief"):
+            barrier.wait()
+        elif agent == "sheriff":
+            time.sleep(0.1)
+        else:
+            assert finished == {"guard", "thief"}
+        finished.add(agent)
+        return {"agent": agent, "player": player, "actions": []}
+
+    manager = _manager(tmp_path, dispatch)
+    assert [sorted(level) for level in manager.levels] == [["guard", "thief"], ["merchant", "sheriff"]]
+    result = asyncio.run(manager.run_all("Alice"))
+    assert result["results"]["merchant"]["player"] == "Alice"
+    assert result["results"]["sheriff"]["error"].startswith("timed out")
+    assert result["timings"]["sheriff"] >= 0.05
+    manager.close()
+
+def test_concurrent_runs_keep_their_own_timings(tmp_path):
+    def dispatch(agent, player):
+        time.sleep(0.2 if player == "slow" else 0)
+        return {"agent": agent}
+
+    manager = _manager(tmp_path, dispatch)
+
+    async def both():
+        return await asyncio.gather(manager.run_all("slow"), manager.run_all("fast"))
+
+    slow, fast = asyncio.run(both())
+    assert slow["timings"]["thief"] >= 0.2 > fast["timings"]["thief"]
+    manager.close()
+
+def test_failed_upstream_skips_dependents(tmp_path):
+    def flaky_dispatch(agent, player):
+        if agent == "thief":
+            raise RuntimeError("caught red-handed")
+        return {"agent": agent}
+
+    manager = _manager(tmp_path, flaky_dispatch, max_concurrency=1)
+    results = asyncio.run(manager.run_all("Bob"))["results"]
+    assert results["thief"]["error"] == "caught red-handed"
+    assert results["merchant"]["error"] == "skipped: upstream thief failed"
+    assert results["sheriff"] == {"agent": "sheriff"}
+    manager.close()
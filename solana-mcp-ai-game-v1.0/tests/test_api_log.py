@@ -0,0 +1,62 @@
+
+from fastapi.testclient import TestClient
+import api.server as server
+from eventlog.writer import EventLogWriter
+
+def _write_log(directory, count):
+    writer = EventLogWriter(str(directory), segment_bytes=4096, index_interval=512)
+    for i in range(count):
+        writer.append({"agent": "miner" if i % 2 else "guard", "skill": "mine",
+                       "params": {}, "zk_hash": "ab", "ts": 1000.0 + i})
+    writer.close()
+
+def test_log_pagination_and_filters(tmp_path, monkeypatch):
+    _write_log(tmp_path, 250)
+    monkeypatch.setattr(server, "LOG_DIR", str(tmp_path))
+    client = TestClient(server.app)
+
+    first = client.get("/log").json()
+    assert len(first["events"]) == 100
+    assert first["events"][0]["ts"] == 1249.0
+    second = client.get("/log", params={"cursor": first["next_cursor"]}).json()
+    assert second["events"][0]["ts"] == 1149.0
+
+    miners = client.get("/log", params={"agent": "miner", "since": 1200, "limit": 1000}).json()
+    assert [e["ts"] for e in miners["events"]][:2] == [1249.0, 1247.0]
+    assert len(miners["events"]) == 25 and miners["next_cursor"] is None
+
+    window = client.get("/log", params={"since": 1100, "until": 1109, "limit": 1000}).json()
+    assert [e["ts"] for e in window["events"]] == [1109.0 - i for i in range(10)]
+
+    forward = client.get("/log", params={"direction": "forward", "limit": 5}).json()
+    assert forward["events"][0]["ts"] == 1000.0
+    after = client.get("/log", params={"direction": "forward", "cursor": first["tail"]}).json()
+    assert after["events"] == [] and after["next_cursor"] == first["tail"]
+
+def test_large_pages_are_gzipped(tmp_path, monkeypatch):
+    _write_log(tmp_path, 200)
+    monkeypatch.setattr(server, "LOG_DIR", str(tmp_path))
+    response = TestClient(server.app).get("/log", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+def test_stats_follow_appends(tmp_path, monkeypatch):
+    _write_log(tmp_path, 250)
+    monkeypatch.setattr(server, "LOG_DIR", str(tmp_path))
+    client = TestClient(server.app)
+
+    stats = client.get("/stats", params={"resolution": "minute"}).json()
+    assert stats["events"] == stats["proofs"] == 250
+    assert stats["agents"] == {"guard": {"events": 125, "proofs": 125},
+                               "miner": {"events": 125, "proofs": 125}}
+    # ts 1000..1249 falls in the minutes starting at 960, 1020, ... 1200
+    assert [b["start"] for b in stats["buckets"]] == list(range(960, 1201, 60))
+    assert sum(b["events"] for b in stats["buckets"]) == 250
+
+    writer = EventLogWriter(str(tmp_path), segment_bytes=4096, index_interval=512)
+    writer.append({"agent": "bard", "skill": "sing", "params": {}, "ts": 1300.0})
+    writer.close()
+    window = client.get("/stats", params={"resolution": "minute", "since": 1250, "limit": 2}).json()
+    assert window["skills"]["sing"] == {"events": 1, "proofs": 0}
+    assert window["buckets"] == [{"start": 1200, "events": 50, "proofs": 50},
+                                 {"start": 1260, "events": 1, "proofs": 0}]
+    assert client.get("/stats", params={"resolution": "week"}).status_code == 422
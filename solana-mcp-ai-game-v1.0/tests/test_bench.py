@@ -0,0 +1,14 @@
+
+from bench.suite import compare, memory_workload, run
+
+def test_workloads_are_seeded():
+    assert memory_workload(100, seed=7) == memory_workload(100, seed=7)
+    assert memory_workload(100, seed=7) != memory_workload(100, seed=8)
+
+def test_compare_flags_regressions():
+    report = run("tiny", only=["proofs"])
+    assert set(report["results"]) == {"proofs.store_proof", "proofs.store_proof_batched"}
+    baseline = {"results": {"proofs.store_proof": {"ops_per_sec": 1e12, "mean_ms": 1e-9}}}
+    flagged = {(r["benchmark"], r["metric"]) for r in compare(report, baseline)}
+    assert flagged == {("proofs.store_proof", "ops_per_sec"), ("proofs.store_proof", "mean_ms")}
+    assert compare(report, report) == []
@@ -0,0 +1,120 @@
+
+import asyncio
+import json
+import threading
+import time
+from fastapi.testclient import TestClient
+import runtime
+from planner.pool import DispatchPool, set_dispatch_pool
+
+def _echo(agent, player):
+    if agent == "broken":
+        raise RuntimeError("no such chain")
+    return {"agent": agent, "player": player, "actions": []}
+
+def test_batch_streams_every_result():
+    pool = DispatchPool(_echo, workers=2, chunk_size=3)
+    set_dispatch_pool(pool)
+    try:
+        client = TestClient(runtime.app)
+        requests = [{"agent": "miner", "player": f"p{i}"} for i in range(10)]
+        requests.append({"agent": "broken", "player": "x"})
+        response = client.post("/mcp/context/batch", json={"requests": requests})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(line["index"] for line in lines) == list(range(11))
+        by_index = {line["index"]: line for line in lines}
+        assert by_index[4]["player"] == "p4"
+        assert by_index[10]["error"] == "no such chain"
+        assert client.post("/mcp/context/batch", json={"requests": "nope"}).status_code == 400
+        assert pool.pending() == 0 and pool.stats["failed"] == 1
+    finally:
+        set_dispatch_pool(None)
+        pool.close()
+
+def test_full_pool_answers_429():
+    pool = DispatchPool(_echo, workers=1, max_queue=2)
+    set_dispatch_pool(pool)
+    try:
+        client = TestClient(runtime.app)
+        assert pool.admit(3)   # Fill it up
+        response = client.post("/mcp/context", json={"agent": "miner", "player": "Alice"})
+        assert response.status_code == 429 and response.headers["retry-after"] == "1"
+        batch = {"requests": [{"agent": "miner", "player": "Bob"}]}
+        assert client.post("/mcp/context/batch", json=batch).status_code == 429
+        pool.release(3)
+        assert client.post("/mcp/context", json={"agent": "miner", "player": "Alice"}).json()["player"] == "Alice"
+        assert pool.stats["rejected"] == 2
+        assert "mcp_dispatch_rejected_total 2" in client.get("/metrics").text
+    finally:
+        set_dispatch_pool(None)
+        pool.close()
+
+def test_slow_dispatch_does_not_block_the_loop():
+    release = threading.Event()
+    pool = DispatchPool(lambda agent, player: release.wait(5) and {"player": player}, workers=2)
+
+    async def scenario():
+        assert pool.admit(2)
+        slow = asyncio.gather(pool.run("miner", "a"), pool.run("miner", "b"))
+        ticks = 0
+        start = time.monotonic()
+        while time.monotonic() - start < 0.1:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        return ticks, await slow
+
+    ticks, results = asyncio.run(scenario())
+    pool.close()
+    assert ticks >= 5
+    assert [r["player"] for r in results] == ["a", "b"]
+
+def test_cancelled_work_holds_slots_until_it_ends():
+    release = threading.Event()
+    pool = DispatchPool(lambda agent, player: release.wait(5) and {"player": player},
+                        workers=1, max_queue=1, chunk_size=1)
+
+    async def scenario():
+        assert pool.admit(2)
+        stream = pool.run_many([("miner", "a"), ("miner", "b")])
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        first.cancel()
+        await asyncio.sleep(0.05)
+        # "a" is still running; the queued "b" was dropped and freed
+        assert pool.pending() == 1 and not pool.admit(2)
+
+        assert pool.admit(1)
+        single = asyncio.ensure_future(pool.run("miner", "c"))
+        await asyncio.sleep(0)
+        single.cancel()    # Queued, but not yet handed to the executor
+        await asyncio.sleep(0.01)
+        assert pool.pending() == 1
+        release.set()
+
+    asyncio.run(scenario())
+    pool.close()
+    assert pool.pending() == 0
+
+def test_batch_that_never_starts_frees_its_slots():
+    pool = DispatchPool(_echo, workers=1, max_queue=4)
+
+    async def failing_send(message):
+        raise ConnectionError("client went away")
+
+    async def receive():
+        await asyncio.sleep(60)
+
+    async def scenario():
+        assert pool.admit(2)
+        response = runtime._BatchStream(pool, [("miner", "a"), ("miner", "b")])
+        try:
+            await response({"type": "http"}, receive, failing_send)
+        except Exception:
+            pass
+
+    asyncio.run(scenario())
+    pool.close()
+    assert pool.pending() == 0
@@ -0,0 +1,61 @@
+
+from concurrent.futures import ThreadPoolExecutor
+
+from eventlog.stats import EventStats
+from eventlog.writer import EventLogWriter
+
+def _append(directory, start, count):
+    writer = EventLogWriter(str(directory), segment_bytes=2048)
+    for i in range(start, start + count):
+        writer.append({"agent": f"agent-{i % 3}", "skill": "mine" if i % 2 else "trade",
+                       "zk_hash": "ab" if i % 4 else None, "ts": 3600.0 * i})
+    writer.close()
+
+def test_restart_resumes_from_checkpoint(tmp_path):
+    log_dir, checkpoint = tmp_path / "log", str(tmp_path / "stats.json")
+    _append(log_dir, 0, 100)
+    stats = EventStats(str(log_dir), checkpoint)
+    assert stats.refresh() == 100
+    stats.checkpoint()
+
+    _append(log_dir, 100, 20)
+    resumed = EventStats(str(log_dir), checkpoint)
+    assert resumed.events == 100
+    assert resumed.refresh() == 20   # Only what came after the checkpoint
+
+    fresh = EventStats(str(log_dir))
+    fresh.refresh()
+    assert resumed.snapshot("day") == fresh.snapshot("day")
+    assert resumed.snapshot("hour", since=3600 * 110)["buckets"][0] == \
+        {"start": 3600 * 110, "events": 1, "proofs": 1}
+    assert resumed.snapshot()["skills"]["mine"] == {"events": 60, "proofs": 60}
+
+def test_retention_and_stale_checkpoint(tmp_path):
+    log_dir, checkpoint = tmp_path / "log", str(tmp_path / "stats.json")
+    _append(log_dir, 0, 50)
+    stats = EventStats(str(log_dir), checkpoint, retention={"hour": 10})
+    stats.refresh()
+    assert [b["start"] for b in stats.snapshot("hour")["buckets"]] == [3600 * i for i in range(40, 50)]
+    assert stats.snapshot("hour", limit=3)["buckets"][0]["start"] == 3600 * 47
+    stats.checkpoint()
+
+    # A different, shorter log: the checkpoint points past its end
+    other = tmp_path / "other"
+    _append(other, 0, 5)
+    (tmp_path / "other" / "stats.json").write_text(open(checkpoint).read())
+    rebuilt = EventStats(str(other), str(other / "stats.json"))
+    assert rebuilt.events == 0
+    rebuilt.refresh()
+    assert rebuilt.events == 5
+
+def test_workers_checkpoint_side_by_side(tmp_path):
+    log_dir, checkpoint = tmp_path / "log", str(tmp_path / "stats.json")
+    _append(log_dir, 0, 50)
+    workers = [EventStats(str(log_dir), checkpoint) for _ in range(4)]
+    for stats in workers:
+        stats.refresh()
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(lambda stats: [stats.checkpoint() for _ in range(20)], workers))
+    assert EventStats(str(log_dir), checkpoint).events == 50
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["log", "stats.json"]
@@ -0,0 +1,78 @@
+
+from eventlog.reader import EventFilter, EventLogReader, list_segments
+from eventlog.writer import EventLogWriter
+
+def test_writer_rotates_and_indexes_segments(tmp_path):
+    writer = EventLogWriter(str(tmp_path), segment_bytes=2048, flush_bytes=256,
+                            flush_interval=60, index_interval=300)
+    for i in range(300):
+        writer.append({"agent": "guard", "skill": "inspect", "n": i, "ts": 5000.0 + i})
+    writer.close()
+    assert len(list_segments(str(tmp_path))) > 5
+
+    reader = EventLogReader(str(tmp_path))
+    events, cursor = [], None
+    while True:
+        page = reader.read_forward(cursor, limit=40)
+        if not page.events:
+            break
+        events.extend(e["n"] for e in page.events)
+        cursor = page.next_cursor
+    assert events == list(range(300))
+
+    # Time-bounded reads start from the sidecar index, not from either end
+    window = reader.read_forward(limit=5, match=EventFilter(since=5150.0))
+    assert [e["n"] for e in window.events] == [150, 151, 152, 153, 154]
+    window = reader.read_backward(limit=3, match=EventFilter(until=5100.0))
+    assert [e["n"] for e in window.events] == [100, 99, 98]
+
+def test_writer_appends_to_existing_log_and_buffers(tmp_path):
+    writer = EventLogWriter(str(tmp_path), flush_interval=60)
+    writer.append({"agent": "thief", "skill": "steal"})
+    assert EventLogReader(str(tmp_path)).read_backward().events == []  # Still buffered
+    writer.close()
+
+    writer = EventLogWriter(str(tmp_path))
+    writer.append({"agent": "guard", "skill": "inspect"})
+    writer.close()
+    page = EventLogReader(str(tmp_path)).read_backward()
+    assert [e["agent"] for e in page.events] == ["guard", "thief"]
+
+def test_writers_sharing_a_directory_agree_on_segments(tmp_path):
+    first = EventLogWriter(str(tmp_path), segment_bytes=2048, flush_bytes=1, index_interval=300)
+    second = EventLogWriter(str(tmp_path), segment_bytes=2048, flush_bytes=1, index_interval=300)
+    event = {"agent": "guard", "skill": "inspect"}
+    for i in range(200):
+        (first if i % 3 else second).append(dict(event, n=i, ts=9000.0 + i))
+    first.append(event)
+    assert event == {"agent": "guard", "skill": "inspect"}   # The caller's dict is left alone
+    first.close()
+    second.close()
+
+    directory = str(tmp_path)
+    for segment in list_segments(directory):
+        data = open(f"{directory}/{segment:08d}.jsonl", "rb").read()
+        assert len(data) <= 2048
+        starts = {0} | {i + 1 for i, b in enumerate(data) if b == ord("\n")}
+        for line in open(f"{directory}/{segment:08d}.idx"):
+            assert int(line.split()[1]) in starts
+    page = EventLogReader(directory).read_forward(limit=1000)
+    assert [e.get("n") for e in page.events][:200] == list(range(200))
+
+def test_buffered_writer_stays_in_time_order(tmp_path):
+    late = EventLogWriter(str(tmp_path), flush_interval=60)
+    for i in range(20):
+        late.append({"agent": "thief", "n": i})        # Buffered with older stamps
+    early = EventLogWriter(str(tmp_path), flush_interval=60)
+    for i in range(20):
+        early.append({"agent": "guard", "n": i})
+    early.close()
+    middle = EventLogReader(str(tmp_path)).read_forward(limit=20).events[10]["ts"]
+    late.close()
+
+    page = EventLogReader(str(tmp_path)).read_forward(limit=100)
+    stamps = [e["ts"] for e in page.events]
+    assert stamps == sorted(stamps)
+    recent = EventLogReader(str(tmp_path)).read_backward(limit=100, match=EventFilter(since=middle))
+    agents = [e["agent"] for e in recent.events]
+    assert agents[:20] == ["thief"] * 20 and agents.count("guard") >= 10
@@ -0,0 +1,62 @@
+
+import yaml
+from tools.executor import ToolChainExecutor, _run_chunk
+
+def _executor():
+    with open("config/skills.yaml") as f:
+        return ToolChainExecutor({s["name"]: s for s in yaml.safe_load(f)["skills"]})
+
+def test_execute_many_sequential_and_threaded():
+    executor = _executor()
+    players = [f"p{i}" for i in range(100)]
+    ordered = list(executor.execute_many("brew_item", players))
+    assert [pid for pid, _ in ordered] == players
+    assert ordered[0][1]["nft_id"] == "nft_p0_elven_wine"
+
+    threaded = dict(executor.execute_many("brew_item", players, workers=4, chunk_size=16))
+    assert threaded == dict(ordered)
+
+def test_execute_chain_many_in_process_pool():
+    executor = _executor()
+    results = dict(executor.execute_chain_many(["generate_greeting", "brew_item"],
+                                                ["Alice", "Bob"], workers=2, pool="process"))
+    assert [r["action"] for r in results["Bob"]] == ["greeting", "brew_result"]
+
+def test_worker_handle_cache_keeps_params_per_chain():
+    # A pool worker resolves chains through this cache for its whole lifetime
+    brew = "skills.brew.BrewItemSkill"
+    for item in ("elven_wine", "dwarf_ale"):
+        specs = (("brew_item", brew, (("item_name", item),)),)
+        assert _run_chunk(specs, ["Alice"])[0][1][0]["item"] == item
+
+def test_batch_skills_match_per_player_results():
+    executor = _executor()
+    players = [f"p{i}" for i in range(50)]
+    for skill in ("brew_item", "generate_greeting"):
+        batch = executor.execute_batch(skill, players, hour=20)
+        assert batch.to_dicts() == [executor.handles[skill](pid, hour=20) for pid in players]
+
+def test_mine_batch_is_columnar_and_seeded():
+    players = [f"p{i}" for i in range(1000)]
+    batch = _executor().execute_batch("mine", players)
+    assert len(batch) == 1000 and batch.column("value").dtype.kind == "f"
+    row = batch[10]
+    assert row["player"] == "p10" and type(row["item"]) is str and type(row["value"]) is float
+    assert 0.3 <= min(batch.column("value")) and max(batch.column("value")) <= 5.0
+
+    first = ToolChainExecutor(_executor().tools_config, seed=5)
+    second = ToolChainExecutor(_executor().tools_config, seed=5)
+    # execute_many dispatches to run_batch and converts rows as they are consumed
+    assert list(first.execute_many("mine", players)) == list(second.execute_many("mine", players))
+
+def test_seeded_results_match_across_pools():
+    config = _executor().tools_config
+    players = [f"p{i}" for i in range(600)]
+
+    def run(**kwargs):
+        return dict(ToolChainExecutor(config, seed=5).execute_many("mine", players, chunk_size=128, **kwargs))
+
+    sequential = run()
+    assert run(workers=2) == sequential
+    assert run(workers=2, pool="process") == sequential
+    assert dict(ToolChainExecutor(config, seed=6).execute_many("mine", players, chunk_size=128)) != sequential
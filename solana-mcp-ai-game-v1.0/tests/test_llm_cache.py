@@ -0,0 +1,47 @@
+
+import time
+import planner.llm as llm
+from planner.llm import DecisionCache, LocalModel, PromptTemplates, decision_key
+
+def test_repeat_prompts_hit_the_cache(monkeypatch):
+    model = LocalModel()
+    monkeypatch.setattr(llm, "_model", model)
+    monkeypatch.setattr(llm, "_cache", DecisionCache())
+    first = llm.get_next_skill_from_prompt("tavernkeeper", "served ale", "Hello there")
+    assert first in ("brew_item", "generate_greeting")
+    # Whitespace and case differences normalize to the same key
+    assert llm.get_next_skill_from_prompt("tavernkeeper", "served  ale", " hello THERE") == first
+    assert model.calls == 1
+    stats = llm.get_decision_cache().stats
+    assert (stats.hits, stats.misses) == (1, 1)
+
+def test_lru_ttl_and_disk_tier(tmp_path):
+    cache = DecisionCache(max_entries=2, ttl=60, disk_path=str(tmp_path / "decisions.db"))
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper())
+    assert len(cache) == 2 and cache.stats.evictions == 1
+    assert cache.get("a") == "A" and cache.stats.disk_hits == 1  # Evicted from memory, not disk
+    cache.close()
+
+    cache = DecisionCache(ttl=0.01)
+    cache.put("b", "B")
+    time.sleep(0.02)
+    assert cache.get("b") is None and cache.stats.expirations == 1
+
+    cache = DecisionCache(disk_path=str(tmp_path / "decisions.db"))
+    cache.put("d", "D")
+    cache.close()
+    assert DecisionCache(disk_path=str(tmp_path / "decisions.db")).get("d") == "D"
+
+def test_templates_reload_on_change(tmp_path):
+    path = tmp_path / "miner.txt"
+    path.write_text("Memory: {memory}. Input: {player_input!r}")
+    templates = PromptTemplates(str(tmp_path), check_interval=0)
+    template = templates.get("miner")
+    assert templates.get("miner") is template
+    assert template.render(memory="gold", player_input="dig") == "Memory: gold. Input: 'dig'"
+
+    path.write_text("Dig {player_input} now")
+    changed = templates.get("miner")
+    assert changed.render(memory="", player_input="here") == "Dig here now"
+    assert decision_key("miner", "", "here", changed.version) != decision_key("miner", "", "here", template.version)
@@ -0,0 +1,41 @@
+
+import asyncio
+from llm.client import AsyncDecisionClient, FakeBackend, timed_tick
+from llm.decoder import validate_skill_calls
+
+def test_tick_of_1000_npcs_is_a_few_batches():
+    backend = FakeBackend(latency=0.05)
+    client = AsyncDecisionClient(backend, max_batch=250, max_in_flight=4)
+    requests = [("miner", {"npc": i}) for i in range(1000)]
+    decisions, elapsed = timed_tick(client, requests)
+    assert all(d == {"action": "mine", "params": {"location": "deep_cave"}} for d in decisions)
+    assert backend.batch_sizes == [250] * 4
+    assert elapsed < 0.5  # One round trip, not 1000 serialized ones
+
+def test_identical_requests_are_coalesced():
+    backend = FakeBackend(latency=0.01)
+    client = AsyncDecisionClient(backend)
+    decisions = asyncio.run(client.decide_many([("guard", {"area": "gate"})] * 50))
+    assert sum(backend.batch_sizes) == 1
+    assert client.stats.coalesced == 49
+    decisions[0]["params"]["area"] = "changed"
+    assert decisions[1]["params"]["area"] == "market"
+
+def test_in_flight_cap_and_batch_validation():
+    class Backend(FakeBackend):
+        active = peak = 0
+        async def decide_batch(self, requests):
+            Backend.active += 1
+            Backend.peak = max(Backend.peak, Backend.active)
+            try:
+                return await super().decide_batch(requests)
+            finally:
+                Backend.active -= 1
+
+    backend = Backend(latency=0.01, decisions={"thief": {"action": "steal", "params": "bag"}})
+    client = AsyncDecisionClient(backend, max_batch=10, max_in_flight=2)
+    decisions = asyncio.run(client.decide_many([("thief", {"n": i}) for i in range(100)]))
+    assert Backend.peak == 2 and len(backend.batch_sizes) == 10
+    assert all(d["action"] == "noop" for d in decisions)  # params must be a dict
+    assert validate_skill_calls([{"action": "mine", "params": {}}, {"bad": 1}]) == [
+        {"action": "mine", "params": {}}, {"action": "noop", "params": {}}]
@@ -0,0 +1,35 @@
+
+import time
+from memory.compact import CompactMemoryGraph
+
+def test_compact_graph_matches_memory_graph_api():
+    mem = CompactMemoryGraph()
+    a = mem.add_memory("town", "thief", "stole a purse", tags=["crime"], timestamp=1.0)
+    b = mem.add_memory("town", "guard", "chased the thief", tags=["crime", "patrol"], timestamp=2.0)
+    mem.add_memory("tavern", "guard", "ordered ale", timestamp=3.0)
+    assert mem.connect_memories(b.entry_id, a.entry_id)
+
+    assert [e.agent_id for e in mem.get_recent("town")] == ["guard", "thief"]
+    assert [e.content for e in mem.query(agents=["guard"])] == ["ordered ale", "chased the thief"]
+    assert mem.query(tags=["crime", "patrol"])[0].references == [a.entry_id]
+    assert mem.get(a.entry_id).tags == {"crime"}
+
+def test_retention_keeps_indexes_consistent():
+    mem = CompactMemoryGraph(vacuum_min_rows=8)
+    mem.set_retention("town", max_size=5)
+    for i in range(50):
+        mem.add_memory("town", f"npc{i % 3}", i, tags=["tick"], timestamp=float(i))
+    now = time.time()
+    mem.add_memory("tavern", "npc0", "old", timestamp=now - 60)
+    mem.add_memory("tavern", "npc0", "fresh", timestamp=now)
+    mem.set_retention("tavern", ttl=30)
+
+    assert [e.content for e in mem.get_topic("town")] == [45, 46, 47, 48, 49]
+    assert [e.content for e in mem.query(agents=["npc0"])] == ["fresh", 48, 45]
+    assert len(mem.query(tags=["tick"])) == 5
+    assert mem.evict_expired(now=now + 60) == 1
+    assert len(mem) == 5
+
+    usage = mem.memory_usage()
+    assert usage["entries"] == 5 and usage["rows"] < 52
+    assert usage["total"] > 0
@@ -0,0 +1,31 @@
+
+from memory.graph import MemoryGraph, MemoryEntry
+
+def _add(mem, topic, agent, ts, tags=()):
+    entry = MemoryEntry(agent_id=agent, content=f"{agent}@{ts}", timestamp=ts,
+                        tags=set(tags), topic=topic)
+    mem._index_entry(entry)
+    return entry
+
+def test_time_ordered_query():
+    mem = MemoryGraph()
+    # Out-of-order timestamps must still come back newest first
+    for ts in [5, 1, 9, 3, 7]:
+        _add(mem, "town", "guard" if ts % 2 else "thief", float(ts), tags=["patrol"])
+    _add(mem, "tavern", "guard", 8.0, tags=["patrol", "drink"])
+
+    assert [e.timestamp for e in mem.get_recent("town")] == [9.0, 7.0, 5.0]
+    assert [e.timestamp for e in mem.query(time_range=(3, 8))] == [8.0, 7.0, 5.0, 3.0]
+    assert [e.timestamp for e in mem.query(topics=["town", "tavern"], limit=2)] == [9.0, 8.0]
+    assert [e.topic for e in mem.query(tags=["patrol", "drink"])] == ["tavern"]
+    assert mem.query(agents=["guard"], tags=["patrol"], time_range=(0, 6))[0].timestamp == 5.0
+    assert mem.query(agents=["nobody"]) == []
+    assert mem.query(tags=["patrol", "missing"]) == []
+
+def test_recent_skips_ids_without_entries():
+    mem = MemoryGraph()
+    for ts in [1, 2, 3]:
+        _add(mem, "town", "guard", float(ts))
+    mem._topics["town"].add(4.0, "indexed-but-not-stored")
+    assert [e.timestamp for e in mem.get_recent("town", 3)] == [3.0, 2.0, 1.0]
+    assert [e.timestamp for e in mem.get_topic("town")] == [1.0, 2.0, 3.0]
@@ -0,0 +1,125 @@
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from memory.graph import MemoryGraph
+from memory.service import MemoryClient, MemoryCluster, MemoryServer, MemoryServiceError, connect
+from sim.engine import WorldEngine
+
+@pytest.fixture(scope="module")
+def cluster():
+    # Short path: Unix socket paths are limited to ~100 bytes
+    with tempfile.TemporaryDirectory(prefix="mem") as socket_dir:
+        with MemoryCluster(socket_dir, shards=3) as cluster:
+            yield cluster
+
+def test_client_matches_graph_api(cluster):
+    client = cluster.client()
+    a = client.add_memory("svc-square", "thief", {"item": "purse"}, tags=["crime"], timestamp=10)
+    b = client.add_memory("svc-square", "guard", "chased the thief", timestamp=20)
+    c = client.add_memory("svc-market", "merchant", "sold bread", tags=["trade"], timestamp=15)
+    assert client.connect_memories(b.entry_id, a.entry_id)
+    assert client.connect_memories(c.entry_id, a.entry_id)
+    assert not client.connect_memories(c.entry_id, "missing")
+
+    assert [e.entry_id for e in client.get_recent("svc-square", 5)] == [b.entry_id, a.entry_id]
+    assert client.get_topic("svc-square")[0].content == {"item": "purse"}
+    assert [e.entry_id for e in client.query(topics=["svc-square", "svc-market"])] == \
+        [b.entry_id, c.entry_id, a.entry_id]
+    assert [e.entry_id for e in client.query(tags=["trade"])] == [c.entry_id]
+    assert [e.entry_id for e in client.get_references(b.entry_id)] == [a.entry_id]
+    assert {e.entry_id for e in client.get_referrers(a.entry_id)} == {b.entry_id, c.entry_id}
+    assert client.ancestors(b.entry_id)[0].entry_id == a.entry_id
+    client.close()
+
+def test_pipeline_batches_calls_per_shard(cluster):
+    client = cluster.client()
+    topics = [f"svc-pipe-{i}" for i in range(6)]
+    with client.pipeline() as p:
+        added = [p.add_memory(t, "bard", f"verse {n}", timestamp=n) for n in range(4) for t in topics]
+        recent = p.get_recent(topics[0], 1)
+    assert len({get().entry_id for get in added}) == len(added)
+    # Calls run in queue order within a shard
+    assert recent()[0].content == "verse 3"
+    with pytest.raises(MemoryServiceError):
+        client._call(0, "drop_everything", {})
+    client.close()
+
+def test_workers_see_one_memory(cluster):
+    clients = [cluster.client(pool_size=2) for _ in range(4)]
+
+    def work(n):
+        client = clients[n % len(clients)]
+        return client.add_memory(f"svc-shared-{n % 5}", f"worker-{n % 4}", n, timestamp=n).entry_id
+
+    with ThreadPoolExecutor(8) as executor:
+        ids = set(executor.map(work, range(200)))
+    for client in clients:
+        seen = {e.entry_id for t in range(5) for e in client.get_topic(f"svc-shared-{t}")}
+        assert seen == ids
+        client.close()
+
+def test_server_in_thread(tmp_path):
+    server = MemoryServer(str(tmp_path / "m.sock"), MemoryGraph())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = MemoryClient([str(tmp_path / "m.sock")])
+    entry = client.add_memory("forge", "smith", "tempered a blade")
+    assert len(client) == 1 and server.graph.get_recent("forge")[0].entry_id == entry.entry_id
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+def test_world_engines_share_the_service(cluster):
+    population = {"miner": {"count": 2, "tools": ["mine"]}}
+    clients = [connect(os.path.dirname(cluster.socket_paths[0])) for _ in range(2)]
+    for seed, client in enumerate(clients):
+        WorldEngine(seed=seed, agents=population, memory=client).run(5)
+    # Both engines wrote as miner-0/1; each client sees both runs
+    for client in clients:
+        assert len(client.get_topic("miner-activity")) == 20
+        client.close()
+
+class _SlowEntryMap(dict):
+    # Widens the gap between indexing an entry and storing it
+    def __setitem__(self, key, value):
+        time.sleep(0.001)
+        super().__setitem__(key, value)
+
+def test_reads_run_alongside_writes(tmp_path):
+    graph = MemoryGraph()
+    graph._entry_map = _SlowEntryMap()
+    server = MemoryServer(str(tmp_path / "m.sock"), graph)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    clients = [MemoryClient([str(tmp_path / "m.sock")]) for _ in range(4)]
+    done = threading.Event()
+
+    def write(n):
+        for i in range(100):
+            clients[n].add_memory("busy", f"writer-{n}", i, timestamp=i)
+
+    def read(n):
+        reads = 0
+        while not done.is_set() or not reads:
+            recent = clients[n].get_recent("busy", 5)
+            assert all(e.topic == "busy" for e in recent)
+            assert all(e.topic == "busy" for e in clients[n].query(topics=["busy"], limit=20))
+            reads += 1
+        return reads
+
+    with ThreadPoolExecutor(4) as executor:
+        readers = [executor.submit(read, n) for n in (2, 3)]
+        list(executor.map(write, (0, 1)))
+        done.set()
+        assert all(r.result() for r in readers)
+    assert len(clients[0].get_topic("busy")) == 200
+    for client in clients:
+        client.close()
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,42 @@
+
+from concurrent.futures import ThreadPoolExecutor
+from memory.sharded import ShardedMemoryGraph
+
+def test_concurrent_writers_and_readers():
+    mem = ShardedMemoryGraph(shards=4)
+
+    def write(worker):
+        for i in range(200):
+            mem.add_memory(f"topic{worker % 5}", f"agent{worker}", i, tags=["tick"])
+            # Readers on any topic must only ever see fully indexed entries
+            for entry in mem.query(agents=[f"agent{worker}"], limit=5):
+                assert entry.agent_id == f"agent{worker}"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(10)))
+
+    assert len(mem) == 2000
+    assert len(mem.query(tags=["tick"], limit=5000)) == 2000
+    recent = mem.query(topics=["topic0", "topic1"], limit=50)
+    assert len(recent) == 50
+    assert all(a.timestamp >= b.timestamp for a, b in zip(recent, recent[1:]))
+
+def test_cross_shard_references():
+    mem = ShardedMemoryGraph(shards=8)
+    cause = mem.add_memory("market", "thief", "stole bread")
+    effect = mem.add_memory("barracks", "guard", "opened an inquiry")
+    assert mem.connect_memories(effect.entry_id, cause.entry_id)
+    assert [e.entry_id for e in mem.get_referrers(cause.entry_id)] == [effect.entry_id]
+    assert [e.entry_id for e in mem.ancestors(effect.entry_id)] == [cause.entry_id]
+    assert not mem.connect_memories(effect.entry_id, "missing")
+
+def test_sharded_persistence(tmp_path):
+    path = str(tmp_path / "memory.json")
+    mem = ShardedMemoryGraph(shards=3, persist_path=path, persist_mode="wal")
+    for topic in ["a", "b", "c", "d"]:
+        mem.add_memory(topic, "npc", topic)
+    mem.close()
+    mem = ShardedMemoryGraph(shards=3, persist_path=path, persist_mode="wal")
+    assert [e.content for e in mem.get_recent("c")] == ["c"]
+    assert len(mem) == 4
+    mem.close()
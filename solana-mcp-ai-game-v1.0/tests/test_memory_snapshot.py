@@ -0,0 +1,96 @@
+
+from memory.graph import MemoryGraph
+from memory.sharded import ShardedMemoryGraph
+from memory.snapshot import MappedEntry, is_binary_snapshot
+
+def _binary(path):
+    return MemoryGraph(persist_path=path, persist_mode="wal", fsync="never",
+                       snapshot_format="binary")
+
+def test_binary_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "memory.snap")
+    mem = _binary(path)
+    a = mem.add_memory("town-square", "thief", {"item": "purse"}, tags=["crime"], timestamp=10)
+    b = mem.add_memory("town-square", "guard", "chased the thief", timestamp=20)
+    c = mem.add_memory("market", "merchant", "sold bread", tags=["trade"], timestamp=15)
+    assert mem.connect_memories(b.entry_id, a.entry_id)
+    mem.compact()
+    mem.close()
+    assert is_binary_snapshot(path)
+
+    mem = _binary(path)
+    assert len(mem) == 3
+    assert [e.entry_id for e in mem.get_recent("town-square", 5)] == [b.entry_id, a.entry_id]
+    assert [e.entry_id for e in mem.get_topic("town-square")] == [a.entry_id, b.entry_id]
+    assert [e.entry_id for e in mem.query(tags=["crime"])] == [a.entry_id]
+    assert [e.entry_id for e in mem.query(agents=["merchant"])] == [c.entry_id]
+    assert [e.entry_id for e in mem.query(time_range=(12, 30))] == [b.entry_id, c.entry_id]
+    assert [e.entry_id for e in mem.get_references(b.entry_id)] == [a.entry_id]
+    assert [e.entry_id for e in mem.get_referrers(a.entry_id)] == [b.entry_id]
+    assert mem.ancestors(b.entry_id)[0].entry_id == a.entry_id
+
+    # Served from the map; content is decoded on first access
+    entry = mem.query(tags=["crime"])[0]
+    assert isinstance(entry, MappedEntry) and not entry._loaded
+    assert entry.content == {"item": "purse"}
+    mem.close()
+
+def test_writes_layer_on_binary_base(tmp_path):
+    path = str(tmp_path / "memory.snap")
+    mem = _binary(path)
+    old = mem.add_memory("mine", "miner", "found gold", timestamp=1)
+    mem.compact()
+    mem.close()
+
+    mem = _binary(path)
+    new = mem.add_memory("mine", "miner", "found silver", timestamp=2)
+    assert mem.connect_memories(new.entry_id, old.entry_id)
+    assert [e.entry_id for e in mem.get_recent("mine")] == [new.entry_id, old.entry_id]
+    assert [e.entry_id for e in mem.get_referrers(old.entry_id)] == [new.entry_id]
+    mem.close()
+
+    # The new entry and link come back from the log on top of the base
+    mem = _binary(path)
+    assert [e.entry_id for e in mem.query(agents=["miner"])] == [new.entry_id, old.entry_id]
+    assert [e.entry_id for e in mem.get_references(new.entry_id)] == [old.entry_id]
+    mem.compact()
+    mem.close()
+
+    mem = _binary(path)
+    assert len(mem) == 2
+    assert [e.entry_id for e in mem.get_referrers(old.entry_id)] == [new.entry_id]
+    mem.close()
+
+def test_sharded_binary_snapshot_keeps_cross_shard_links(tmp_path):
+    path = str(tmp_path / "memory.snap")
+    mem = ShardedMemoryGraph(shards=4, persist_path=path, persist_mode="wal",
+                             fsync="never", snapshot_format="binary")
+    topics = [f"topic-{i}" for i in range(8)]
+    entries = [mem.add_memory(t, "bard", t) for t in topics]
+    for source, target in zip(entries[1:], entries):
+        assert mem.connect_memories(source.entry_id, target.entry_id)
+    mem.compact()
+    mem.close()
+
+    mem = ShardedMemoryGraph(shards=4, persist_path=path, persist_mode="wal",
+                             snapshot_format="binary")
+    assert len(mem) == 8
+    for source, target in zip(entries[1:], entries):
+        assert [e.entry_id for e in mem.get_referrers(target.entry_id)] == [source.entry_id]
+    mem.close()
+
+def test_mapped_caches_stay_bounded(tmp_path):
+    path = str(tmp_path / "memory.snap")
+    mem = _binary(path)
+    ids = [mem.add_memory("mine", "miner", f"nugget {n}", timestamp=n).entry_id for n in range(50)]
+    mem.compact()
+    mem.close()
+
+    mem = _binary(path)
+    mem._base.cache_size = 8
+    assert mem.connect_memories(ids[1], ids[0])
+    assert len(mem.query(topics=["mine"], limit=100)) == 50
+    assert len(mem._base._entries) <= 8 and len(mem._base._row_ids) <= 8
+    # The linked entry was pinned, so the link survives the scan
+    assert [e.entry_id for e in mem.get_references(ids[1])] == [ids[0]]
+    mem.close()
@@ -0,0 +1,21 @@
+
+from memory.graph import MemoryGraph
+
+def test_reverse_index_and_traversal():
+    mem = MemoryGraph()
+    theft = mem.add_memory("town", "thief", "stole a purse", tags=["crime"])
+    alarm = mem.add_memory("town", "guard", "raised the alarm", tags=["crime"])
+    chase = mem.add_memory("town", "guard", "chased the thief", tags=["crime"])
+    gossip = mem.add_memory("tavern", "tavernkeeper", "heard about the chase")
+    mem.connect_memories(alarm.entry_id, theft.entry_id)
+    mem.connect_memories(chase.entry_id, alarm.entry_id)
+    mem.connect_memories(gossip.entry_id, chase.entry_id)
+
+    assert [e.entry_id for e in mem.get_referrers(theft.entry_id)] == [alarm.entry_id]
+    assert [e.content for e in mem.ancestors(gossip.entry_id)] == [
+        "chased the thief", "raised the alarm", "stole a purse"]
+    assert [e.content for e in mem.ancestors(gossip.entry_id, max_depth=2)] == [
+        "chased the thief", "raised the alarm"]
+    assert [e.agent_id for e in mem.descendants(theft.entry_id, tags=["crime"])] == ["guard", "guard"]
+    assert len(mem.neighborhood(alarm.entry_id, hops=1)) == 2
+    assert len(mem.neighborhood(alarm.entry_id, hops=3, max_nodes=2)) == 2
@@ -0,0 +1,80 @@
+
+from memory.graph import MemoryGraph
+
+def test_wal_replay_and_compaction(tmp_path):
+    path = str(tmp_path / "memory.json")
+    mem = MemoryGraph(persist_path=path, persist_mode="wal", fsync="never")
+    a = mem.add_memory("town-square", "thief", "stole a purse", tags=["crime"])
+    b = mem.add_memory("town-square", "guard", "chased the thief")
+    assert mem.connect_memories(b.entry_id, a.entry_id)
+    mem.close()
+
+    # Startup replays the log on top of the (missing) snapshot
+    mem = MemoryGraph(persist_path=path, persist_mode="wal")
+    assert len(mem.get_topic("town-square")) == 2
+    assert mem.query(tags=["crime"])[0].entry_id == a.entry_id
+    mem.add_memory("market", "merchant", "sold bread")
+    mem.compact()
+    mem.add_memory("market", "merchant", "sold cheese")
+    mem.close()
+
+    mem = MemoryGraph(persist_path=path, persist_mode="wal")
+    assert len(mem.get_topic("market")) == 2
+    restored = [e for e in mem.get_topic("town-square") if e.entry_id == b.entry_id][0]
+    assert restored.references == [a.entry_id]
+    mem.close()
+
+def test_wal_ignores_torn_tail(tmp_path):
+    path = str(tmp_path / "memory.json")
+    mem = MemoryGraph(persist_path=path, persist_mode="wal")
+    mem.add_memory("mine", "miner", "found gold")
+    mem.close()
+    with open(path + ".wal", "a") as f:
+        f.write('{"op": "add", "seq": 2, "topic"')
+
+    mem = MemoryGraph(persist_path=path, persist_mode="wal")
+    assert len(mem.get_topic("mine")) == 1
+    mem.close()
+
+def test_concurrent_compactions_lose_nothing(tmp_path):
+    import threading
+    path = str(tmp_path / "memory.json")
+    mem = MemoryGraph(persist_path=path, persist_mode="wal", fsync="never")
+    stop = threading.Event()
+
+    def compact_loop():
+        while not stop.is_set():
+            mem.compact()
+
+    compactors = [threading.Thread(target=compact_loop) for _ in range(3)]
+    for t in compactors:
+        t.start()
+    ids = {mem.add_memory("forge", "smith", i).entry_id for i in range(300)}
+    stop.set()
+    for t in compactors:
+        t.join()
+    mem.close()
+
+    mem = MemoryGraph(persist_path=path, persist_mode="wal")
+    assert {e.entry_id for e in mem.get_topic("forge")} == ids
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+    mem.close()
+
+def test_listeners_run_after_the_write_is_logged(tmp_path):
+    path = str(tmp_path / "memory.json")
+    mem = MemoryGraph(persist_path=path, persist_mode="wal", fsync="never")
+    seen = []
+
+    def listener(entry):
+        with open(path + ".wal") as f:
+            seen.append(entry.entry_id in f.read())
+
+    def broken(entry):
+        raise RuntimeError("index offline")
+
+    mem.subscribe(broken)
+    mem.subscribe(listener)
+    entry = mem.add_memory("forge", "smith", "tempered a blade")
+    assert seen == [True]
+    assert mem.get_topic("forge")[0].entry_id == entry.entry_id
+    mem.close()
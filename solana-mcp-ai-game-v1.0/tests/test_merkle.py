@@ -0,0 +1,46 @@
+
+from sdk.anchor_client import AnchorZKClient
+
+def test_batched_proofs_verify_any_action():
+    zk = AnchorZKClient(batch_size=4)
+    actions = [("miner" if i % 2 else "guard", f"action {i}") for i in range(11)]
+    for agent, action in actions:
+        zk.store_proof(agent, action)
+    assert len(zk.roots) == 2          # Two full batches committed, three pending
+    assert zk.get_receipt("action 9") is None
+    zk.commit_batch()
+    assert [r["size"] for r in zk.roots] == [4, 4, 3]
+
+    for agent, action in actions:
+        receipt = zk.get_receipt(action)
+        assert receipt.agent_id == agent
+        assert len(receipt.proof) <= 2
+        assert zk.verify_inclusion(action, receipt)
+    receipt = zk.get_receipt("action 5")
+    assert not zk.verify_inclusion("action 5 tampered", receipt)
+    receipt.agent_id = "thief"
+    assert not zk.verify_inclusion("action 5", receipt)
+
+def test_latest_proof_per_agent_still_works_in_batch_mode():
+    zk = AnchorZKClient(batch_size=8)
+    zk.store_proof("tavernkeeper", "Brewed Elven Wine")
+    assert zk.verify_proof("tavernkeeper", "Brewed Elven Wine")
+
+def test_repeated_actions_keep_every_receipt():
+    zk = AnchorZKClient(batch_size=2, max_batches=2)
+    zk.store_proof("tavernkeeper", "Brewed Elven Wine")
+    zk.store_proof("bard", "Brewed Elven Wine")
+    zk.store_proof("tavernkeeper", "Brewed Elven Wine")
+    zk.commit_batch()
+    assert zk.get_receipt("Brewed Elven Wine").batch == 1
+    receipt = zk.get_receipt("Brewed Elven Wine", agent_id="bard")
+    assert (receipt.batch, receipt.index) == (0, 1)
+    assert zk.verify_inclusion("Brewed Elven Wine", receipt)
+    assert zk.get_receipt("Brewed Elven Wine", agent_id="guard") is None
+
+    # Only the newest two batches keep their trees
+    zk.store_proof("guard", "Drew a sword")
+    zk.commit_batch()
+    assert len(zk.roots) == 3
+    assert zk.get_receipt("Brewed Elven Wine", agent_id="bard") is None
+    assert zk.get_receipt("Brewed Elven Wine", agent_id="tavernkeeper").batch == 1
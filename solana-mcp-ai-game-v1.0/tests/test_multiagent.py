@@ -7,5 +7,5 @@ def test_memory_sharing():
     mem.add_memory("town-square", "guard", "noticed suspicious movement")
     recent = mem.get_recent("town-square")
     assert len(recent) == 2
-    assert recent[0]["agent"] == "thief"
+    assert recent[0].agent_id == "guard"  # Newest first
     print("✅ Multi-agent memory test passed")
@@ -0,0 +1,68 @@
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from sdk.anchor_client import AnchorZKClient
+from sdk.local_chain import LocalChain
+from sdk.pipeline import ProofPipeline
+
+def test_background_submission_with_retries():
+    chain = LocalChain(latency=0.01, failure_rate=0.3, seed=7)
+    pipeline = ProofPipeline(chain, max_queue=16, max_in_flight=16, max_retries=50, base_delay=0.001)
+    zk = AnchorZKClient(pipeline=pipeline)
+
+    started = time.perf_counter()
+    for i in range(100):
+        zk.store_proof("miner", f"mined ore {i}")
+    zk.flush(timeout=10)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0   # 100 x 10ms sequentially would be >= 1s
+    assert pipeline.stats["confirmed"] == 100
+    assert pipeline.stats["retries"] > 0
+    assert sum(r["kind"] == "action" for r in chain.records.values()) == 100
+    pipeline.close()
+
+def test_program_errors_are_not_retried():
+    pipeline = ProofPipeline(LocalChain())
+    future = pipeline.submit("store_action", "", 1, "data", 1)
+    pipeline.flush()
+    assert "Agent ID" in str(future.exception())
+    assert pipeline.stats == {"submitted": 1, "confirmed": 0, "failed": 1, "retries": 0}
+    pipeline.close()
+
+def test_batch_roots_go_through_pipeline():
+    chain = LocalChain()
+    pipeline = ProofPipeline(chain)
+    zk = AnchorZKClient(batch_size=10, pipeline=pipeline)
+    for i in range(25):
+        zk.store_proof("guard", f"patrol {i}")
+    zk.flush()
+    assert [r["size"] for r in chain.records.values()] == [10, 10, 5]
+    pipeline.close()
+
+def test_timed_out_submission_is_never_sent():
+    release = threading.Event()
+    sent = []
+
+    class SlowChain:
+        async def store_action(self, label):
+            while not release.is_set():
+                await asyncio.sleep(0.005)
+            sent.append(label)
+            return label
+
+    pipeline = ProofPipeline(SlowChain(), max_queue=1, max_in_flight=1)
+    pipeline.submit("store_action", "a")
+    time.sleep(0.05)                       # The worker is now busy with "a"
+    pipeline.submit("store_action", "b")   # Fills the queue
+    with pytest.raises(TimeoutError):
+        pipeline.submit("store_action", "c", timeout=0.05)
+    release.set()
+    pipeline.flush(timeout=5)
+    assert sent == ["a", "b"]
+    assert pipeline.stats["submitted"] == 2 and pipeline.stats["confirmed"] == 2
+    pipeline.close()
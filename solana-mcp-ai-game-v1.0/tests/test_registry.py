@@ -0,0 +1,37 @@
+
+import shutil
+from planner.planner import dispatch
+from planner.registry import SkillRegistry
+
+def test_dispatch_uses_compiled_registry():
+    result = dispatch("tavernkeeper", "Alice")
+    assert [a["action"] for a in result["actions"]] == ["greeting", "brew_result"]
+    assert dispatch("dragon", "Alice") == {"error": "unknown agent"}
+
+def test_registry_hot_reload(tmp_path):
+    skills = tmp_path / "skills.yaml"
+    rules = tmp_path / "agent_rules.yaml"
+    shutil.copy("config/skills.yaml", skills)
+    shutil.copy("config/agent_rules.yaml", rules)
+    registry = SkillRegistry(str(skills), str(rules), check_interval=0)
+    version = registry.compiled.version
+    assert [a["action"] for a in registry.dispatch("miner", "Bob")["actions"]] == ["mine_result"]
+
+    rules.write_text("agents:\n  miner:\n    behavior:\n      - mine\n      - brew_item\n")
+    assert registry.maybe_reload(force=True)
+    assert registry.compiled.version != version
+    assert len(registry.dispatch("miner", "Bob")["actions"]) == 2
+
+    # A broken config keeps the last good version serving
+    rules.write_text("agents:\n  miner:\n    behavior:\n      - teleport\n")
+    assert not registry.maybe_reload(force=True)
+    assert len(registry.dispatch("miner", "Bob")["actions"]) == 2
+
+    # Mid-save (temp file not yet renamed into place) the old version serves
+    rules.rename(tmp_path / "agent_rules.yaml.swp")
+    assert not registry.maybe_reload()
+    assert len(registry.dispatch("miner", "Bob")["actions"]) == 2
+    (tmp_path / "agent_rules.yaml.swp").rename(rules)
+    rules.write_text("agents:\n  miner:\n    behavior:\n      - mine\n")
+    assert registry.maybe_reload()
+    assert len(registry.dispatch("miner", "Bob")["actions"]) == 1
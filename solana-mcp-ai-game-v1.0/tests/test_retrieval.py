@@ -0,0 +1,92 @@
+
+import random
+from math import log
+
+import planner.llm as llm
+from memory.graph import MemoryGraph
+from memory.retrieval import Retriever, tokenize
+from planner.llm import DecisionCache, LocalModel
+
+def _tavern(graph):
+    graph.add_memory("tavern", "tavernkeeper", "Alice ordered elven wine", tags=["order"], timestamp=1)
+    graph.add_memory("tavern", "tavernkeeper", "Bob spilled ale on the bar", timestamp=2)
+    graph.add_memory("mine", "miner", {"item": "Gold", "note": "wine cellar under the mine"}, timestamp=3)
+    graph.add_memory("tavern", "guard", "Alice paid with a hero badge", timestamp=4)
+
+def test_bm25_ranks_and_follows_new_memories():
+    graph = MemoryGraph()
+    _tavern(graph)
+    retriever = Retriever.attach(graph)
+    assert len(retriever) == 4
+
+    top = retriever.retrieve("I'd like some elven wine", k=2)
+    assert [e.content for e in top][0] == "Alice ordered elven wine"
+    assert len(top) == 2
+    assert retriever.retrieve("the", k=5) == []   # Stopwords only
+
+    graph.add_memory("tavern", "tavernkeeper", "Bob asked for elven wine too", timestamp=5)
+    assert len(retriever) == 5
+    assert len(retriever.retrieve("elven", k=5)) == 2
+
+def test_filters_apply_before_top_k():
+    graph = MemoryGraph()
+    _tavern(graph)
+    retriever = Retriever.attach(graph)
+    assert [e.topic for e in retriever.retrieve("wine", k=5, filters={"topics": ["mine"]})] == ["mine"]
+    assert retriever.retrieve("wine", k=5, filters={"agents": ["nobody"]}) == []
+    assert len(retriever.retrieve("alice", k=5, filters={"tags": ["order"]})) == 1
+    assert [e.agent_id for e in retriever.retrieve("alice", k=5, filters={"time_range": (3, 10)})] == ["guard"]
+
+def test_pruned_search_matches_exhaustive_scoring():
+    rng = random.Random(7)
+    words = [f"w{i}" for i in range(300)]
+    weights = [1.0 / (i + 1) for i in range(300)]
+    retriever = Retriever()
+    graph = MemoryGraph()
+    for i in range(1500):
+        retriever.add(graph.add_memory(f"topic-{i % 5}", f"agent-{i % 3}",
+                                       " ".join(rng.choices(words, weights, k=rng.randrange(3, 12))),
+                                       timestamp=i))
+    for _ in range(30):
+        query = " ".join(rng.choices(words, weights, k=4))
+        filters = rng.choice([None, {"topics": ["topic-1"]}, {"time_range": (300, 1200)}])
+        got = retriever.search(query, k=5, filters=filters)
+        # Score every entry straight from the postings and compare
+        allowed = retriever._allowed_rows(filters or {})
+        allowed = None if allowed is None else set(allowed.tolist())
+        expected = sorted((-score, row) for row, score in _bm25(retriever, query).items()
+                          if (allowed is None or row in allowed)
+                          and (not filters or "time_range" not in filters or 300 <= row <= 1200))
+        assert [eid for eid, _ in got] == [retriever._ids[row] for _, row in expected[:5]]
+
+def _bm25(retriever, query):
+    n = len(retriever)
+    avgdl = retriever._total_length / n
+    scores = {}
+    for term in set(tokenize(query)):
+        rows, tfs = retriever._postings.get(term, ((), ()))
+        idf = log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+        for row, tf in zip(rows, tfs):
+            norm = retriever.k1 * (1 - retriever.b + retriever.b * retriever._lengths.view()[row] / avgdl)
+            scores[row] = scores.get(row, 0.0) + idf * tf * (retriever.k1 + 1) / (tf + norm)
+    return scores
+
+def test_dense_mode_finds_shared_words():
+    graph = MemoryGraph()
+    _tavern(graph)
+    retriever = Retriever.attach(graph, mode="dense", dim=256)
+    assert retriever.retrieve("hero badge", k=1)[0].agent_id == "guard"
+    assert [e.content for e in retriever.retrieve("alice", k=5, filters={"agents": ["tavernkeeper"]})] == \
+        ["Alice ordered elven wine"]
+
+def test_prompt_memory_comes_from_retriever(monkeypatch):
+    graph = MemoryGraph()
+    _tavern(graph)
+    prompts = []
+    model = LocalModel()
+    monkeypatch.setattr(llm, "_model", lambda prompt: prompts.append(prompt) or model(prompt))
+    monkeypatch.setattr(llm, "_cache", DecisionCache())
+    monkeypatch.setattr(llm, "_retriever", None)
+    llm.set_retriever(Retriever.attach(graph), k=1)
+    llm.get_next_skill_from_prompt("tavernkeeper", None, "Pour me some elven wine")
+    assert "Your memory: Alice ordered elven wine" in prompts[0]
@@ -0,0 +1,87 @@
+
+import threading
+import time
+from fastapi.testclient import TestClient
+import runtime
+from telemetry import tracing
+from telemetry.profiler import SamplingProfiler
+
+def test_stages_are_timed_and_exported():
+    tracing.reset()
+    tracing.enable()
+    try:
+        client = TestClient(runtime.app)
+        assert client.post("/mcp/context", json={"agent": "tavernkeeper", "player": "Alice"}).status_code == 200
+        body = client.get("/metrics").text
+    finally:
+        tracing.enable(False)
+    assert tracing.stage_seconds.count(("mcp_context", "tavernkeeper", "")) == 1
+    assert tracing.stage_seconds.count(("dispatch", "tavernkeeper", "")) == 1
+    # Skill spans inherit the agent from the enclosing dispatch
+    assert tracing.stage_seconds.count(("skill", "tavernkeeper", "brew_item")) == 1
+    assert 'mcp_stage_calls_total{stage="skill",agent="tavernkeeper",skill="brew_item"} 1' in body
+    assert 'mcp_stage_duration_seconds_bucket{stage="dispatch",agent="tavernkeeper",le="+Inf"} 1' in body
+    assert tracing.stage_seconds.quantile(("dispatch", "tavernkeeper", ""), 0.99) is not None
+
+def test_unknown_agents_share_one_label():
+    tracing.reset()
+    tracing.enable()
+    try:
+        client = TestClient(runtime.app)
+        for i in range(5):
+            client.post("/mcp/context", json={"agent": f"made-up-{i}", "player": "Alice"})
+        client.post("/mcp/context", json={"agent": ["not", "a", "name"], "player": "Alice"})
+    finally:
+        tracing.enable(False)
+    labels = {key[1] for key in tracing.stage_seconds.snapshot()}
+    assert labels == {"unknown"}
+    assert tracing.stage_seconds.count(("mcp_context", "unknown", "")) == 6
+
+def test_spans_are_noops_when_disabled():
+    tracing.reset()
+    with tracing.span("dispatch", agent="miner"):
+        pass
+    assert tracing.stage_seconds.snapshot() == {}
+
+    @tracing.traced("work")
+    def work():
+        raise RuntimeError("boom")
+    tracing.enable()
+    try:
+        work()
+    except RuntimeError:
+        pass
+    finally:
+        tracing.enable(False)
+    assert tracing.stage_errors.get(("work", "", "")) == 1
+
+def test_sampling_profiler_collapses_stacks():
+    stop = threading.Event()
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+    worker = threading.Thread(target=busy_loop, name="busy")
+    worker.start()
+    with SamplingProfiler(interval=0.001) as profiler:
+        time.sleep(0.1)
+    stop.set()
+    worker.join()
+    lines = profiler.collapsed().splitlines()
+    assert any(line.startswith("busy;") and "busy_loop" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+def test_npc_ids_stay_out_of_labels():
+    from memory.graph import MemoryGraph
+    from sdk.anchor_client import AnchorZKClient
+    from sim.engine import WorldEngine
+
+    tracing.reset()
+    tracing.enable()
+    try:
+        WorldEngine(seed=1, agents={"miner": {"count": 20, "tools": ["mine"]}},
+                    memory=MemoryGraph(), prover=AnchorZKClient()).run(2)
+    finally:
+        tracing.enable(False)
+    snapshot = tracing.stage_seconds.snapshot()
+    assert {key[0] for key in snapshot} >= {"memory_write", "proof"}
+    assert not any(key[1].startswith("miner-") for key in snapshot)
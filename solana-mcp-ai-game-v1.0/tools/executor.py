@@ -1,16 +1,193 @@
 
 import importlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from skills.batch import SkillBatch
+from telemetry.tracing import span
+
+
+class SkillHandle:
+    """A skill class resolved once, with its configured params bound"""
+    __slots__ = ("name", "module", "klass", "params", "accepts", "batch_accepts")
+
+    def __init__(self, name: str, module: str, klass: type, params: Dict[str, Any]):
+        self.name = name
+        self.module = module
+        self.klass = klass
+        self.params = params
+        # Optional per-call arguments (e.g. rng, hour) this skill takes
+        self.accepts = frozenset(inspect.signature(klass).parameters) - {"player_id"}
+        run_batch = getattr(klass, "run_batch", None)
+        self.batch_accepts = (frozenset(inspect.signature(run_batch).parameters) - {"player_ids"}
+                              if run_batch is not None else None)
+
+    @classmethod
+    def resolve(cls, name: str, entry: Dict[str, Any]) -> "SkillHandle":
+        mod_path, class_name = entry["module"].rsplit(".", 1)
+        klass = getattr(importlib.import_module(mod_path), class_name)
+        return cls(name, entry["module"], klass, dict(entry.get("params", {})))
+
+    def __call__(self, player_id: str, **context: Any) -> Dict[str, Any]:
+        """Run the skill; `context` entries the skill doesn't accept are ignored"""
+        with span("skill", skill=self.name):
+            if context:
+                extra = {k: v for k, v in context.items() if k in self.accepts}
+                return self.klass(player_id, **self.params, **extra).run()
+            return self.klass(player_id, **self.params).run()
+
+    @property
+    def batched(self) -> bool:
+        return self.batch_accepts is not None
+
+    def run_batch(self, player_ids: Sequence[str], **context: Any) -> SkillBatch:
+        """Run for many players through the skill's run_batch, or per player without one"""
+        with span("skill_batch", skill=self.name):
+            if not self.batched:
+                return SkillBatch.from_rows([self(pid, **context) for pid in player_ids])
+            extra = {k: v for k, v in context.items() if k in self.batch_accepts}
+            return self.klass.run_batch(player_ids, **self.params, **extra)
+
+
+# Per-process handle cache for process-pool workers
+_worker_handles: Dict[str, List[SkillHandle]] = {}
+
+
+def _run_chunk(specs: Tuple[Tuple[str, str, Tuple], ...], player_ids: List[str],
+               seed: Any = None) -> List[Tuple[str, List[Any]]]:
+    """Process-pool entry point: resolve the chain once per worker, run it for a chunk"""
+    # Params are part of the key: chains sharing modules may configure them differently
+    key = repr(specs)
+    handles = _worker_handles.get(key)
+    if handles is None:
+        handles = [SkillHandle.resolve(name, {"module": module, "params": dict(params)})
+                   for name, module, params in specs]
+        _worker_handles[key] = handles
+    return _run_batched(handles, player_ids, seed)
+
+
+def _run_batched(handles: List[SkillHandle], player_ids: List[str], seed: Any = None) -> List[Tuple[str, List[Any]]]:
+    context = {"rng": _generator(seed)} if seed is not None else {}
+    batches = [handle.run_batch(player_ids, **context) for handle in handles]
+    return list(zip(player_ids, (list(rows) for rows in zip(*batches))))
+
+
+def _generator(seed: Any):
+    import numpy as np
+    return np.random.default_rng(seed)
+
 
 class ToolChainExecutor:
-    def __init__(self, tools_config):
+    def __init__(self, tools_config, seed=None):
+        """`seed` seeds the NumPy Generator handed to batch skills that take an rng"""
         self.tools_config = tools_config
+        self.seed = seed
+        self._rng = None
+        self._seeds = None
+        # Resolve every skill class up front so execute() is a dict lookup
+        self.handles = {name: SkillHandle.resolve(name, entry)
+                        for name, entry in tools_config.items()}
 
     def execute(self, tool_name, player_id):
-        entry = self.tools_config.get(tool_name)
-        if not entry:
+        with span("execute", skill=tool_name):
+            handle = self.handles.get(tool_name)
+            if not handle:
+                raise ValueError(f"Tool '{tool_name}' not found.")
+            return handle(player_id)
+
+    def execute_batch(self, tool_name: str, player_ids: Sequence[str], **context: Any) -> SkillBatch:
+        """
+        Run one skill for many players and return columnar results.
+        Skills with a run_batch classmethod run once for the whole batch.
+        """
+        handle = self.handles.get(tool_name)
+        if not handle:
             raise ValueError(f"Tool '{tool_name}' not found.")
-        mod_path, class_name = entry["module"].rsplit(".", 1)
-        mod = importlib.import_module(mod_path)
-        klass = getattr(mod, class_name)
-        instance = klass(player_id, **entry.get("params", {}))
-        return instance.run()
+        context.setdefault("rng", self.rng)
+        return handle.run_batch(list(player_ids), **context)
+
+    @property
+    def rng(self):
+        if self._rng is None:
+            try:
+                import numpy as np
+            except ImportError:  # Batch skills fall back to the random module
+                return None
+            self._rng = np.random.default_rng(self.seed)
+        return self._rng
+
+    def _chunk_seed(self):
+        """
+        Seed for the next chunk of execute_chain_many, spawned from `seed`, so
+        results depend on the seed and chunking but not on the pool
+        """
+        if self._seeds is None:
+            try:
+                import numpy as np
+            except ImportError:
+                return None
+            self._seeds = np.random.SeedSequence(self.seed)
+        return self._seeds.spawn(1)[0]
+
+    def execute_many(self, tool_name: str, player_ids: Iterable[str],
+                     workers: int = 0, pool: str = "thread",
+                     chunk_size: int = 256) -> Iterator[Tuple[str, Any]]:
+        """
+        Run one skill for many players, yielding (player_id, result).
+        With workers=0 results come back in order on the calling thread;
+        otherwise chunks fan out to a thread or process pool and are
+        yielded as they finish.
+        """
+        for player_id, results in self.execute_chain_many([tool_name], player_ids,
+                                                          workers, pool, chunk_size):
+            yield player_id, results[0]
+
+    def execute_chain_many(self, chain: Sequence[str], player_ids: Iterable[str],
+                           workers: int = 0, pool: str = "thread",
+                           chunk_size: int = 256) -> Iterator[Tuple[str, List[Any]]]:
+        """Run a behavior chain for many players, yielding (player_id, [results])"""
+        handles = []
+        for tool_name in chain:
+            handle = self.handles.get(tool_name)
+            if not handle:
+                raise ValueError(f"Tool '{tool_name}' not found.")
+            handles.append(handle)
+
+        if workers <= 0:
+            # Batch-capable skills run per chunk; rows become dicts as they're consumed
+            for chunk in self._chunks(player_ids, chunk_size):
+                seed = self._chunk_seed()
+                context = {"rng": _generator(seed)} if seed is not None else {}
+                batches = [handle.run_batch(chunk, **context) for handle in handles]
+                for player_id, rows in zip(chunk, zip(*batches)):
+                    yield player_id, list(rows)
+            return
+
+        if pool == "thread":
+            pool_cls, task = ThreadPoolExecutor, _run_batched
+            payload = handles
+        elif pool == "process":
+            # Workers re-resolve classes from module paths; handles don't pickle
+            pool_cls, task = ProcessPoolExecutor, _run_chunk
+            payload = tuple((h.name, h.module, tuple(h.params.items())) for h in handles)
+        else:
+            raise ValueError(f"Unknown pool '{pool}', expected 'thread' or 'process'")
+
+        with pool_cls(max_workers=workers) as executor:
+            # Seeds are drawn in chunk order, before any chunk runs
+            futures = [executor.submit(task, payload, chunk, self._chunk_seed())
+                       for chunk in self._chunks(player_ids, chunk_size)]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    @staticmethod
+    def _chunks(player_ids: Iterable[str], size: int) -> Iterator[List[str]]:
+        chunk = []
+        for player_id in player_ids:
+            chunk.append(player_id)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk